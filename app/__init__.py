@@ -1,8 +1,16 @@
 # app/__init__.py
-from .main import app  # Import the FastAPI app instance
-from .models import Base  # Import SQLAlchemy base class
+# Nothing is imported eagerly: image worker processes import modules of this package,
+# and loading the FastAPI app there would set up settings, the database and every route.
 
 
+def __getattr__(name):
+    if name == "app":
+        from .main import app  # Import the FastAPI app instance
+        return app
+    if name == "Base":
+        from .models import Base  # Import SQLAlchemy base class
+        return Base
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 print("Debug: Initializing app package - importing modules")
@@ -1,4 +1,6 @@
 # File: app/config.py
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -8,6 +10,96 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
     OPENAI_API_KEY: str
 
+    # AI generation
+    GENERATION_CONCURRENCY: int = 8  # max OpenAI calls in flight per run
+    GENERATION_TIMEOUT_SECONDS: float = 120.0  # per product attempt, excluding circuit breaker and rate limit waits; 0 disables
+    GENERATION_COMMIT_BATCH_SIZE: int = 25  # results committed per transaction
+    GENERATION_PROGRESS_INTERVAL_SECONDS: float = 2.0  # max time between commits
+    GENERATION_PACK_SIZE: int = 1  # products per chat completion, 1 disables packing
+    GENERATION_PACK_TOKEN_BUDGET: int = 6000  # max estimated product input tokens per pack
+    GENERATION_PACK_MAX_OUTPUT_TOKENS: int = 16000  # model's output token limit
+    GENERATION_DESCRIPTION_TOKEN_BUDGET: int = 1500  # existing description is trimmed to this, 0 disables
+    GENERATION_MAX_ATTEMPTS: int = 3  # per product, for timeouts and other transient failures
+    GENERATION_RETRY_BACKOFF_SECONDS: float = 2.0  # base of the jittered delay between attempts
+    GENERATION_HEDGE_ENABLED: bool = False  # duplicate slow calls, keep the first answer
+    GENERATION_HEDGE_PERCENTILE: float = 95.0  # hedge calls slower than this percentile of recent latency
+    GENERATION_HEDGE_MAX_RATIO: float = 0.05  # max share of calls that may be hedged
+    GENERATION_HEDGE_MIN_SAMPLES: int = 20  # latencies needed before hedging starts
+    GENERATION_HEDGE_WINDOW: int = 200  # recent latencies the percentile is taken over
+    JOB_WORKERS: int = 2  # background generation jobs run in parallel
+
+    # Response cache for generated descriptions
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 100000
+    RESPONSE_CACHE_MAX_AGE_DAYS: int = 30
+
+    # LLM provider and its HTTP connection pool
+    LLM_PROVIDER: str = "openai"  # "openai", or "mock" for the offline provider
+    LLM_BASE_URL: Optional[str] = None  # OpenAI-compatible endpoint, defaults to OpenAI
+    LLM_HTTP2: bool = True  # used when the h2 package is installed
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    LLM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    LLM_READ_TIMEOUT_SECONDS: float = 120.0
+
+    # Mock provider behaviour
+    MOCK_LLM_LATENCY_SECONDS: float = 0.5
+    MOCK_LLM_LATENCY_JITTER: float = 0.5  # +/- fraction of the latency
+    MOCK_LLM_ERROR_RATE: float = 0.0  # share of requests answered with 429/500/503
+    MOCK_LLM_SEED: int = 0
+
+    # OpenAI rate limits (starting budget; refined from response headers)
+    OPENAI_RPM_LIMIT: int = 500
+    OPENAI_TPM_LIMIT: int = 200000
+    OPENAI_MAX_RETRIES: int = 6
+    OPENAI_BACKOFF_BASE_SECONDS: float = 1.0
+    OPENAI_BACKOFF_MAX_SECONDS: float = 60.0
+
+    # Product image downloads (when base64 images are enabled)
+    IMAGE_FETCH_TIMEOUT_SECONDS: float = 15.0
+    IMAGE_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    IMAGE_MAX_BYTES: int = 20 * 1024 * 1024  # larger images are rejected while streaming
+    IMAGE_MAX_CONNECTIONS: int = 50
+    IMAGE_PER_HOST_CONCURRENCY: int = 8  # downloads in flight per image host
+
+    # Images sent to the model
+    IMAGE_OUTPUT_FORMAT: str = "jpeg"  # "jpeg", "webp" or "png"
+    IMAGE_OUTPUT_QUALITY: int = 85  # JPEG/WebP quality
+    IMAGE_MAX_DIMENSION: int = 512  # longest side after resizing
+    IMAGE_TARGET_BYTES: int = 0  # lower JPEG/WebP quality until the image fits, 0 disables
+
+    # Image decode/resize/encode worker processes
+    IMAGE_WORKERS: int = 0  # 0 uses one process per CPU
+    IMAGE_QUEUE_PER_WORKER: int = 2  # images queued per worker before callers wait
+    IMAGE_PREFETCH_LOOKAHEAD: int = 32  # images prepared ahead of the products being generated
+
+    # On-disk cache of processed images
+    IMAGE_CACHE_ENABLED: bool = True
+    IMAGE_CACHE_DIR: str = "temp/image_cache"  # relative to the project root
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    IMAGE_CACHE_REVALIDATE_SECONDS: float = 24 * 3600  # re-check the source (ETag/Last-Modified) after this
+
+    # CSV uploads
+    CSV_SPOOL_CHUNK_BYTES: int = 1024 * 1024  # upload copied to disk in chunks of this size
+    CSV_BATCH_ROWS: int = 5000  # rows parsed and inserted per batch
+    CSV_ENGINE: str = "auto"  # "pyarrow", "c" (pandas), or "auto": pyarrow when installed
+    INCREMENTAL_UPLOADS: bool = True  # re-uploaded products with unchanged inputs keep their generated content
+    UPLOAD_STORE_DIR: str = "temp/uploads"  # uploads kept as Parquet for downloads (needs pyarrow), relative to the project root
+    UPLOAD_STORE_COMPRESSION: str = "zstd"  # Parquet codec: "zstd", "snappy", "gzip" or "none"
+
+    # Circuit breaker for provider outages
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive server/connection errors that open it
+    CIRCUIT_BREAKER_COOLDOWN_SECONDS: float = 30.0  # wait before a probe request
+    CIRCUIT_BREAKER_MAX_OPEN_SECONDS: float = 600.0  # outage length after which the job fails
+
+    # OpenAI Batch API mode
+    BATCH_BACKEND: str = "openai"  # "openai", or "local" for the offline stand-in
+    BATCH_COMPLETION_WINDOW: str = "24h"
+    BATCH_POLL_INTERVAL_SECONDS: float = 60.0
+    BATCH_MAX_REQUESTS: int = 50000  # OpenAI's per-batch request limit
+    BATCH_MAX_FILE_BYTES: int = 200 * 1024 * 1024  # OpenAI's batch input file size limit
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -7,6 +7,7 @@ from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from fastapi import Depends  # Import Depends from FastAPI
 from app.config import settings
 from sqlalchemy.orm import configure_mappers
+from sqlalchemy import literal
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from app.models.user import User
@@ -38,7 +39,38 @@ async def get_user_db(session: AsyncSession = Depends(get_async_session)):
     yield SQLAlchemyUserDatabase(session, User)
 
 
+def add_missing_columns(connection) -> None:
+    """
+    Add model columns that existing SQLite tables are missing.
+
+    `create_all` only creates missing tables, so a database created before a
+    column was added to its model would fail on every query touching it.
+    Each column absent from PRAGMA table_info is added with ALTER TABLE ADD
+    COLUMN (with its scalar default, if any) and the table's indexes are
+    created if missing, so this is safe to run on every start.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+        missing = [column for column in table.columns if column.name not in existing]
+        if not existing or not missing:
+            continue
+        for column in missing:
+            column_type = column.type.compile(dialect = connection.dialect)
+            ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+            if column.default is not None and column.default.is_scalar:
+                default = literal(column.default.arg, column.type).compile(
+                    dialect = connection.dialect, compile_kwargs = {"literal_binds": True})
+                ddl += f" DEFAULT {default}"
+            connection.exec_driver_sql(ddl)
+            print(f"Debug: Added missing column {table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(connection, checkfirst = True)
+
+
 async def init_db():
     print("Debug: Initializing database tables")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
@@ -11,12 +11,16 @@ from fastapi.templating import Jinja2Templates
 from .models import Base
 
 from app.config import settings
-from app.db import engine
+from app.db import add_missing_columns, engine
 from app.routes import router as main_router
 from app.routes.settings import router as settings_router
 from app.routes.download import router as download_router
 from app.routes.dashboard import router as dashboard_router
 from app.routes.process_products import router as process_products_router
+from app.services.job_queue import job_queue
+from app.services.llm_providers import close_provider
+from app.services.image_fetcher import image_fetcher
+from app.services.image_pool import image_pool
 
 
 
@@ -26,9 +30,16 @@ async def lifespan(app: FastAPI):
     print("Debug: Starting FastAPI application lifespan")
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # Tables from an older version get the columns added since
+        await conn.run_sync(add_missing_columns)
     print("Debug: Database tables created")
+    await job_queue.start()
     yield
     print("Debug: Application shutdown initiated")
+    await job_queue.stop()
+    await close_provider()
+    await image_fetcher.aclose()
+    await image_pool.aclose()
 
 
 app = FastAPI(lifespan = lifespan)
@@ -40,9 +40,22 @@ class Product(Base):
     output_body = Column(Text)
     output_seo_title = Column(String)
     output_seo_descr = Column(Text)
+    source_row = Column(Integer)  # 0-based data row of the product in its uploaded CSV
 
     uploaded_file = relationship("UploadedFile")
 
+# Last generated version of each product handle, per user (see product_fingerprints)
+class ProductFingerprint(Base):
+    __tablename__ = "product_fingerprints"
+    __table_args__ = (UniqueConstraint("user_id", "handle", name = "uq_product_fingerprint"),)
+
+    id = Column(Integer, primary_key = True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable = False)
+    handle = Column(String, nullable = False)
+    input_hash = Column(String(64), nullable = False)  # SHA-256 of the inputs the content was generated from
+    product_id = Column(Integer, ForeignKey("products.id"), nullable = False)  # holds the generated content
+    updated_at = Column(DateTime, default = datetime.utcnow)
+
 # Settings table
 class Setting(Base):
     __tablename__ = "settings"
@@ -59,6 +72,7 @@ class Setting(Base):
     created_at = Column(DateTime, default = datetime.utcnow)
     updated_at = Column(DateTime, default = datetime.utcnow, onupdate = datetime.utcnow)
     use_base64_image = Column(Boolean, default = False)
+    bypass_response_cache = Column(Boolean, default = False)
 
     # Relationship to User model
     user = relationship("User", back_populates="settings")
@@ -69,9 +83,69 @@ class FailedEntry(Base):
     __tablename__ = "failed_entries"
     id = Column(Integer, primary_key=True)
     uploadedfileid = Column(Integer, ForeignKey("uploaded_files.id"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id"))
     product_title = Column(String)
+    error_type = Column(String)  # exception class, e.g. BadRequestError
+    error_message = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# GenerationJobs table
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, default="queued")  # queued / running / done / failed
+    mode = Column(String, default="interactive")  # interactive / batch
+    batch_id = Column(String)  # OpenAI Batch API ids, comma-separated, when mode is "batch"
+    retry_failed = Column(Boolean, default=False)  # processes Failed products instead of Pending ones
+    total_count = Column(Integer, default=0)
+    completed_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    cache_hits = Column(Integer, default=0)
+    deduplicated_count = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0)  # prompt tokens served from the provider's prompt cache
+    completion_tokens = Column(Integer, default=0)
     error_message = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "batch_id": self.batch_id,
+            "retry_failed": bool(self.retry_failed),
+            "total_count": self.total_count or 0,
+            "completed_count": self.completed_count or 0,
+            "failed_count": self.failed_count or 0,
+            "cache_hits": self.cache_hits or 0,
+            "deduplicated_count": self.deduplicated_count or 0,
+            "prompt_tokens": self.prompt_tokens or 0,
+            "cached_tokens": self.cached_tokens or 0,
+            "completion_tokens": self.completion_tokens or 0,
+            "error_message": self.error_message,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+# ResponseCache table
+class CachedResponse(Base):
+    __tablename__ = "response_cache"
+
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    ai_model = Column(String)
+    prompt_type = Column(String)
+    response = Column(Text, nullable=False)  # parsed AI response as JSON
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 # Logs table
 class Log(Base):
@@ -81,3 +155,21 @@ class Log(Base):
     event_type = Column(String)
     message = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
+
+# Processed product images cached on disk
+class ImageCacheEntry(Base):
+    __tablename__ = "image_cache"
+
+    id = Column(Integer, primary_key=True)
+    url = Column(String, unique=True, index=True, nullable=False)
+    normalized_url = Column(String, index=True)  # see normalize_image_url
+    content_hash = Column(String, index=True, nullable=False)  # SHA-256 of the downloaded image
+    perceptual_hash = Column(String, index=True)  # same for visually identical copies
+    encoding = Column(String)  # how the stored thumbnail was produced
+    file_path = Column(String, nullable=False)
+    size_bytes = Column(Integer, default=0)
+    etag = Column(String)
+    last_modified = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    validated_at = Column(DateTime, default=datetime.utcnow)  # last time the source was checked
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -11,6 +11,7 @@ def include_routers():
     from app.routes.dashboard import router as dashboard_router
     from app.routes.download import router as download_router
     from app.routes.process_products import router as process_products_router
+    from app.routes.jobs import router as jobs_router
 
     # Include all routers here
     router.include_router(auth_router, tags=["Authentication"])
@@ -18,6 +19,7 @@ def include_routers():
     router.include_router(dashboard_router, tags=["Dashboard"])
     router.include_router(download_router, tags=["Download"])
     router.include_router(process_products_router, tags=["Process Products"])
+    router.include_router(jobs_router, tags=["Jobs"])
 
 
 include_routers()
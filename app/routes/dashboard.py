@@ -10,7 +10,8 @@ import os
 from app.models import UploadedFile, Setting
 from app.db import get_async_session
 from app.auth import basic_auth
-from app.models import Product, UploadedFile, User
+from app.services.upload_store import delete_stored_upload
+from app.models import FailedEntry, Product, ProductFingerprint, UploadedFile, User, GenerationJob
 
 
 
@@ -45,11 +46,31 @@ async def dashboard(
         current_settings = settings_result.scalar_one_or_none()
         print(f"Debug: Current settings type: {type(current_settings)}")
 
+        # Get the latest generation job so its progress can be polled
+        job_result = await session.execute(
+            select(GenerationJob)
+            .where(GenerationJob.user_id == user.id)
+            .order_by(GenerationJob.created_at.desc())
+            .limit(1)
+        )
+        latest_job = job_result.scalar_one_or_none()
+
+        # Products that failed permanently, with the recorded reason
+        failed_result = await session.execute(
+            select(FailedEntry)
+            .join(Product, Product.id == FailedEntry.product_id)
+            .where((Product.user_id == user.id) & (Product.status == "Failed"))
+            .order_by(FailedEntry.created_at.desc())
+        )
+        failed_entries = failed_result.scalars().all()
+
         return templates.TemplateResponse("dashboard.html", {
             "request": request,
             "user": user,  # Pass the user directly
             "files": files,
-            "settings": current_settings
+            "settings": current_settings,
+            "job": latest_job,
+            "failed_entries": failed_entries
         })
     except Exception as e:
         print(f"Error loading dashboard: {str(e)}")
@@ -74,6 +95,12 @@ async def clear_all_data(
             raise TypeError("Expected user to be an instance of User")
 
         # Proceed with data clearing logic - using ORM delete
+        await session.execute(
+            delete(FailedEntry).where(
+                FailedEntry.product_id.in_(select(Product.id).where(Product.user_id == user.id))
+            )
+        )
+        await session.execute(delete(ProductFingerprint).where(ProductFingerprint.user_id == user.id))
         await session.execute(delete(Product).where(Product.user_id == user.id))
 
         # Using proper ORM query to get UploadedFile objects
@@ -86,6 +113,7 @@ async def clear_all_data(
             file_path = os.path.join("temp", f"{file.id}_{file.file_name}")
             if os.path.exists(file_path):
                 os.remove(file_path)
+            delete_stored_upload(file.id)
 
         # Using ORM delete for consistency
         await session.execute(delete(UploadedFile).where(UploadedFile.user_id == user.id))
@@ -0,0 +1,147 @@
+# File: app/routes/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import RedirectResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.db import get_async_session
+from app.auth import basic_auth
+from app.models import GenerationJob, Product
+from app.services.job_queue import job_queue
+from urllib.parse import quote
+
+
+router = APIRouter()
+
+
+@router.get("/jobs/latest")
+async def get_latest_job_status(
+        user = Depends(basic_auth),
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Return the progress of the user's most recent generation job."""
+    result = await session.execute(
+        select(GenerationJob)
+        .where(GenerationJob.user_id == user.id)
+        .order_by(GenerationJob.created_at.desc())
+        .limit(1)
+    )
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code = 404, detail = "No generation jobs found.")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(
+        job_id: int,
+        user = Depends(basic_auth),
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Return the progress of a generation job as JSON."""
+    result = await session.execute(
+        select(GenerationJob).where(
+            (GenerationJob.id == job_id) &
+            (GenerationJob.user_id == user.id)
+        )
+    )
+    job = result.scalar_one_or_none()
+    if not job:
+        raise HTTPException(status_code = 404, detail = "Job not found or access denied.")
+    return job.to_dict()
+
+
+@router.post("/jobs/{job_id}/resume")
+async def resume_job(
+        job_id: int,
+        user = Depends(basic_auth),
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Re-queue a failed job; it continues with the products that are still pending."""
+    try:
+        result = await session.execute(
+            select(GenerationJob).where(
+                (GenerationJob.id == job_id) &
+                (GenerationJob.user_id == user.id)
+            )
+        )
+        job = result.scalar_one_or_none()
+        if not job:
+            raise HTTPException(status_code = 404, detail = "Job not found or access denied.")
+
+        if job.status != "failed":
+            message = f"Generation job {job.id} is {job.status} and cannot be resumed."
+            return RedirectResponse(url = f"/dashboard?error={quote(message)}", status_code = 303)
+
+        active_result = await session.execute(
+            select(GenerationJob).where(
+                (GenerationJob.user_id == user.id) &
+                (GenerationJob.status.in_(["queued", "running"]))
+            )
+        )
+        active_job = active_result.scalars().first()
+        if active_job:
+            message = f"Generation job {active_job.id} is already {active_job.status}; wait for it before resuming job {job.id}."
+            return RedirectResponse(
+                url = f"/dashboard?error={quote(message)}&job_id={active_job.id}",
+                status_code = 303
+            )
+
+        job.status = "queued"
+        await session.commit()
+        await job_queue.enqueue(job.id)
+
+        message = f"Generation job {job.id} resumed."
+        return RedirectResponse(url = f"/dashboard?message={quote(message)}&job_id={job.id}", status_code = 303)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error resuming job {job_id}: {e}")
+        return RedirectResponse(url = f"/dashboard?error={quote(str(e))}", status_code = 303)
+
+
+@router.post("/jobs/retry-failed")
+async def retry_failed_products(
+        user = Depends(basic_auth),
+        session: AsyncSession = Depends(get_async_session)
+):
+    """Queue a job that regenerates only the user's products marked `Failed`."""
+    try:
+        failed_result = await session.execute(
+            select(func.count(Product.id)).where(
+                (Product.user_id == user.id) &
+                (Product.status == "Failed")
+            )
+        )
+        failed_count = failed_result.scalar_one()
+        if not failed_count:
+            return RedirectResponse(url = "/dashboard?message=No failed products to retry.", status_code = 303)
+
+        active_result = await session.execute(
+            select(GenerationJob).where(
+                (GenerationJob.user_id == user.id) &
+                (GenerationJob.status.in_(["queued", "running"]))
+            )
+        )
+        active_job = active_result.scalars().first()
+        if active_job:
+            message = f"Generation job {active_job.id} is already {active_job.status}."
+            return RedirectResponse(
+                url = f"/dashboard?message={quote(message)}&job_id={active_job.id}",
+                status_code = 303
+            )
+
+        job = GenerationJob(user_id = user.id, status = "queued", mode = "interactive", retry_failed = True,
+                            total_count = failed_count)
+        session.add(job)
+        await session.commit()
+        await session.refresh(job)
+        await job_queue.enqueue(job.id)
+
+        message = f"Generation job {job.id} queued to retry {failed_count} failed products."
+        return RedirectResponse(url = f"/dashboard?message={quote(message)}&job_id={job.id}", status_code = 303)
+
+    except Exception as e:
+        print(f"Error retrying failed products: {e}")
+        return RedirectResponse(url = f"/dashboard?error={quote(str(e))}", status_code = 303)
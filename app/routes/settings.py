@@ -82,7 +82,8 @@ async def post_settings(
         base_prompt_type: str = Form(...),
         user: dict = Depends(basic_auth),
         session: AsyncSession = Depends(get_async_session),
-        use_base64_image: bool = Form(False)
+        use_base64_image: bool = Form(False),
+        bypass_response_cache: bool = Form(False)
 ):
     print(f"Debug: Saving settings for user {user.id}")
     print(f"Debug: Form data - model: {type(ai_model)}, temperature: {type(temperature)}")
@@ -130,6 +131,7 @@ async def post_settings(
             existing_settings.base_default_prompt = base_default_prompt
             existing_settings.updated_at = datetime.utcnow()
             existing_settings.use_base64_image = use_base64_image
+            existing_settings.bypass_response_cache = bypass_response_cache
         else:
             print("Debug: Creating new settings record")
             new_settings = Setting(
@@ -141,6 +143,7 @@ async def post_settings(
                 base_prompt_type = base_prompt_type,
                 base_default_prompt = base_default_prompt,
                 use_base64_image = use_base64_image,
+                bypass_response_cache = bypass_response_cache,
                 created_at = datetime.utcnow(),
                 updated_at = datetime.utcnow()
             )
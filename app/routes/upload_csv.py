@@ -1,16 +1,12 @@
 # File: app/routes/upload_csv.py
-from fastapi import APIRouter, UploadFile, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, Depends
+from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import datetime, timezone
-from io import StringIO
-import pandas as pd
+from pandas.errors import EmptyDataError
 import os
-import logging
-from pydantic import ValidationError
-from app.services.csv_validation import validate_csv_rows
-from app.models import Product
+from urllib.parse import quote
 from app.db import get_async_session
-from app.services.csv_parser import parse_csv
+from app.services.csv_ingest import ingest_products, spool_upload
 from app.models import UploadedFile
 from app.auth import basic_auth  # Missing import causing NameError
 from app.models.user import User  # Required for type hinting
@@ -19,6 +15,9 @@ from app.models.user import User  # Required for type hinting
 
 router = APIRouter()
 
+# Rejected rows spelled out in the upload result message
+MAX_REPORTED_ROW_ERRORS = 5
+
 
 
 @router.post("/upload-csv")
@@ -42,82 +41,50 @@ async def upload_csv_and_extract_products(
 
         print(f"Debug: Created UploadedFile ID {uploaded_file.id}")
 
-        # Process CSV
-        contents = await file.read()
-        csv_content = contents.decode("utf-8")
-
-        # Save original file for later retrieval
+        # Save original file for later retrieval, streaming it to disk
         temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp")
         os.makedirs(temp_dir, exist_ok = True)
         file_path = os.path.join(temp_dir, f"{uploaded_file.id}_{file.filename}")
 
         print(f"Debug: Saving original file to {file_path}")
-        with open(file_path, "w", encoding = "utf-8") as f:
-            f.write(csv_content)
-
-        # Continue processing with explicit UTF-8 encoding
-        df = pd.read_csv(StringIO(csv_content), dtype = str, encoding = "utf-8")
-        print("Debug: CSV read with UTF-8 encoding")
-        print(f"Data types after read:\n{df.dtypes}")
-        print(f"Debug: CSV file read successfully with {len(df)} rows")
-
-
-        # Filter for rows with non-null Titles (actual products, not variants)
-        total_rows = len(df)
-        product_df = df[df["Title"].notna() & (df["Title"] != "")]
-        product_count = len(product_df)
-        variant_count = total_rows - product_count
-
-        print(f"Debug: Found {product_count} products and {variant_count} variants in CSV")
-
-        # Convert only products to list of dicts
-        raw_data = product_df.replace({pd.NA: None}).to_dict("records")
-        print(f"Debug: Processing {len(raw_data)} product rows (excluding variants)")
-
-        # Create products (only for rows with Title values)
-        products = [
-            Product(
-                uploaded_file_id = uploaded_file.id,
-                user_id = user.id,
-                handle = row["Handle"],
-                input_title = row["Title"],
-                input_body = row["Body (HTML)"],
-                input_image = row["Image Src"],
-                input_seo_title = row["SEO Title"],
-                input_seo_descr = row["SEO Description"],
-                status = "Pending",
-                created_at = datetime.now(timezone.utc)
-            )
-            for row in raw_data
-        ]
-
-        print(f"Debug: Products to add: {len(products)}")
-        if products:
-            print(f"Debug: First product handle: {products[0].handle}")
-        session.add_all(products)
+        await spool_upload(file, file_path)
+
+        # Parse and insert in row batches; only rows with a Title are products, the rest are variants
+        try:
+            ingested = await ingest_products(session, file_path, uploaded_file.id, user.id)
+        except Exception:
+            await session.rollback()
+            uploaded_file.status = "Failed"
+            await session.commit()
+            raise
+        uploaded_file.status = "Completed"
         await session.commit()
-        print(f"Debug: {len(products)} products added to the database")
+        if ingested.stored_path:
+            # Downloads read the stored copy; the spooled CSV is no longer needed
+            os.remove(file_path)
+        print(f"Debug: {ingested.product_count} products added to the database, {ingested.variant_count} variants skipped")
 
         # Store success message in session or use query parameter for redirect
-        from fastapi.responses import RedirectResponse
-        from urllib.parse import quote
-
-        success_message = f"Successfully processed {len(products)} products (excluded {variant_count} variants)"
+        success_message = (f"Successfully processed {ingested.product_count} products "
+                           f"(excluded {ingested.variant_count} variants)")
+        if ingested.unchanged_count:
+            success_message += (f". {ingested.unchanged_count} unchanged products kept their generated content; "
+                                f"{ingested.changed_count} changed and {ingested.new_count} new products "
+                                f"are pending generation")
+        row_errors = ingested.row_errors
+        if row_errors:
+            for row_error in row_errors:
+                print(f"Debug: Rejected CSV {row_error}")
+            examples = "; ".join(str(row_error) for row_error in row_errors[:MAX_REPORTED_ROW_ERRORS])
+            more = f"; and {len(row_errors) - MAX_REPORTED_ROW_ERRORS} more" if len(row_errors) > MAX_REPORTED_ROW_ERRORS else ""
+            success_message += f". Skipped {len(row_errors)} invalid rows: {examples}{more}"
         return RedirectResponse(
             url = f"/dashboard?message={quote(success_message)}",
             status_code = 303
         )
 
-    except ValidationError as e:
-        print(f"Debug: CSV validation failed: {e}")
-        from fastapi.responses import RedirectResponse
-        return RedirectResponse(
-            url = "/dashboard?error=CSV validation failed",
-            status_code = 303
-        )
-    except pd.errors.EmptyDataError:
+    except EmptyDataError:
         print("Debug: Empty CSV file detected")
-        from fastapi.responses import RedirectResponse
         return RedirectResponse(
             url = "/dashboard?error=Empty CSV file",
             status_code = 303
@@ -126,7 +93,6 @@ async def upload_csv_and_extract_products(
         print(f"Debug: CSV processing error: {e}")
         import traceback
         traceback.print_exc()
-        from fastapi.responses import RedirectResponse
         return RedirectResponse(
             url = f"/dashboard?error={quote(str(e))}",
             status_code = 303
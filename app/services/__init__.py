@@ -1,6 +1,14 @@
 # app/services/__init__.py
-from app.services.csv_parser import parse_csv
-from app.services.csv_validation import validate_csv_rows
+# Imported on first use, so image worker processes importing app.services.image_worker
+# don't load pandas and pydantic
 
-__all__ = ["parse_csv", "validate_csv_rows"]
+
+def __getattr__(name):
+    if name in ("validate_csv_frame", "validate_csv_rows"):
+        from app.services import csv_validation
+        return getattr(csv_validation, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["validate_csv_frame", "validate_csv_rows"]
 print("Debug: Initializing services package - importing modules")
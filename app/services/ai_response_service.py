@@ -1,6 +1,6 @@
 # File: app/services/ai_response_service.py
 import json
-from typing import Dict
+from typing import Dict, List
 
 
 class AIResponseService:
@@ -73,5 +73,50 @@ class AIResponseService:
         return result
 
 
+    @staticmethod
+    def parse_packed_response(response_text: str, handles: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Split a multi-product response into per-product results keyed by handle.
+
+        Accepts {"products": [{"handle": ...}, ...]}, a bare list of such
+        entries, or an object keyed by handle. Entries for unknown handles,
+        duplicates and entries without a body are dropped, so the caller can
+        retry the missing products individually.
+        """
+        print(f"Debug: Parsing packed AI response for {len(handles)} products")
+
+        try:
+            data = json.loads(response_text)
+        except (json.JSONDecodeError, TypeError) as e:
+            print(f"Debug: Packed response is not valid JSON: {str(e)}")
+            return {}
+
+        if isinstance(data, dict) and isinstance(data.get("products"), (list, dict)):
+            data = data["products"]
+        if isinstance(data, dict):
+            data = [dict(entry, handle = handle) for handle, entry in data.items() if isinstance(entry, dict)]
+        if not isinstance(data, list):
+            return {}
+
+        wanted = set(handles)
+        results = {}
+        for entry in data:
+            if not isinstance(entry, dict):
+                continue
+            handle = str(entry.get("handle", ""))
+            if handle not in wanted or handle in results:
+                continue
+            result = {
+                "body_html": str(entry.get("BODY_HTML") or ""),
+                "seo_title": str(entry.get("SEO_TITLE") or ""),
+                "seo_description": str(entry.get("SEO_DESCRIPTION") or "")
+            }
+            if result["body_html"]:
+                results[handle] = result
+
+        print(f"Debug: Packed response contained {len(results)} of {len(handles)} products")
+        return results
+
+
 # Create a singleton instance
 ai_response_service = AIResponseService()
@@ -0,0 +1,316 @@
+# File: app/services/batch_service.py
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.image_prefetch import release_image
+from app.services.llm_providers import get_provider, mock_completion_content
+from app.services.openai_service import build_chat_request, clean_product_info
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def product_custom_id(product_id: int) -> str:
+    return f"product-{product_id}"
+
+
+def product_id_from_custom_id(custom_id: str) -> Optional[int]:
+    try:
+        return int(custom_id.rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def build_batch_line(product_id: int, request_body: dict) -> str:
+    """One JSONL line of a Batch API input file."""
+    return json.dumps({
+        "custom_id": product_custom_id(product_id),
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": request_body
+    }, ensure_ascii = False)
+
+
+async def build_batch_files(
+        products,
+        user_settings,
+        path_prefix: str,
+        on_error: Optional[Callable[[object, Exception], Awaitable[None]]] = None
+) -> List[str]:
+    """
+    Write the Batch API input files for `products` and return their paths.
+
+    Each request body comes from `build_chat_request`, the same builder the
+    interactive path uses, so images are embedded the same way too. A new
+    file (`{path_prefix}_{n}.jsonl`) is started whenever the next request
+    would exceed `BATCH_MAX_REQUESTS` or `BATCH_MAX_FILE_BYTES`, so every
+    file can be submitted as one batch.
+
+    When a product's request cannot be built (e.g. its image fails to
+    download), it is left out of the files and passed to `on_error`;
+    without `on_error` the error is raised.
+    """
+    paths: List[str] = []
+    f = None
+    count = size = 0
+    try:
+        for product in products:
+            try:
+                # HTML cleanup is CPU-bound, keep it off the event loop
+                product_info = await asyncio.to_thread(clean_product_info, {
+                    "title": product.input_title,
+                    "description": product.input_body,
+                    "image_url": product.input_image
+                }, user_settings.ai_model)
+                request_body = await build_chat_request(
+                    product_info = product_info,
+                    ai_model = user_settings.ai_model,
+                    temperature = float(user_settings.temperature),
+                    max_tokens = user_settings.max_tokens,
+                    prompt_type = user_settings.base_prompt_type,
+                    use_base64_image = user_settings.use_base64_image
+                )
+            except Exception as e:
+                release_image(product.input_image)
+                if on_error is None:
+                    raise
+                await on_error(product, e)
+                continue
+            line = (build_batch_line(product.id, request_body) + "\n").encode("utf-8")
+            if f is None or count >= settings.BATCH_MAX_REQUESTS or size + len(line) > settings.BATCH_MAX_FILE_BYTES:
+                if f is not None:
+                    f.close()
+                    print(f"Debug: Wrote {count} batch requests ({size} bytes) to {paths[-1]}")
+                paths.append(f"{path_prefix}_{len(paths) + 1}.jsonl")
+                f = open(paths[-1], "wb")
+                count = size = 0
+            f.write(line)
+            release_image(product.input_image)
+            count += 1
+            size += len(line)
+    finally:
+        if f is not None:
+            f.close()
+    if paths:
+        print(f"Debug: Wrote {count} batch requests ({size} bytes) to {paths[-1]}")
+    return paths
+
+
+def parse_batch_output_line(line: str) -> Dict:
+    """
+    Decode one line of a Batch API output file.
+
+    Returns a dict with `product_id`, `usage`, and either `content` (the
+    model's raw message text) or `error` with its HTTP `status_code`, when known.
+    """
+    record = json.loads(line)
+    result = {
+        "product_id": product_id_from_custom_id(record.get("custom_id", "")),
+        "content": None,
+        "error": None,
+        "status_code": None,
+        "usage": None
+    }
+
+    response = record.get("response") or {}
+    if record.get("error"):
+        result["error"] = record["error"].get("message") or str(record["error"])
+    elif response.get("status_code") != 200:
+        result["status_code"] = response.get("status_code")
+        body = response.get("body") or {}
+        result["error"] = (body.get("error") or {}).get("message") or f"HTTP {response.get('status_code')}"
+    else:
+        result["content"] = response["body"]["choices"][0]["message"]["content"]
+        result["usage"] = response["body"].get("usage")
+    return result
+
+
+async def iter_file_lines(batch_client, file_id: str) -> AsyncIterator[str]:
+    """Stream a result file line by line instead of loading it whole."""
+    async with batch_client.files.with_streaming_response.content(file_id) as response:
+        async for line in response.iter_lines():
+            if line.strip():
+                yield line
+
+
+async def submit_batch(batch_client, file_path: str) -> str:
+    """Upload the input file and create a batch; return the batch id."""
+    # The open file is streamed in chunks by the HTTP client, not read into memory
+    with open(file_path, "rb") as f:
+        input_file = await batch_client.files.create(file = (os.path.basename(file_path), f), purpose = "batch")
+    batch = await batch_client.batches.create(
+        input_file_id = input_file.id,
+        endpoint = BATCH_ENDPOINT,
+        completion_window = settings.BATCH_COMPLETION_WINDOW
+    )
+    print(f"Debug: Submitted batch {batch.id} with input file {input_file.id}")
+    return batch.id
+
+
+async def wait_for_batch(batch_client, batch_id: str, poll_interval: Optional[float] = None):
+    """Poll a batch until it reaches a terminal status and return it."""
+    poll_interval = settings.BATCH_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+    while True:
+        batch = await batch_client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        print(f"Debug: Batch {batch_id} status: {batch.status}"
+              f"{f', {counts.completed}/{counts.total} done' if counts else ''}")
+        if batch.status in TERMINAL_BATCH_STATUSES:
+            return batch
+        await asyncio.sleep(poll_interval)
+
+
+class _LocalStreamedContent:
+    def __init__(self, path: Path):
+        self.path = path
+
+    async def iter_lines(self) -> AsyncIterator[str]:
+        with open(self.path, "r", encoding = "utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+class _LocalFiles:
+    def __init__(self, backend: "LocalBatchClient"):
+        self.backend = backend
+        self.with_streaming_response = SimpleNamespace(content = self._streamed_content)
+
+    async def create(self, file, purpose: str):
+        # (name, bytes or binary file object), like the SDK accepts
+        name, content = file
+        file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        path = self.backend.root / file_id
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            with open(path, "wb") as dst:
+                await asyncio.to_thread(shutil.copyfileobj, content, dst)
+        return SimpleNamespace(id = file_id, filename = name, purpose = purpose, bytes = path.stat().st_size)
+
+    async def content(self, file_id: str):
+        data = (self.backend.root / file_id).read_bytes()
+        return SimpleNamespace(content = data, text = data.decode("utf-8"))
+
+    @asynccontextmanager
+    async def _streamed_content(self, file_id: str):
+        yield _LocalStreamedContent(self.backend.root / file_id)
+
+
+class _LocalBatches:
+    def __init__(self, backend: "LocalBatchClient"):
+        self.backend = backend
+
+    def _save(self, batch: SimpleNamespace) -> None:
+        state = dict(vars(batch), request_counts = vars(batch.request_counts))
+        (self.backend.root / f"{batch.id}.json").write_text(json.dumps(state), encoding = "utf-8")
+
+    def _load(self, batch_id: str) -> Optional[SimpleNamespace]:
+        path = self.backend.root / f"{batch_id}.json"
+        if not path.exists():
+            return None
+        state = json.loads(path.read_text(encoding = "utf-8"))
+        state["request_counts"] = SimpleNamespace(**state["request_counts"])
+        return SimpleNamespace(**state)
+
+    async def create(self, input_file_id: str, endpoint: str, completion_window: str):
+        batch_id = f"batch-local-{uuid.uuid4().hex[:12]}"
+        batch = SimpleNamespace(
+            id = batch_id,
+            status = "validating",
+            endpoint = endpoint,
+            input_file_id = input_file_id,
+            output_file_id = None,
+            error_file_id = None,
+            completion_window = completion_window,
+            created_at = int(time.time()),
+            request_counts = SimpleNamespace(total = 0, completed = 0, failed = 0)
+        )
+        self._save(batch)
+        return batch
+
+    async def retrieve(self, batch_id: str):
+        batch = self._load(batch_id)
+        if batch is None:
+            raise KeyError(f"Batch not found: {batch_id}")
+        # Advance one step per poll: validating -> in_progress -> completed
+        if batch.status == "validating":
+            batch.status = "in_progress"
+        elif batch.status == "in_progress":
+            self.backend.run_batch(batch)
+        self._save(batch)
+        return batch
+
+
+class LocalBatchClient:
+    """
+    Offline stand-in for the OpenAI files and batches endpoints.
+
+    Stores files under `temp/local_batches` and answers every request with a
+    deterministic JSON completion built from the product title, so the batch
+    execution mode can be exercised without network access. Batch state is
+    kept on disk so polling survives an application restart.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp", "local_batches"))
+        self.root.mkdir(parents = True, exist_ok = True)
+        self.files = _LocalFiles(self)
+        self.batches = _LocalBatches(self)
+
+    @staticmethod
+    def respond(custom_id: str, body: dict) -> dict:
+        content = mock_completion_content(body.get("messages", []))
+        return {
+            "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+            "custom_id": custom_id,
+            "response": {
+                "status_code": 200,
+                "request_id": uuid.uuid4().hex,
+                "body": {
+                    "object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                }
+            },
+            "error": None
+        }
+
+    def run_batch(self, batch: SimpleNamespace) -> None:
+        output_file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        total = 0
+        with open(self.root / batch.input_file_id, "r", encoding = "utf-8") as src, \
+                open(self.root / output_file_id, "w", encoding = "utf-8") as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                dst.write(json.dumps(self.respond(request["custom_id"], request["body"])) + "\n")
+                total += 1
+        batch.output_file_id = output_file_id
+        batch.request_counts = SimpleNamespace(total = total, completed = total, failed = 0)
+        batch.status = "completed"
+
+
+_local_batch_client: Optional[LocalBatchClient] = None
+
+
+def get_batch_client():
+    """Return the client used for files/batches calls, per `BATCH_BACKEND`."""
+    global _local_batch_client
+    if settings.BATCH_BACKEND == "local":
+        if _local_batch_client is None:
+            _local_batch_client = LocalBatchClient()
+        return _local_batch_client
+    return get_provider().client
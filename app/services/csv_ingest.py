@@ -0,0 +1,154 @@
+# File: app/services/csv_ingest.py
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import UploadFile
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Product
+from app.services.csv_reader import detect_encoding, iter_csv_frames, read_csv_header
+from app.services.csv_validation import REQUIRED_COLUMNS, RowError, validate_csv_frame
+from app.services.product_fingerprints import classify_products, load_settings_digest
+from app.services.product_store import bulk_insert_products
+from app.services.upload_store import delete_stored_upload, upload_store_writer
+
+
+async def spool_upload(upload: UploadFile, path: str, chunk_size: Optional[int] = None) -> int:
+    """Copy an upload to `path` chunk by chunk, never holding the whole file in memory."""
+    chunk_size = chunk_size or settings.CSV_SPOOL_CHUNK_BYTES
+    size = 0
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            await asyncio.to_thread(f.write, chunk)
+            size += len(chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+    print(f"Debug: Spooled {size} bytes to {path}")
+    return size
+
+
+def _product_rows(chunk: pd.DataFrame) -> Tuple[List[Dict], List[RowError]]:
+    """Validate one parsed batch; its product rows (variants have no Title) as Product column dicts, and row errors."""
+    result = validate_csv_frame(chunk)
+    # Cells left empty in the CSV are stored as NULL
+    products = result.products.astype(object).where(result.products != "", None)
+    # The chunk's index continues across the file; it maps stored upload rows to products
+    products["source_row"] = products.index
+    return products.to_dict("records"), result.errors
+
+
+async def iter_product_batches(
+        path: str,
+        batch_rows: Optional[int] = None
+) -> AsyncIterator[Tuple[pd.DataFrame, List[Dict], List[RowError]]]:
+    """
+    Parse and validate a Shopify product CSV in batches of `batch_rows` rows.
+
+    Parsing runs in a worker thread, one batch at a time, so memory stays
+    bounded by the batch size; see `iter_csv_frames` for engines and
+    encodings. Yields each parsed batch (products, variants and rejected
+    rows), its product rows, and the errors of the rows that were rejected.
+
+    Raises:
+        ValueError: If a required column is missing.
+        pd.errors.EmptyDataError: If the file is empty.
+    """
+    batch_rows = batch_rows or settings.CSV_BATCH_ROWS
+    encoding = await asyncio.to_thread(detect_encoding, path)
+    header = await asyncio.to_thread(read_csv_header, path, encoding)
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+
+    frames = iter_csv_frames(path, batch_rows, encoding = encoding)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, frames, None)
+            if chunk is None:
+                break
+            rows, errors = await asyncio.to_thread(_product_rows, chunk)
+            yield chunk, rows, errors
+    finally:
+        frames.close()
+
+
+@dataclass
+class IngestResult:
+    """What an upload added: products by fingerprint class, skipped variants and rejected rows."""
+    product_count: int = 0
+    variant_count: int = 0
+    row_errors: List[RowError] = field(default_factory = list)
+    # See classify_products; all products are new when incremental uploads are off
+    new_count: int = 0
+    changed_count: int = 0
+    unchanged_count: int = 0
+    # Parquet copy of the upload written by UploadStoreWriter, if any
+    stored_path: Optional[str] = None
+
+
+async def discard_ingested(session: AsyncSession, uploaded_file_id: int) -> None:
+    """Remove what a failed ingestion left behind: its committed products and stored copy."""
+    await session.rollback()
+    await session.execute(delete(Product).where(Product.uploaded_file_id == uploaded_file_id))
+    await session.commit()
+    await asyncio.to_thread(delete_stored_upload, uploaded_file_id)
+
+
+async def ingest_products(session: AsyncSession, path: str, uploaded_file_id: int, user_id: int) -> IngestResult:
+    """
+    Insert the products of a spooled CSV batch by batch.
+
+    Each batch is committed as soon as it is parsed, so the first products
+    are visible before the rest of a large export has been read. If a later
+    batch fails, the batches already committed are deleted again, so a
+    failed upload never leaves a partial set of `Pending` products behind.
+    With `settings.INCREMENTAL_UPLOADS`, products whose inputs match the
+    user's last generated version are inserted as `Completed` with that
+    content. When pyarrow is installed, the parsed rows are also stored as
+    Parquet for downloads.
+    """
+    ingested = IngestResult()
+    row_count = 0
+    store = upload_store_writer(uploaded_file_id)
+    settings_digest = await load_settings_digest(session, user_id) if settings.INCREMENTAL_UPLOADS else ""
+    try:
+        async for chunk, rows, errors in iter_product_batches(path):
+            if store is not None:
+                await asyncio.to_thread(store.write, chunk)
+            created_at = datetime.now(timezone.utc)
+            for row in rows:
+                row.update(uploaded_file_id = uploaded_file_id, user_id = user_id, status = "Pending",
+                           created_at = created_at)
+            if settings.INCREMENTAL_UPLOADS:
+                counts = await classify_products(session, user_id, rows, settings_digest)
+            else:
+                counts = {"new": len(rows), "changed": 0, "unchanged": 0}
+            await bulk_insert_products(session, rows)
+            await session.commit()
+            ingested.product_count += len(rows)
+            ingested.new_count += counts["new"]
+            ingested.changed_count += counts["changed"]
+            ingested.unchanged_count += counts["unchanged"]
+            ingested.row_errors.extend(errors)
+            row_count += len(chunk)
+            print(f"Debug: Ingested batch of {len(chunk)} rows ({counts}), {ingested.product_count} products "
+                  f"so far, {len(errors)} rows rejected")
+        if store is not None:
+            ingested.stored_path = await asyncio.to_thread(store.close)
+    except BaseException:
+        if store is not None:
+            await asyncio.to_thread(store.abort)
+        print(f"Debug: Ingestion of upload {uploaded_file_id} failed; discarding its products")
+        await asyncio.shield(discard_ingested(session, uploaded_file_id))
+        raise
+    ingested.variant_count = row_count - ingested.product_count - len(ingested.row_errors)
+    return ingested
@@ -0,0 +1,208 @@
+# File: app/services/csv_reader.py
+import codecs
+import csv
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from app.config import settings
+
+try:
+    # Multithreaded parsing when pyarrow is installed; otherwise pandas' C parser
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+ENGINES = ("pyarrow", "c")
+
+# Tried in order when a file has no BOM; latin-1 decodes any byte sequence.
+# cp1252 is what Excel on Windows saves "CSV" as.
+CANDIDATE_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
+# Bytes read at a time while checking that a file decodes
+DETECT_CHUNK_BYTES = 1024 * 1024
+
+
+def csv_engine(engine: Optional[str] = None) -> str:
+    """The engine to parse with: `engine` or `settings.CSV_ENGINE`, falling back to "c" without pyarrow."""
+    engine = engine or settings.CSV_ENGINE
+    if engine not in ("auto",) + ENGINES:
+        raise ValueError(f"Unknown CSV engine: {engine}")
+    if engine == "c":
+        return "c"
+    if pa_csv is None:
+        if engine == "pyarrow":
+            print("Debug: pyarrow is not installed, parsing CSV with the pandas C engine")
+        return "c"
+    return "pyarrow"
+
+
+def _decodes(f, encoding: str) -> bool:
+    f.seek(0)
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        while True:
+            chunk = f.read(DETECT_CHUNK_BYTES)
+            decoder.decode(chunk, final = not chunk)
+            if not chunk:
+                return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(path: str) -> str:
+    """
+    Encoding of the CSV at `path`, settled before parsing so it is parsed once.
+
+    A BOM decides it outright. Otherwise the first of `CANDIDATE_ENCODINGS`
+    the whole file decodes with; each check streams the file in
+    `DETECT_CHUNK_BYTES` steps and stops at the first invalid byte.
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(codecs.BOM_UTF8))
+        if head.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+        for encoding in CANDIDATE_ENCODINGS:
+            if _decodes(f, encoding):
+                if encoding != "utf-8":
+                    print(f"Debug: {path} is not UTF-8, reading it as {encoding}")
+                return encoding
+    return CANDIDATE_ENCODINGS[-1]
+
+
+def read_csv_header(path: str, encoding: str) -> List[str]:
+    """
+    Column names of the CSV at `path`, with duplicates suffixed ".1", ".2", ... as pandas does.
+
+    Raises:
+        pd.errors.EmptyDataError: If the file is empty.
+    """
+    with open(path, encoding = encoding, newline = "") as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+
+    names: List[str] = []
+    seen: Dict[str, int] = {}
+    for name in header:
+        if name in seen:
+            seen[name] += 1
+            while f"{name}.{seen[name]}" in seen:
+                seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def _arrow_options(path: str, encoding: str) -> dict:
+    names = read_csv_header(path, encoding)
+    return dict(
+        read_options = pa_csv.ReadOptions(
+            use_threads = True,
+            column_names = names,
+            skip_rows = 1,
+            # Arrow skips a UTF-8 BOM itself
+            encoding = "utf8" if encoding in ("utf-8", "utf-8-sig") else encoding,
+        ),
+        # Shopify bodies are HTML with line breaks inside quoted cells
+        parse_options = pa_csv.ParseOptions(newlines_in_values = True),
+        convert_options = pa_csv.ConvertOptions(
+            column_types = {name: pa.string() for name in names},
+            null_values = [""],
+            strings_can_be_null = True,
+            quoted_strings_can_be_null = True,
+        ),
+    )
+
+
+def _arrow_frame(table, start: int = 0) -> pd.DataFrame:
+    df = table.to_pandas()
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def _read_c(path: str, encoding: str, **kwargs):
+    return pd.read_csv(path, dtype = str, encoding = encoding, keep_default_na = False, na_values = [""], **kwargs)
+
+
+def read_csv_file(path: str, engine: Optional[str] = None, encoding: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a whole CSV with every column as text; empty cells are missing.
+
+    Both engines give the same frame: column names as in the header
+    (duplicates suffixed), a RangeIndex, and no values other than empty
+    cells read as missing (a Handle of "NA" stays "NA"). The encoding is
+    detected when not given. A file the pyarrow engine rejects (e.g. rows
+    with a missing field) is re-read with the C engine.
+
+    Raises:
+        pd.errors.EmptyDataError: If the file is empty.
+    """
+    encoding = encoding or detect_encoding(path)
+    engine = csv_engine(engine)
+    print(f"Debug: Reading {path} with the {engine} CSV engine, encoding {encoding}")
+    if engine == "pyarrow":
+        try:
+            return _arrow_frame(pa_csv.read_csv(path, **_arrow_options(path, encoding)))
+        except pa.ArrowInvalid as e:
+            print(f"Debug: pyarrow could not parse {path} ({e}), retrying with the C engine")
+    return _read_c(path, encoding)
+
+
+def iter_csv_frames(
+        path: str,
+        batch_rows: int,
+        engine: Optional[str] = None,
+        encoding: Optional[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV as frames of `batch_rows` rows, like `read_csv_file` in pieces.
+
+    Each frame's RangeIndex carries on from the previous one, so index + 1
+    is the data row number in the file. Memory is bounded by the batch size.
+    Close the iterator to release the file early.
+
+    Raises:
+        pd.errors.EmptyDataError: If the file is empty.
+        ValueError: If pyarrow rejects a row after earlier frames were yielded.
+    """
+    encoding = encoding or detect_encoding(path)
+    engine = csv_engine(engine)
+    print(f"Debug: Reading {path} in batches of {batch_rows} rows with the {engine} CSV engine, encoding {encoding}")
+    if engine == "pyarrow":
+        start = 0
+        try:
+            reader = pa_csv.open_csv(path, **_arrow_options(path, encoding))
+            try:
+                pending = []
+                pending_rows = 0
+                for record_batch in reader:
+                    pending.append(record_batch)
+                    pending_rows += record_batch.num_rows
+                    while pending_rows >= batch_rows:
+                        table = pa.Table.from_batches(pending, schema = reader.schema)
+                        yield _arrow_frame(table.slice(0, batch_rows), start)
+                        start += batch_rows
+                        rest = table.slice(batch_rows)
+                        pending = rest.to_batches()
+                        pending_rows = rest.num_rows
+                if pending_rows:
+                    yield _arrow_frame(pa.Table.from_batches(pending, schema = reader.schema), start)
+                return
+            finally:
+                reader.close()
+        except pa.ArrowInvalid as e:
+            if start:
+                raise ValueError(f"Could not parse CSV after row {start}: {e}") from e
+            print(f"Debug: pyarrow could not parse {path} ({e}), retrying with the C engine")
+
+    reader = _read_c(path, encoding, chunksize = batch_rows)
+    try:
+        yield from reader
+    finally:
+        reader.close()
@@ -1,6 +1,9 @@
 # File: app/services/csv_validation.py
-from pydantic import BaseModel, Field, ValidationError
-from typing import List, Dict
+from dataclasses import dataclass, field
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing import List, Dict, Optional, Tuple
+
+import pandas as pd
 
 
 
@@ -14,29 +17,112 @@ class ProductCSVRow(BaseModel):
 
     class Config:
         populate_by_name = True
+        # Spreadsheet-typed cells (e.g. a numeric Handle) are kept as text
+        coerce_numbers_to_str = True
+
+
+# CSV column -> ProductCSVRow field
+REQUIRED_COLUMNS = {
+    model_field.alias: name for name, model_field in ProductCSVRow.model_fields.items()
+}
+
+_rows_adapter = TypeAdapter(List[ProductCSVRow])
+
+
+@dataclass
+class RowError:
+    """A CSV row that was rejected. `row` is the 1-based data row (the header is not counted)."""
+    row: int
+    column: Optional[str]
+    message: str
 
+    def __str__(self) -> str:
+        return f"row {self.row}{f' ({self.column})' if self.column else ''}: {self.message}"
 
-def validate_csv_rows(data: List[Dict]) -> List[ProductCSVRow]:
+
+@dataclass
+class CSVValidationResult:
+    """Validated product rows (ProductCSVRow field names as columns) and what was left out."""
+    products: pd.DataFrame
+    variant_count: int = 0
+    errors: List[RowError] = field(default_factory = list)
+
+
+def validate_csv_rows(data: List[Dict], row_numbers: Optional[List[int]] = None) -> Tuple[List[ProductCSVRow], List[RowError]]:
     """
+    Validate rows one model at a time with Pydantic, collecting errors.
 
-    :rtype: object
+    Used by `validate_csv_frame` only for rows its column-wise checks can't
+    clear (cells that aren't text). The whole list is validated in one call;
+    rows with errors are reported and left out.
     """
-    validated_rows = []
-    errors = []
+    row_numbers = row_numbers or list(range(1, len(data) + 1))
     print(f"Debug: Validating {len(data)} rows of CSV data")
+    try:
+        return _rows_adapter.validate_python(data), []
+    except ValidationError as e:
+        failed: Dict[int, RowError] = {}
+        for error in e.errors():
+            index = error["loc"][0]
+            column = error["loc"][1] if len(error["loc"]) > 1 else None
+            failed.setdefault(index, RowError(row_numbers[index], column, error["msg"]))
+
+    validated_rows = [ProductCSVRow.model_validate(row) for index, row in enumerate(data) if index not in failed]
+    print(f"Debug: {len(failed)} of {len(data)} rows failed validation")
+    return validated_rows, list(failed.values())
+
+
+def validate_csv_frame(df: pd.DataFrame) -> CSVValidationResult:
+    """
+    Validate a parsed Shopify product CSV column-wise.
+
+    Required columns, cell types, and product/variant rows (variants have no
+    Title) are checked with vectorized DataFrame operations; only rows
+    holding non-text cells go through `validate_csv_rows`. Products without
+    a Handle are rejected. Missing cells become empty strings.
+
+    Raises:
+        ValueError: If required columns are missing.
+    """
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+
+    frame = df[list(REQUIRED_COLUMNS)]
+    if isinstance(df.index, pd.RangeIndex):
+        # Chunks of a chunked read keep counting from the start of the file
+        row_numbers = pd.Series(df.index + 1, index = frame.index)
+    else:
+        row_numbers = pd.Series(range(1, len(frame) + 1), index = frame.index)
+
+    # Cells that are neither text nor missing need the row-level validator
+    needs_model = pd.Series(False, index = frame.index)
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.infer_dtype(values, skipna = True) in ("string", "empty"):
+            continue
+        needs_model |= values.notna() & ~values.map(lambda value: isinstance(value, str))
+
+    is_variant = frame["Title"].isna() | (frame["Title"] == "")
+    missing_handle = ~is_variant & (frame["Handle"].isna() | (frame["Handle"] == ""))
+
+    errors = [RowError(int(row), "Handle", "Handle is required")
+              for row in row_numbers[missing_handle & ~needs_model]]
+
+    checked = ~is_variant & ~missing_handle & ~needs_model
+    products = frame[checked].fillna("").astype(str).rename(columns = REQUIRED_COLUMNS)
+
+    to_model = ~is_variant & needs_model
+    if to_model.any():
+        records = frame[to_model].astype(object).where(frame[to_model].notna(), "").to_dict("records")
+        validated_rows, row_errors = validate_csv_rows(records, [int(row) for row in row_numbers[to_model]])
+        failed_rows = {error.row for error in row_errors}
+        kept_index = [index for index in frame.index[to_model] if row_numbers[index] not in failed_rows]
+        validated = pd.DataFrame([row.model_dump() for row in validated_rows], index = kept_index,
+                                 columns = list(REQUIRED_COLUMNS.values()))
+        products = pd.concat([products, validated])
+        # Back in file order
+        products = products.loc[frame.index[frame.index.isin(products.index)]]
+        errors = sorted(errors + row_errors, key = lambda error: error.row)
 
-    print(type(enumerate(data)))
-    for index, row in enumerate(data):
-        print(f"Debug: Validating row {index}, type: {type(row)}")
-        print(type(index))
-        print(type(row))
-        try:
-            validated_rows.append(ProductCSVRow.model_validate(row))
-            print(f"Debug: Row {index} validated successfully")
-        except ValidationError as e:
-            print(f"Debug: Validation failed for row {index} with errors: {e.errors()}")
-
-    if errors:
-        raise ValidationError(f"CSV validation failed with {len(errors)} errors")
-
-    return validated_rows
+    return CSVValidationResult(products = products, variant_count = int(is_variant.sum()), errors = errors)
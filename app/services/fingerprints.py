@@ -0,0 +1,37 @@
+# File: app/services/fingerprints.py
+import hashlib
+import json
+from typing import Any
+
+
+def stable_hash(*parts: Any) -> str:
+    """SHA-256 hex digest of `parts`, serialized as canonical JSON."""
+    payload = json.dumps(parts, sort_keys = True, ensure_ascii = False, separators = (",", ":"), default = str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(
+        ai_model: str,
+        temperature: float,
+        max_tokens: int,
+        prompt_type: str,
+        prompt_digest: str,
+        title: str,
+        cleaned_description: str,
+        image_identity: str
+) -> str:
+    """
+    Identify a generation request by everything that shapes the model's answer.
+
+    Two products with the same fingerprint would be sent the exact same prompt.
+    """
+    return stable_hash(
+        ai_model,
+        float(temperature),
+        int(max_tokens or 0),
+        prompt_type,
+        prompt_digest,
+        title or "",
+        cleaned_description or "",
+        image_identity or ""
+    )
@@ -0,0 +1,188 @@
+# File: app/services/generation_engine.py
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+from app.config import settings
+
+
+class AttemptClock:
+    """
+    Time an attempt has spent working, not counting `timeout_paused` waits.
+
+    Concurrent waits within one attempt (e.g. a hedged request) pause the
+    clock once, for as long as any of them is still waiting.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.paused_total = 0.0
+        self.waiting = 0
+        self.paused_since = 0.0
+
+    def pause(self) -> None:
+        if self.waiting == 0:
+            self.paused_since = time.monotonic()
+        self.waiting += 1
+
+    def resume(self) -> None:
+        self.waiting -= 1
+        if self.waiting == 0:
+            self.paused_total += time.monotonic() - self.paused_since
+
+    def active_time(self) -> float:
+        now = time.monotonic()
+        paused = self.paused_total + (now - self.paused_since if self.waiting else 0.0)
+        return now - self.started - paused
+
+
+_attempt_clock: contextvars.ContextVar[Optional[AttemptClock]] = contextvars.ContextVar(
+    "attempt_clock", default = None)
+
+
+@contextmanager
+def timeout_paused():
+    """Leave the enclosed wait (circuit breaker, rate limit) out of the current attempt's timeout."""
+    clock = _attempt_clock.get()
+    if clock is None:
+        yield
+        return
+    clock.pause()
+    try:
+        yield
+    finally:
+        clock.resume()
+
+
+@dataclass
+class GenerationResult:
+    """Outcome of generating content for a single item of a batch."""
+    index: int
+    item: Any
+    content: Optional[dict] = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class GenerationEngine:
+    """
+    Run a generation coroutine over many items with a bounded number in flight.
+
+    A fixed pool of workers pulls items from a shared cursor, so at most
+    `concurrency` calls are outstanding and no more than that many tasks exist
+    regardless of catalog size. Errors accepted by `should_retry` are retried
+    up to `max_attempts` times with a jittered backoff, each attempt with its
+    own timeout; waits marked with `timeout_paused` don't count towards it.
+    A failure is recorded on that item's result and never aborts the rest
+    of the batch. Results are returned in input order.
+    """
+
+    def __init__(
+            self,
+            concurrency: Optional[int] = None,
+            timeout: Optional[float] = None,
+            max_attempts: Optional[int] = None,
+            should_retry: Optional[Callable[[BaseException], bool]] = None
+    ):
+        self.concurrency = max(1, concurrency or settings.GENERATION_CONCURRENCY)
+        self.timeout = timeout if timeout is not None else settings.GENERATION_TIMEOUT_SECONDS
+        self.max_attempts = max(1, max_attempts or settings.GENERATION_MAX_ATTEMPTS)
+        self.should_retry = should_retry
+        print(f"Debug: Generation engine created, concurrency: {self.concurrency}, timeout: {self.timeout}")
+
+    async def _with_timeout(self, call: Awaitable[dict]) -> dict:
+        """Await `call`, raising `asyncio.TimeoutError` once it has worked for longer than `timeout`."""
+        clock = AttemptClock()
+        token = _attempt_clock.set(clock)
+        try:
+            # The task copies the context, so the calls it makes see this attempt's clock
+            task = asyncio.ensure_future(call)
+        finally:
+            _attempt_clock.reset(token)
+        try:
+            while True:
+                remaining = self.timeout - clock.active_time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait({task}, timeout = remaining)
+                if done:
+                    return task.result()
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions = True)
+
+    async def _run_one(self, index: int, item: Any, worker: Callable[[Any], Awaitable[dict]]) -> GenerationResult:
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            try:
+                if self.timeout:
+                    content = await self._with_timeout(worker(item))
+                else:
+                    content = await worker(item)
+                return GenerationResult(index = index, item = item, content = content,
+                                        elapsed = time.monotonic() - started, attempts = attempt)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Debug: Generation failed for item {index} (attempt {attempt}): {type(e).__name__}: {e}")
+                if attempt >= self.max_attempts or self.should_retry is None or not self.should_retry(e):
+                    return GenerationResult(index = index, item = item, error = e,
+                                            elapsed = time.monotonic() - started, attempts = attempt)
+            await asyncio.sleep(random.uniform(0, settings.GENERATION_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)))
+            attempt += 1
+
+    async def run(
+            self,
+            items: Sequence[Any],
+            worker: Callable[[Any], Awaitable[dict]],
+            on_result: Optional[Callable[[GenerationResult], Awaitable[None]]] = None
+    ) -> List[GenerationResult]:
+        """
+        Generate content for every item.
+
+        Args:
+            items: Inputs passed one at a time to `worker`.
+            worker: Coroutine function producing the generated content for one item.
+            on_result: Optional coroutine called as soon as each item finishes.
+                If it raises, the remaining work is cancelled and the error propagates.
+
+        Returns:
+            List[GenerationResult]: One result per item, in the same order as `items`.
+        """
+        results: List[Optional[GenerationResult]] = [None] * len(items)
+        cursor = iter(enumerate(items))
+
+        async def worker_loop():
+            for index, item in cursor:
+                result = await self._run_one(index, item, worker)
+                results[index] = result
+                if on_result is not None:
+                    await on_result(result)
+
+        worker_count = min(self.concurrency, len(items))
+        print(f"Debug: Generating {len(items)} items with {worker_count} workers")
+        started = time.monotonic()
+        workers = [asyncio.ensure_future(worker_loop()) for _ in range(worker_count)]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions = True)
+            raise
+
+        failed = sum(1 for r in results if r is not None and not r.ok)
+        print(f"Debug: Generation finished in {time.monotonic() - started:.1f}s, "
+              f"{len(items) - failed} succeeded, {failed} failed")
+        return results
@@ -0,0 +1,474 @@
+# File: app/services/generation_jobs.py
+import asyncio
+import os
+import time
+import traceback
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.models import FailedEntry, GenerationJob, Product, Setting
+from app.services.ai_response_service import ai_response_service
+from app.services.batch_service import (
+    TERMINAL_BATCH_STATUSES, build_batch_files, get_batch_client, iter_file_lines, parse_batch_output_line,
+    submit_batch, wait_for_batch
+)
+from app.services.generation_engine import GenerationEngine, GenerationResult
+from app.services.openai_service import generate_packed_descriptions, generate_product_description, plan_packs
+from app.services.response_cache import response_cache
+from app.services.hedging import hedger
+from app.services.image_cache import image_cache, track_image_paths
+from app.services.image_prefetch import prefetch_images, release_image
+from app.services.product_fingerprints import generation_settings_digest, product_input_hash, record_fingerprints
+from app.services.product_store import ID_CHUNK_SIZE, bulk_insert, bulk_update_products, set_product_status
+from app.services.resilience import FATAL, PERMANENT, TRANSIENT, RequestError, classify_error
+from app.services.single_flight import SingleFlight
+from app.services.usage_tracker import UsageStats, track_usage
+from app.services.text_utils import convert_markdown_to_html, convert_markdown_to_plain_text
+
+
+def generated_content_values(generated_content: dict) -> dict:
+    """Convert the parsed AI response into the product columns it fills."""
+    html_body = convert_markdown_to_html(generated_content["body_html"])
+    print(f"Debug: Converted body_html to HTML: {html_body[:100]}...")  # Log first 100 characters for brevity
+
+    seo_title = convert_markdown_to_plain_text(generated_content["seo_title"])
+    print(f"Debug: Converted seo_title to plain text: {seo_title}")
+
+    seo_description = convert_markdown_to_plain_text(generated_content["seo_description"])
+    print(f"Debug: Converted seo_description to plain text: {seo_description}")
+
+    return {
+        "output_body": html_body,
+        "output_seo_title": seo_title,
+        "output_seo_descr": seo_description,
+        "status": "Completed"
+    }
+
+
+async def _save_job(job_id: int, **values) -> None:
+    """Write job fields in a short session of their own."""
+    async with async_session_maker() as session:
+        await session.execute(
+            update(GenerationJob).where(GenerationJob.id == job_id).values(**values)
+        )
+        await session.commit()
+
+
+class JobCheckpoint:
+    """
+    Persist generation results in small transactions as they arrive.
+
+    Results are buffered as column values per product, and every
+    `GENERATION_COMMIT_BATCH_SIZE` results (or `GENERATION_PROGRESS_INTERVAL_SECONDS`,
+    whichever comes first) they are written with bulk UPDATE/INSERT statements
+    and committed together with the job's counters. A crash loses at most one
+    uncommitted batch, and a resumed job only sees the products that are
+    still pending.
+
+    Products that fail permanently are marked `Failed` and recorded in
+    `failed_entries`; other failures go back to `Pending`.
+    """
+
+    def __init__(self, session: AsyncSession, job: GenerationJob, settings_digest: str = ""):
+        self.session = session
+        self.job = job
+        # Fingerprints record the settings the content was generated with
+        self.settings_digest = settings_digest
+        # Completed work from an interrupted earlier attempt stays counted;
+        # failed products are pending again and will be retried
+        self.completed = job.completed_count or 0
+        self.failed = 0
+        self.cache_hits = job.cache_hits or 0
+        self.deduplicated = job.deduplicated_count or 0
+        self.dead_lettered = 0
+        self.usage = UsageStats(
+            prompt_tokens = job.prompt_tokens or 0,
+            cached_tokens = job.cached_tokens or 0,
+            completion_tokens = job.completion_tokens or 0
+        )
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+        # Written at the next commit: product id -> column values, product id -> new status
+        # of failed products, failed_entries rows, and handle -> (input hash, product id)
+        # of newly generated products
+        self._product_updates: Dict[int, dict] = {}
+        self._status_changes: Dict[int, str] = {}
+        self._failed_entries: List[dict] = []
+        self._fingerprints: Dict[str, Tuple[str, int]] = {}
+        self._lock = asyncio.Lock()
+        # URL -> cached image file, filled while the job runs (see `track_image_paths`)
+        self.image_paths: Dict[str, str] = {}
+
+    async def record(
+            self,
+            product: Optional[Product] = None,
+            generated_content: Optional[dict] = None,
+            cache_hit: bool = False,
+            deduplicated: bool = False,
+            error: Optional[BaseException] = None
+    ) -> None:
+        """Apply a successful result to `product`, or count a failure when there is no content."""
+        async with self._lock:
+            if product is not None and generated_content is not None:
+                values = generated_content_values(generated_content)
+                # Link the product to its cached image so it can be found again
+                if product.input_image and product.input_image in self.image_paths:
+                    values["base64_filepath"] = self.image_paths[product.input_image]
+                self._product_updates[product.id] = values
+                self._status_changes.pop(product.id, None)
+                if product.handle:
+                    # A later upload with the same inputs reuses this content
+                    input_hash = product_input_hash(product, self.settings_digest)
+                    self._fingerprints[product.handle] = (input_hash, product.id)
+                self.completed += 1
+            else:
+                self.failed += 1
+                if product is not None:
+                    if error is not None and classify_error(error) == PERMANENT:
+                        self._dead_letter(product, error)
+                    else:
+                        # Retrying later may work; a later run picks it up again
+                        self._status_changes[product.id] = "Pending"
+            self.cache_hits += int(cache_hit)
+            self.deduplicated += int(deduplicated)
+            self.uncommitted += 1
+
+            if (self.uncommitted >= settings.GENERATION_COMMIT_BATCH_SIZE or
+                    time.monotonic() - self.last_commit >= settings.GENERATION_PROGRESS_INTERVAL_SECONDS):
+                await self._commit()
+
+    def _dead_letter(self, product: Product, error: BaseException) -> None:
+        self._status_changes[product.id] = "Failed"
+        self._failed_entries.append(dict(
+            uploadedfileid = product.uploaded_file_id,
+            product_id = product.id,
+            job_id = self.job.id,
+            product_title = product.input_title,
+            error_type = type(error).__name__,
+            error_message = str(error)
+        ))
+        self.dead_lettered += 1
+        print(f"Debug: Product {product.handle} failed permanently: {type(error).__name__}: {error}")
+
+    async def flush(self, **values) -> None:
+        """Commit everything recorded so far, plus any extra job fields."""
+        async with self._lock:
+            await self._commit(**values)
+
+    async def _commit(self, **values) -> None:
+        if self._product_updates:
+            await bulk_update_products(self.session, self._product_updates)
+            self._product_updates = {}
+        if self._status_changes:
+            # Failures only change the status: one UPDATE ... WHERE id IN (...) per status
+            by_status: Dict[str, List[int]] = {}
+            for product_id, status in self._status_changes.items():
+                by_status.setdefault(status, []).append(product_id)
+            for status, product_ids in by_status.items():
+                await set_product_status(self.session, product_ids, status)
+            self._status_changes = {}
+        if self._failed_entries:
+            await bulk_insert(self.session, FailedEntry, self._failed_entries)
+            self._failed_entries = []
+        if self._fingerprints:
+            await record_fingerprints(self.session, self.job.user_id, self._fingerprints)
+            self._fingerprints = {}
+        self.job.completed_count = self.completed
+        self.job.failed_count = self.failed
+        self.job.cache_hits = self.cache_hits
+        self.job.deduplicated_count = self.deduplicated
+        self.job.prompt_tokens = self.usage.prompt_tokens
+        self.job.cached_tokens = self.usage.cached_tokens
+        self.job.completion_tokens = self.usage.completion_tokens
+        for key, value in values.items():
+            setattr(self.job, key, value)
+        await self.session.commit()
+        print(f"Debug: Job {self.job.id} checkpoint: {self.completed} completed, {self.failed} failed")
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+
+
+def is_transient(error: BaseException) -> bool:
+    return classify_error(error) == TRANSIENT
+
+
+def _image_urls(products, user_settings) -> list:
+    """Image URLs to prefetch, in the order the products will be generated."""
+    if not user_settings.use_base64_image:
+        return []
+    return [product.input_image for product in products]
+
+
+async def _run_interactive(products_to_process, user_settings, checkpoint: JobCheckpoint) -> None:
+    """Generate each product with its own chat completion, several at a time."""
+    # Identical products within this run share one API call
+    single_flight = SingleFlight()
+
+    async def generate(product: Product) -> dict:
+        return await generate_product_description(
+            product_info = {
+                "title": product.input_title,
+                "description": product.input_body,
+                "image_url": product.input_image
+            },
+            ai_model = user_settings.ai_model,
+            temperature = float(user_settings.temperature),
+            max_tokens = user_settings.max_tokens,
+            prompt_type = user_settings.base_prompt_type,
+            use_base64_image = user_settings.use_base64_image,
+            use_cache = not user_settings.bypass_response_cache,
+            single_flight = single_flight
+        )
+
+    async def on_result(result: GenerationResult) -> None:
+        release_image(result.item.input_image)
+        if not result.ok:
+            print(f"Debug: Product {result.item.handle} failed after {result.attempts} attempts: {result.error}")
+            if classify_error(result.error) == FATAL:
+                # No other product can succeed either; stop the job
+                raise result.error
+            await checkpoint.record(result.item, error = result.error)
+            return
+        await checkpoint.record(
+            result.item,
+            result.content,
+            cache_hit = result.content.get("cache_hit", False),
+            deduplicated = result.content.get("deduplicated", False)
+        )
+
+    if response_cache.enabled:
+        await response_cache.evict()
+
+    if settings.GENERATION_PACK_SIZE > 1:
+        await _run_packed(products_to_process, user_settings, checkpoint)
+        return
+
+    # Images for upcoming products are prepared while earlier ones wait on the model
+    async with prefetch_images(_image_urls(products_to_process, user_settings)):
+        await GenerationEngine(should_retry = is_transient).run(products_to_process, generate, on_result = on_result)
+    print(f"Debug: Dedup stats: {single_flight.stats['calls']} distinct prompts, "
+          f"{single_flight.stats['shared']} products reused another product's result")
+
+
+async def _run_packed(products_to_process, user_settings, checkpoint: JobCheckpoint) -> None:
+    """Generate several products per chat completion, several packs at a time."""
+    products_info = [
+        {
+            "handle": product.handle,
+            "title": product.input_title,
+            "description": product.input_body,
+            "image_url": product.input_image
+        }
+        for product in products_to_process
+    ]
+    packs = [
+        [(products_to_process[index], products_info[index]) for index in pack]
+        for pack in plan_packs(products_info, user_settings.max_tokens, ai_model = user_settings.ai_model)
+    ]
+    print(f"Debug: Packed {len(products_to_process)} products into {len(packs)} requests")
+
+    async def generate(pack) -> list:
+        return await generate_packed_descriptions(
+            products_info = [info for _, info in pack],
+            ai_model = user_settings.ai_model,
+            temperature = float(user_settings.temperature),
+            max_tokens = user_settings.max_tokens,
+            prompt_type = user_settings.base_prompt_type,
+            use_base64_image = user_settings.use_base64_image,
+            use_cache = not user_settings.bypass_response_cache
+        )
+
+    async def on_result(result: GenerationResult) -> None:
+        contents = result.content if result.ok else [result.error] * len(result.item)
+        for (product, _), content in zip(result.item, contents):
+            release_image(product.input_image)
+            if isinstance(content, BaseException):
+                print(f"Debug: Product {product.handle} failed: {content}")
+                if classify_error(content) == FATAL:
+                    raise content
+                await checkpoint.record(product, error = content)
+                continue
+            await checkpoint.record(
+                product,
+                content,
+                cache_hit = content.get("cache_hit", False),
+                deduplicated = content.get("deduplicated", False)
+            )
+
+    # A pack takes about as long as its products would one after another
+    timeout = settings.GENERATION_TIMEOUT_SECONDS * settings.GENERATION_PACK_SIZE
+    async with prefetch_images(_image_urls([product for pack in packs for product, _ in pack], user_settings)):
+        await GenerationEngine(timeout = timeout, should_retry = is_transient).run(packs, generate, on_result = on_result)
+
+
+async def _apply_batch(batch_client, batch_id: str, pending: Dict[int, Product], checkpoint: JobCheckpoint) -> None:
+    """Wait for one batch and record the results of the `pending` products it holds, removing them."""
+    batch = await wait_for_batch(batch_client, batch_id)
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+
+    async for line in iter_file_lines(batch_client, batch.output_file_id):
+        result = parse_batch_output_line(line)
+        # Products completed before an interruption are no longer pending and are skipped
+        product = pending.pop(result["product_id"], None)
+        if product is None:
+            continue
+        checkpoint.usage.record(result["usage"])
+        if result["error"]:
+            print(f"Debug: Batch request for product {product.handle} failed: {result['error']}")
+            await checkpoint.record(product, error = RequestError(result["error"], result["status_code"]))
+            continue
+        await checkpoint.record(product, ai_response_service.parse_ai_response(result["content"]))
+
+
+async def _run_batch(job: GenerationJob, products_to_process, user_settings, checkpoint: JobCheckpoint) -> None:
+    """
+    Submit the products as OpenAI batches, wait for them, then apply the results.
+
+    Products are split over as many batches as the request and file size
+    limits require. Their ids are kept comma-separated in `job.batch_id`,
+    so a resumed job reattaches to the batches that are still running or
+    completed; those that failed, expired or were cancelled are dropped and
+    their products submitted again.
+    """
+    batch_client = get_batch_client()
+    pending = {product.id: product for product in products_to_process}
+
+    batch_ids = []
+    for batch_id in filter(None, (job.batch_id or "").split(",")):
+        batch = await batch_client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_BATCH_STATUSES and batch.status != "completed":
+            # It will never produce output; its products are still pending and are submitted again below
+            print(f"Debug: Job {job.id} batch {batch_id} ended with status {batch.status}; resubmitting")
+        else:
+            # Resuming after a restart: the batch is still running remotely or has finished
+            print(f"Debug: Job {job.id} resuming batch {batch_id}")
+            batch_ids.append(batch_id)
+    if ",".join(batch_ids) != (job.batch_id or ""):
+        await checkpoint.flush(batch_id = ",".join(batch_ids) or None)
+    for batch_id in batch_ids:
+        await _apply_batch(batch_client, batch_id, pending, checkpoint)
+
+    if pending:
+        # Everything not covered by a resumed batch, or all products for a new job
+        products = list(pending.values())
+        temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp")
+        os.makedirs(temp_dir, exist_ok = True)
+        path_prefix = os.path.join(temp_dir, f"batch_job_{job.id}_{len(batch_ids)}")
+
+        async def on_build_error(product: Product, error: Exception) -> None:
+            # Like a failed interactive request: only this product is affected
+            print(f"Debug: Could not build batch request for product {product.handle}: {error}")
+            if classify_error(error) == FATAL:
+                raise error
+            del pending[product.id]
+            await checkpoint.record(product, error = error)
+
+        async with prefetch_images(_image_urls(products, user_settings)):
+            input_paths = await build_batch_files(products, user_settings, path_prefix, on_error = on_build_error)
+        new_batch_ids = []
+        try:
+            for input_path in input_paths:
+                new_batch_ids.append(await submit_batch(batch_client, input_path))
+                # Saved after each submission, so a restart reattaches to every batch already created
+                await checkpoint.flush(batch_id = ",".join(batch_ids + new_batch_ids))
+        finally:
+            # The uploaded copies are all the batches need; these can be large
+            for input_path in input_paths:
+                if os.path.exists(input_path):
+                    os.remove(input_path)
+        for batch_id in new_batch_ids:
+            await _apply_batch(batch_client, batch_id, pending, checkpoint)
+
+    # Requests missing from the output (expired or errored) stay pending
+    for product in pending.values():
+        await checkpoint.record(product, error = RequestError("Missing from batch output"))
+
+
+async def run_generation_job(job_id: int) -> None:
+    """
+    Generate descriptions for every pending product of the job's user.
+
+    Also used to resume an interrupted job: only products still marked
+    `Pending` are loaded, so nothing already generated is sent again. A
+    `retry_failed` job loads the user's `Failed` products instead.
+    """
+    print(f"Debug: Running generation job {job_id}")
+    try:
+        async with async_session_maker() as session:
+            job = await session.get(GenerationJob, job_id)
+            if job is None:
+                print(f"Debug: Generation job {job_id} no longer exists")
+                return
+
+            settings_result = await session.execute(
+                select(Setting).where(Setting.user_id == job.user_id).order_by(Setting.updated_at.desc())
+            )
+            user_settings = settings_result.scalars().first()
+            if not user_settings:
+                raise ValueError("User settings not configured.")
+
+            source_status = "Failed" if job.retry_failed else "Pending"
+            products_result = await session.execute(
+                select(Product).where(
+                    (Product.user_id == job.user_id) &
+                    (Product.status == source_status)
+                ).order_by(Product.id)
+            )
+            products_to_process = products_result.scalars().all()
+
+            if job.retry_failed and products_to_process:
+                # They are being retried; new failures are recorded again
+                product_ids = [p.id for p in products_to_process]
+                for start in range(0, len(product_ids), ID_CHUNK_SIZE):
+                    await session.execute(
+                        delete(FailedEntry).where(FailedEntry.product_id.in_(product_ids[start:start + ID_CHUNK_SIZE]))
+                    )
+            print(f"Debug: Job {job_id} ({job.mode}) has {len(products_to_process)} pending products")
+
+            checkpoint = JobCheckpoint(session, job, generation_settings_digest(user_settings))
+            await checkpoint.flush(
+                status = "running",
+                started_at = job.started_at or datetime.utcnow(),
+                finished_at = None,
+                error_message = None,
+                total_count = checkpoint.completed + len(products_to_process)
+            )
+
+            if user_settings.use_base64_image and image_cache.enabled:
+                await image_cache.evict()
+
+            try:
+                # API usage from this job's calls is added to its checkpoint
+                with track_usage(checkpoint.usage), track_image_paths(checkpoint.image_paths):
+                    if job.mode == "batch":
+                        await _run_batch(job, products_to_process, user_settings, checkpoint)
+                    else:
+                        await _run_interactive(products_to_process, user_settings, checkpoint)
+            except BaseException:
+                # Keep whatever finished before the failure or shutdown
+                await asyncio.shield(checkpoint.flush())
+                raise
+
+            await checkpoint.flush(status = "done", finished_at = datetime.utcnow())
+            print(f"Debug: Generation job {job_id} done: {checkpoint.completed} completed, "
+                  f"{checkpoint.failed} failed, {checkpoint.cache_hits} served from cache, "
+                  f"{checkpoint.deduplicated} deduplicated, {checkpoint.dead_lettered} failed permanently")
+            print(f"Debug: Generation job {job_id} usage: {checkpoint.usage.to_dict()}")
+            if hedger.enabled:
+                print(f"Debug: Hedged requests: {hedger.stats}")
+
+    except asyncio.CancelledError:
+        # The job stays "running" and is re-queued when the application starts again
+        print(f"Debug: Generation job {job_id} interrupted")
+        raise
+    except Exception as e:
+        print(f"Error running generation job {job_id}: {e}")
+        traceback.print_exc()
+        await _save_job(job_id, status = "failed", error_message = str(e), finished_at = datetime.utcnow())
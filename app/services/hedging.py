@@ -0,0 +1,132 @@
+# File: app/services/hedging.py
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+from app.config import settings
+
+# Set in each call started by `Hedger.run`: the event `Hedger.measure` sets once the request is sent
+_request_sent: contextvars.ContextVar[Optional[asyncio.Event]] = contextvars.ContextVar(
+    "hedge_request_sent", default = None)
+
+
+class Hedger:
+    """
+    Hedged requests: when a call runs longer than the configured percentile
+    of recent call latencies, start an identical second call and keep
+    whichever returns a valid answer first.
+
+    Hedges are capped at `GENERATION_HEDGE_MAX_RATIO` of calls so slow
+    periods can't double the load on the rate budget.
+
+    Latencies only cover the provider call wrapped in `measure`, not the
+    wait for rate budget before it, and the hedge clock starts when the
+    primary's request is sent. A cancelled primary adds its elapsed time as
+    a lower bound, so the slow calls that got hedged stay in the window.
+    """
+
+    def __init__(
+            self,
+            percentile: Optional[float] = None,
+            max_ratio: Optional[float] = None,
+            min_samples: Optional[int] = None,
+            window: Optional[int] = None
+    ):
+        self.percentile = percentile if percentile is not None else settings.GENERATION_HEDGE_PERCENTILE
+        self.max_ratio = max_ratio if max_ratio is not None else settings.GENERATION_HEDGE_MAX_RATIO
+        self.min_samples = min_samples if min_samples is not None else settings.GENERATION_HEDGE_MIN_SAMPLES
+        self.latencies = deque(maxlen = window or settings.GENERATION_HEDGE_WINDOW)
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.GENERATION_HEDGE_ENABLED
+
+    def threshold(self) -> Optional[float]:
+        """Seconds after which a call gets hedged, or None until enough latencies are known."""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def can_hedge(self) -> bool:
+        return self.stats["hedged"] < self.max_ratio * self.stats["calls"]
+
+    @contextmanager
+    def measure(self) -> Iterator[None]:
+        """Record the latency of the provider call inside this block, when a hedged call makes it."""
+        sent = _request_sent.get()
+        if sent is None:
+            yield
+            return
+        started = time.monotonic()
+        sent.set()
+        try:
+            yield
+        except asyncio.CancelledError:
+            # A losing call took at least this long. Only a slow loser says something about the tail:
+            # a hedge cancelled shortly after it started would drag the percentile down
+            elapsed = time.monotonic() - started
+            threshold = self.threshold()
+            if threshold is not None and elapsed >= threshold:
+                self.latencies.append(elapsed)
+            raise
+        self.latencies.append(time.monotonic() - started)
+
+    async def _call(self, fn: Callable[[], Awaitable[Any]], sent: asyncio.Event) -> Any:
+        # Runs in its own task, so the variable only reaches this call's `measure`
+        _request_sent.set(sent)
+        return await fn()
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], is_valid: Callable[[Any], bool] = bool) -> Any:
+        """
+        Await `fn()`, hedging it with a second `fn()` if it is slow.
+
+        The first call to finish with a result accepted by `is_valid` wins and
+        the other is cancelled. If neither is valid, the primary's outcome
+        (result or exception) is returned.
+        """
+        self.stats["calls"] += 1
+        primary_sent = asyncio.Event()
+        primary = asyncio.ensure_future(self._call(fn, primary_sent))
+        hedge = None
+        try:
+            delay = self.threshold()
+            if delay is None:
+                return await primary
+
+            # Time spent waiting for rate budget doesn't count towards the delay
+            sent_wait = asyncio.ensure_future(primary_sent.wait())
+            try:
+                await asyncio.wait({primary, sent_wait}, return_when = asyncio.FIRST_COMPLETED)
+            finally:
+                sent_wait.cancel()
+            done, _ = await asyncio.wait({primary}, timeout = delay)
+            if done or not self.can_hedge():
+                return await primary
+
+            self.stats["hedged"] += 1
+            print(f"Debug: Call slower than p{self.percentile:g} ({delay:.2f}s), sending a hedged request")
+            hedge = asyncio.ensure_future(self._call(fn, asyncio.Event()))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when = asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.cancelled() and task.exception() is None and is_valid(task.result()):
+                        if task is hedge:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+            # Neither answer was usable: report the primary's
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+# Create a singleton instance
+hedger = Hedger()
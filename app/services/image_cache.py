@@ -0,0 +1,257 @@
+# File: app/services/image_cache.py
+import asyncio
+import hashlib
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.models import ImageCacheEntry
+from app.services.image_fetcher import image_fetcher
+from app.services.image_identity import PreparedImage, normalize_image_url
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding = "ascii") as f:
+        return f.read()
+
+
+def _write_text(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding = "ascii") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# URL -> cached file of the images the current job used, for Product.base64_filepath
+_job_image_paths: ContextVar[Optional[Dict[str, str]]] = ContextVar("job_image_paths", default = None)
+
+
+@contextmanager
+def track_image_paths(paths: Dict[str, str]):
+    """Collect the cached file of each image used inside this block (and tasks it starts) in `paths`."""
+    token = _job_image_paths.set(paths)
+    try:
+        yield paths
+    finally:
+        _job_image_paths.reset(token)
+
+
+def _remember_path(url: str, path: str) -> None:
+    paths = _job_image_paths.get()
+    if paths is not None:
+        paths[url] = path
+
+
+class ImageCache:
+    """
+    On-disk cache of processed product images (base64 data URIs).
+
+    Files are content-addressed: the name derives from the SHA-256 of the
+    downloaded image and the encoding used, so URLs serving the same picture
+    share one file. The `image_cache` table maps each URL to its file along
+    with the ETag / Last-Modified it was downloaded with; after
+    `IMAGE_CACHE_REVALIDATE_SECONDS` the source is re-checked with a
+    conditional request. A URL seen for the first time reuses a fresh entry
+    with the same normalised URL (another size or version of the same CDN
+    image) without downloading. `evict` removes the least recently used
+    entries once the files exceed `IMAGE_CACHE_MAX_BYTES`.
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.IMAGE_CACHE_ENABLED
+
+    def file_path(self, content_hash: str, encoding: str) -> str:
+        name = hashlib.sha256(f"{content_hash}:{encoding}".encode()).hexdigest()
+        # A relative IMAGE_CACHE_DIR is under the project root, like the rest of temp/
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        return os.path.join(project_root, settings.IMAGE_CACHE_DIR, name[:2], f"{name}.b64")
+
+    def _is_fresh(self, entry: ImageCacheEntry, now: datetime) -> bool:
+        return bool(entry.validated_at) and now - entry.validated_at < timedelta(
+            seconds = settings.IMAGE_CACHE_REVALIDATE_SECONDS)
+
+    async def _find(self, url: str, normalized_url: str, encoding: str) -> Optional[ImageCacheEntry]:
+        async with async_session_maker() as session:
+            result = await session.execute(select(ImageCacheEntry).where(ImageCacheEntry.url == url))
+            entry = result.scalar_one_or_none()
+            if entry is None:
+                result = await session.execute(
+                    select(ImageCacheEntry)
+                    .where(ImageCacheEntry.normalized_url == normalized_url, ImageCacheEntry.encoding == encoding)
+                    .order_by(ImageCacheEntry.validated_at.desc())
+                    .limit(1)
+                )
+                entry = result.scalar_one_or_none()
+        return entry
+
+    async def get_image(self, url: str, encoding: str, prepare) -> PreparedImage:
+        """
+        Return the processed image for `url`, downloading and encoding it only when needed.
+
+        Args:
+            url: Image URL.
+            encoding: Identifier of the encoding settings; a change invalidates stored files.
+            prepare: Async callable turning downloaded bytes into a `PreparedImage`.
+        """
+        normalized_url = normalize_image_url(url)
+        entry = await self._find(url, normalized_url, encoding)
+
+        now = datetime.utcnow()
+        if entry is not None and entry.encoding == encoding and os.path.exists(entry.file_path):
+            if entry.url != url:
+                if self._is_fresh(entry, now):
+                    # Another size/version of an image stored recently
+                    self.stats["hits"] += 1
+                    await self._store(
+                        url, now,
+                        normalized_url = normalized_url,
+                        content_hash = entry.content_hash,
+                        encoding = entry.encoding,
+                        file_path = entry.file_path,
+                        size_bytes = entry.size_bytes,
+                        perceptual_hash = entry.perceptual_hash,
+                        etag = entry.etag,
+                        last_modified = entry.last_modified,
+                        validated_at = entry.validated_at
+                    )
+                    return await self._read(url, entry.file_path, entry.perceptual_hash)
+            elif self._is_fresh(entry, now):
+                self.stats["hits"] += 1
+                return await self._use(url, entry, last_accessed_at = now)
+            else:
+                fetched = await image_fetcher.fetch(url, etag = entry.etag, last_modified = entry.last_modified)
+                if fetched.not_modified:
+                    self.stats["revalidated"] += 1
+                    return await self._use(url, entry, last_accessed_at = now, validated_at = now)
+                return await self._save_fetched(url, normalized_url, encoding, fetched, prepare, now)
+
+        fetched = await image_fetcher.fetch(url)
+        return await self._save_fetched(url, normalized_url, encoding, fetched, prepare, now)
+
+    async def _save_fetched(self, url: str, normalized_url: str, encoding: str, fetched, prepare,
+                            now: datetime) -> PreparedImage:
+        self.stats["misses"] += 1
+        content_hash = hashlib.sha256(fetched.content).hexdigest()
+        path = self.file_path(content_hash, encoding)
+
+        image_hash = None
+        if os.path.exists(path):
+            # Same picture already stored for another URL (or unchanged after a full download)
+            async with async_session_maker() as session:
+                result = await session.execute(
+                    select(ImageCacheEntry.perceptual_hash)
+                    .where(ImageCacheEntry.file_path == path, ImageCacheEntry.perceptual_hash.is_not(None))
+                    .limit(1)
+                )
+                image_hash = result.scalar_one_or_none()
+        if image_hash is not None:
+            prepared = PreparedImage(data_uri = await asyncio.to_thread(_read_text, path),
+                                     perceptual_hash = image_hash)
+        else:
+            prepared = await prepare(fetched.content)
+            await asyncio.to_thread(_write_text, path, prepared.data_uri)
+
+        await self._store(
+            url, now,
+            normalized_url = normalized_url,
+            content_hash = content_hash,
+            encoding = encoding,
+            file_path = path,
+            size_bytes = len(prepared.data_uri),
+            perceptual_hash = prepared.perceptual_hash,
+            etag = fetched.etag,
+            last_modified = fetched.last_modified,
+            validated_at = now
+        )
+        _remember_path(url, path)
+        return prepared
+
+    async def _store(self, url: str, now: datetime, **values) -> None:
+        """Insert or update the entry for `url` with the given column values."""
+        values["last_accessed_at"] = now
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(ImageCacheEntry).where(ImageCacheEntry.url == url).values(**values)
+            )
+            if result.rowcount == 0:
+                session.add(ImageCacheEntry(url = url, created_at = now, **values))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Another worker cached the same URL first
+                await session.rollback()
+
+    async def _use(self, url: str, entry: ImageCacheEntry, **values) -> PreparedImage:
+        async with async_session_maker() as session:
+            await session.execute(update(ImageCacheEntry).where(ImageCacheEntry.url == url).values(**values))
+            await session.commit()
+        return await self._read(url, entry.file_path, entry.perceptual_hash)
+
+    async def _read(self, url: str, path: str, image_hash: Optional[str]) -> PreparedImage:
+        _remember_path(url, path)
+        data_uri = await asyncio.to_thread(_read_text, path)
+        return PreparedImage(data_uri = data_uri, perceptual_hash = image_hash)
+
+    async def evict(self) -> int:
+        """Drop least recently used entries until the stored files fit `IMAGE_CACHE_MAX_BYTES`."""
+        async with async_session_maker() as session:
+            sizes = (
+                select(ImageCacheEntry.file_path, func.max(ImageCacheEntry.size_bytes).label("size_bytes"))
+                .group_by(ImageCacheEntry.file_path)
+                .subquery()
+            )
+            total_result = await session.execute(select(func.coalesce(func.sum(sizes.c.size_bytes), 0)))
+            total = total_result.scalar_one()
+            if total <= settings.IMAGE_CACHE_MAX_BYTES:
+                return 0
+
+            entries_result = await session.execute(
+                select(ImageCacheEntry.id, ImageCacheEntry.file_path, ImageCacheEntry.size_bytes)
+                .order_by(ImageCacheEntry.last_accessed_at)
+            )
+            entries = entries_result.all()
+            references: Dict[str, int] = {}
+            for _, path, _ in entries:
+                references[path] = references.get(path, 0) + 1
+
+            evicted_ids = []
+            removed_files = []
+            for entry_id, path, size_bytes in entries:
+                if total <= settings.IMAGE_CACHE_MAX_BYTES:
+                    break
+                evicted_ids.append(entry_id)
+                references[path] -= 1
+                if references[path] == 0:
+                    # Last URL using this file
+                    total -= size_bytes or 0
+                    removed_files.append(path)
+
+            await session.execute(delete(ImageCacheEntry).where(ImageCacheEntry.id.in_(evicted_ids)))
+            await session.commit()
+
+        for path in removed_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        self.stats["evicted"] += len(evicted_ids)
+        print(f"Debug: Evicted {len(evicted_ids)} image cache entries, {len(removed_files)} files")
+        return len(evicted_ids)
+
+
+# Create a singleton instance
+image_cache = ImageCache()
@@ -0,0 +1,125 @@
+# File: app/services/image_fetcher.py
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.resilience import RequestError
+
+
+class ImageTooLargeError(ValueError):
+    """The image is bigger than `IMAGE_MAX_BYTES`."""
+
+
+@dataclass
+class FetchedImage:
+    """Downloaded image bytes with the response headers needed for caching."""
+    url: str
+    content: bytes
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False  # 304 to a conditional request; `content` is empty
+
+
+class ImageFetcher:
+    """
+    Async image downloads over one shared connection pool.
+
+    At most `IMAGE_PER_HOST_CONCURRENCY` downloads run against the same host
+    at once, every request has connect/read timeouts, and bodies are read in
+    chunks so an oversized image is rejected before it is fully in memory.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"downloads": 0, "bytes": 0, "errors": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits = httpx.Limits(
+                    max_connections = settings.IMAGE_MAX_CONNECTIONS,
+                    max_keepalive_connections = settings.IMAGE_MAX_CONNECTIONS
+                ),
+                timeout = httpx.Timeout(settings.IMAGE_FETCH_TIMEOUT_SECONDS,
+                                        connect = settings.IMAGE_CONNECT_TIMEOUT_SECONDS),
+                follow_redirects = True
+            )
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = httpx.URL(url).host
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(settings.IMAGE_PER_HOST_CONCURRENCY)
+        return self._host_limits[host]
+
+    async def fetch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> FetchedImage:
+        """
+        Download `url`.
+
+        With `etag` / `last_modified` from an earlier download the request is
+        conditional, and an unchanged image comes back with `not_modified` set.
+
+        Raises:
+            RequestError: On HTTP errors, timeouts and connection failures.
+            ImageTooLargeError: When the body exceeds `IMAGE_MAX_BYTES`.
+        """
+        max_bytes = settings.IMAGE_MAX_BYTES
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with self._host_limit(url):
+            try:
+                async with self.client.stream("GET", url, headers = headers) as response:
+                    if response.status_code == 304 and headers:
+                        return FetchedImage(url = url, content = b"", etag = response.headers.get("etag", etag),
+                                            last_modified = response.headers.get("last-modified", last_modified),
+                                            not_modified = True)
+                    if response.status_code != 200:
+                        raise RequestError(f"Image download failed with HTTP {response.status_code}: {url}",
+                                           response.status_code)
+
+                    declared_size = response.headers.get("content-length")
+                    if declared_size and declared_size.isdigit() and int(declared_size) > max_bytes:
+                        raise ImageTooLargeError(f"Image is {declared_size} bytes, limit is {max_bytes}: {url}")
+
+                    chunks = []
+                    size = 0
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise ImageTooLargeError(f"Image exceeds {max_bytes} bytes: {url}")
+                        chunks.append(chunk)
+
+                    self.stats["downloads"] += 1
+                    self.stats["bytes"] += size
+                    return FetchedImage(
+                        url = url,
+                        content = b"".join(chunks),
+                        content_type = response.headers.get("content-type"),
+                        etag = response.headers.get("etag"),
+                        last_modified = response.headers.get("last-modified")
+                    )
+            except httpx.HTTPError as e:
+                self.stats["errors"] += 1
+                raise RequestError(f"Image download failed: {type(e).__name__}: {e}") from e
+            except (RequestError, ImageTooLargeError):
+                self.stats["errors"] += 1
+                raise
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Create a singleton instance
+image_fetcher = ImageFetcher()
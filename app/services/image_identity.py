@@ -0,0 +1,62 @@
+# File: app/services/image_identity.py
+import re
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from PIL import Image
+
+# Shopify CDN size variants of one upload: photo_800x.jpg, photo_grande.jpg, photo_1024x1024@2x.jpg
+CDN_SIZE_SUFFIX = re.compile(
+    r"_(?:\d+x\d*|x\d+|pico|icon|thumb|small|compact|medium|large|grande|original|master)(?:@\d+x)?(?=\.\w+$)",
+    re.IGNORECASE
+)
+
+# Query parameters CDNs use for resizing and re-encoding, not to pick the image. The version
+# parameter `v` is kept: Shopify bumps it when the picture behind the same path is replaced
+CDN_QUERY_PARAMS = {"width", "height", "crop", "format", "quality", "pad_color"}
+
+
+@dataclass
+class PreparedImage:
+    """A product image ready to send, with the perceptual hash identifying the picture."""
+    data_uri: str
+    perceptual_hash: Optional[str] = None
+
+
+def normalize_image_url(url: str) -> str:
+    """
+    Return the part of an image URL that identifies the picture.
+
+    Scheme, host case, CDN size suffixes and CDN resizing parameters are
+    dropped, so `https://cdn.shopify.com/.../shirt_800x.jpg?v=2&width=300`
+    and `http://CDN.shopify.com/.../shirt.jpg?v=2` normalise to the same
+    value. Other query parameters, including the version `v`, are kept
+    (sorted), since they may select the image.
+    """
+    parts = urlsplit(url.strip())
+    path = CDN_SIZE_SUFFIX.sub("", parts.path)
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values = True)
+                   if key.lower() not in CDN_QUERY_PARAMS)
+    normalized = f"//{parts.netloc.lower()}{path}"
+    if query:
+        normalized += f"?{urlencode(query)}"
+    return normalized
+
+
+def perceptual_hash(img: Image.Image) -> str:
+    """
+    Perceptual hash of an image: 64-bit difference hash plus its average colour.
+
+    Re-encoded or resized copies of a photo get the same hash. The dHash
+    alone ignores colour, so the average colour (4 bits per channel) keeps
+    colour variants of the same product shot apart.
+    """
+    gray = img.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    red, green, blue = img.convert("RGB").resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+    return f"{bits:016x}{red >> 4:x}{green >> 4:x}{blue >> 4:x}"
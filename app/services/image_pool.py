@@ -0,0 +1,72 @@
+# File: app/services/image_pool.py
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.config import settings
+
+
+class ImagePool:
+    """
+    Worker processes for CPU-bound image work (decode, resize, encode).
+
+    Keeps Pillow off the event loop and spreads it across cores. At most
+    `IMAGE_QUEUE_PER_WORKER` images per worker are handed to the pool at a
+    time; further callers wait, so a large image-heavy run can't pile
+    downloaded images up in memory faster than they are encoded.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.stats = {"tasks": 0, "waited": 0, "restarts": 0}
+
+    @property
+    def workers(self) -> int:
+        return settings.IMAGE_WORKERS or os.cpu_count() or 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" avoids forking a process that is running an event loop and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers = self.workers,
+                mp_context = multiprocessing.get_context("spawn")
+            )
+            print(f"Debug: Image worker pool started with {self.workers} processes")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers * max(1, settings.IMAGE_QUEUE_PER_WORKER))
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `fn(*args)` in a worker process and return its result.
+
+        `fn` and its arguments must be picklable (a module-level function).
+        """
+        executor = self._get_executor()
+        if self._slots.locked():
+            self.stats["waited"] += 1
+        async with self._slots:
+            self.stats["tasks"] += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed on a huge image); start a fresh pool for the next call
+                if self._executor is executor:
+                    self._executor = None
+                    self.stats["restarts"] += 1
+                    executor.shutdown(wait = False, cancel_futures = True)
+                raise
+
+    async def aclose(self) -> None:
+        if self._executor is not None:
+            executor = self._executor
+            self._executor = None
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures = True)
+
+
+# Create a singleton instance
+image_pool = ImagePool()
@@ -0,0 +1,152 @@
+# File: app/services/image_prefetch.py
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional, Set
+
+from app.config import settings
+from app.services.image_identity import PreparedImage, normalize_image_url
+from app.services.image_processing import prepare_image
+
+
+class ImagePrefetcher:
+    """
+    Download and encode images for upcoming products ahead of their turn.
+
+    A producer task walks the job's image URLs in product order and starts
+    `prepare_image` for each one while earlier products are still waiting
+    on the model. At most `lookahead` distinct images are prepared or held
+    at a time: a slot is freed only when every product using that image has
+    been released, so memory stays flat however large the catalog is.
+
+    Images are keyed by normalised URL, so products sharing a photo (or
+    another size/version of it on the CDN) download and encode it once per
+    run, including when the producer has not reached it yet.
+    """
+
+    def __init__(self, urls: Iterable[Optional[str]], lookahead: Optional[int] = None):
+        self.lookahead = max(1, lookahead or settings.IMAGE_PREFETCH_LOOKAHEAD)
+        # Products still needing each image, in first-use order
+        self._refs: Dict[str, int] = {}
+        distinct_urls: Set[str] = set()
+        # First URL seen for each normalised URL; the one that gets downloaded
+        self._sources: Dict[str, str] = {}
+        for url in urls:
+            if url:
+                key = normalize_image_url(url)
+                self._refs[key] = self._refs.get(key, 0) + 1
+                self._sources.setdefault(key, url)
+                distinct_urls.add(url)
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._held: Set[str] = set()
+        self._window = asyncio.Semaphore(self.lookahead)
+        self._producer: Optional[asyncio.Task] = None
+        self.stats = {"prefetched": 0, "ready": 0, "waited": 0, "direct": 0,
+                      # URLs served by another URL's download (other size/version of the same image)
+                      "shared_urls": len(distinct_urls) - len(self._refs)}
+
+    def start(self) -> None:
+        if self._refs and self._producer is None:
+            self._producer = asyncio.ensure_future(self._produce())
+
+    async def _produce(self) -> None:
+        for key in list(self._refs):
+            await self._window.acquire()
+            if key not in self._refs or key in self._tasks:
+                # Every product using it finished before its turn came (e.g. cache hits),
+                # or a product got to it first
+                self._window.release()
+                continue
+            self._start(key, self._sources[key])
+            self._held.add(key)
+            self.stats["prefetched"] += 1
+
+    def _start(self, key: str, url: str) -> asyncio.Future:
+        task = asyncio.ensure_future(prepare_image(url))
+        # Failures surface to whoever loads the image; never log them as unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._tasks[key] = task
+        return task
+
+    async def load(self, url: str) -> PreparedImage:
+        """Return the prepared image for `url`, shared with every product using the same picture."""
+        key = normalize_image_url(url)
+        task = self._tasks.get(key)
+        if task is None:
+            # Not reached by the producer yet; later products with this image still share it
+            self.stats["direct"] += 1
+            if key not in self._refs:
+                return await prepare_image(url)
+            task = self._start(key, self._sources.get(key, url))
+        else:
+            self.stats["ready" if task.done() else "waited"] += 1
+        try:
+            # A timed-out consumer must not cancel the download other products share
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Let a retry download it afresh instead of re-raising the stored error
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+            raise
+
+    def release(self, url: Optional[str]) -> None:
+        """A product using `url` is finished; free the image once no product needs it."""
+        if not url:
+            return
+        key = normalize_image_url(url)
+        if key not in self._refs:
+            return
+        self._refs[key] -= 1
+        if self._refs[key] > 0:
+            return
+        del self._refs[key]
+        task = self._tasks.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+        if key in self._held:
+            self._held.remove(key)
+            self._window.release()
+
+    async def aclose(self) -> None:
+        tasks = list(self._tasks.values())
+        if self._producer is not None:
+            tasks.append(self._producer)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions = True)
+        self._tasks.clear()
+        print(f"Debug: Image prefetch stats: {self.stats}")
+
+
+# Prefetcher of the generation job running in the current task
+_prefetcher: ContextVar[Optional[ImagePrefetcher]] = ContextVar("image_prefetcher", default = None)
+
+
+@asynccontextmanager
+async def prefetch_images(urls: Iterable[Optional[str]]):
+    """Prefetch `urls` for image loads inside this block (and tasks it starts)."""
+    prefetcher = ImagePrefetcher(urls)
+    prefetcher.start()
+    token = _prefetcher.set(prefetcher)
+    try:
+        yield prefetcher
+    finally:
+        _prefetcher.reset(token)
+        await prefetcher.aclose()
+
+
+async def load_image(url: str) -> PreparedImage:
+    """`prepare_image`, served from the current job's prefetcher when there is one."""
+    prefetcher = _prefetcher.get()
+    if prefetcher is None:
+        return await prepare_image(url)
+    return await prefetcher.load(url)
+
+
+def release_image(url: Optional[str]) -> None:
+    """Tell the current job's prefetcher, if any, that a product using `url` is done."""
+    prefetcher = _prefetcher.get()
+    if prefetcher is not None:
+        prefetcher.release(url)
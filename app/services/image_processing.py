@@ -1,61 +1,59 @@
 # app/services/image_processing.py
 
-import requests
-from PIL import Image
-import io
-import base64
-import binascii  # Missing import
-
-def process_image(image_url):
+from app.config import settings
+from app.services.image_cache import image_cache
+from app.services.image_fetcher import image_fetcher
+from app.services.image_identity import PreparedImage
+from app.services.image_pool import image_pool
+# Runs in the image worker processes, which only import that module
+from app.services.image_worker import encode_image_with_hash
+
+
+def image_encoding() -> str:
+    """Identifies the output of `encode_image` under the current settings, for the image cache."""
+    output_format = settings.IMAGE_OUTPUT_FORMAT.lower()
+    if output_format == "png":
+        return f"png-{settings.IMAGE_MAX_DIMENSION}"
+    return (f"{output_format}-{settings.IMAGE_MAX_DIMENSION}"
+            f"-q{settings.IMAGE_OUTPUT_QUALITY}-t{settings.IMAGE_TARGET_BYTES}")
+
+
+async def prepare_image(image_url: str) -> PreparedImage:
+    """
+    Download, resize and encode `image_url` without blocking the event loop.
+
+    With the image cache enabled, a previously processed image is read from
+    disk instead of being downloaded and encoded again.
+    """
     try:
-        response = requests.get(image_url)
-        img = Image.open(io.BytesIO(response.content))
-
-        # Resize image
-        img.thumbnail((512, 512))
-
-        # Convert to PNG
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        base64_image = f"data:image/png;base64,{img_str}"
+        if image_cache.enabled:
+            prepared = await image_cache.get_image(image_url, image_encoding(), prepare_image_async)
+        else:
+            fetched = await image_fetcher.fetch(image_url)
+            prepared = await prepare_image_async(fetched.content)
 
-        # Validate before returning
-        if not validate_base64(base64_image):
-            raise ValueError("Invalid base64 image generated")
-
-        print(f"Debug: Processed image to base64, first 30 chars: {base64_image[:30]}...")
-        print(type(base64_image))
-        return base64_image
+        print(f"Debug: Processed image to base64, first 30 chars: {prepared.data_uri[:30]}..., "
+              f"perceptual hash {prepared.perceptual_hash}")
+        return prepared
 
     except Exception as e:
         print(f"Error processing image: {e}")
         raise e
 
-def validate_base64(image_str: str) -> bool:
-    """Validate if a string is properly formatted base64 image data."""
-    try:
-        # Check basic format
-        if not image_str.startswith("data:image/"):
-            return False
-
-        # Split the data URI components
-        header, data = image_str.split(",", 1)
-        parts = header.split(";")
-
-        # Validate mime type and encoding
-        if len(parts) < 2 or parts[-1] != "base64":
-            return False
-
-        # Attempt to decode the base64 data
-        base64.b64decode(data, validate=True)
-        return True
-
-    except (ValueError, binascii.Error) as e:
-        print(f"Debug: Base64 validation failed: {str(e)}")
-        return False
-    except Exception as e:
-        print(f"Error validating base64: {str(e)}")
-        return False
+async def process_image(image_url):
+    """Return `image_url` as a base64 data URI without blocking the event loop."""
+    return (await prepare_image(image_url)).data_uri
+
+async def prepare_image_async(image_bytes: bytes) -> PreparedImage:
+    """Encode and hash downloaded image bytes with the configured settings in the image worker pool."""
+    data_uri, image_hash = await image_pool.run(
+        encode_image_with_hash,
+        image_bytes,
+        settings.IMAGE_OUTPUT_FORMAT,
+        settings.IMAGE_OUTPUT_QUALITY,
+        settings.IMAGE_MAX_DIMENSION,
+        settings.IMAGE_TARGET_BYTES
+    )
+    return PreparedImage(data_uri = data_uri, perceptual_hash = image_hash)
 
 print("Debug: Image processing service initialized")
@@ -0,0 +1,138 @@
+# File: app/services/image_worker.py
+# Pillow work for the image worker processes. Spawned workers import this module to unpickle
+# their tasks, so it must not import settings, the database or anything else with side effects.
+import base64
+import binascii
+import io
+from typing import Tuple
+
+from PIL import Image
+
+from app.services.image_identity import perceptual_hash
+
+# IMAGE_OUTPUT_FORMAT -> (Pillow format, MIME type)
+OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+
+# Leading bytes of each output format, checked instead of decoding the whole payload
+IMAGE_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/webp": (b"RIFF",),
+}
+
+# Lowest quality used when shrinking an image towards IMAGE_TARGET_BYTES
+MIN_TARGET_QUALITY = 40
+
+
+def _save(img: Image.Image, pillow_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if pillow_format == "PNG":
+        img.save(buffer, format="PNG")
+    else:
+        img.save(buffer, format=pillow_format, quality=quality)
+    return buffer.getvalue()
+
+def _thumbnail(image_bytes: bytes, max_dimension: int) -> Image.Image:
+    img = Image.open(io.BytesIO(image_bytes))
+
+    if img.format == "JPEG":
+        # Decode at the smallest 1/2, 1/4 or 1/8 scale still covering the thumbnail
+        img.draft("RGB", (max_dimension, max_dimension))
+
+    # Resize image
+    img.thumbnail((max_dimension, max_dimension))
+    return img
+
+def _to_data_uri(img: Image.Image, output_format: str, quality: int, target_bytes: int) -> str:
+    pillow_format, mime_type = OUTPUT_FORMATS[output_format.lower()]
+
+    if pillow_format == "JPEG" and img.mode != "RGB":
+        # JPEG has no alpha channel; flatten transparent images on white
+        rgba = img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif pillow_format == "WEBP" and img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+    encoded = _save(img, pillow_format, quality)
+    while target_bytes and pillow_format != "PNG" and len(encoded) > target_bytes and quality > MIN_TARGET_QUALITY:
+        quality = max(MIN_TARGET_QUALITY, quality - 10)
+        encoded = _save(img, pillow_format, quality)
+
+    img_str = base64.b64encode(encoded).decode()
+    base64_image = f"data:{mime_type};base64,{img_str}"
+
+    # Validate before returning
+    if not validate_base64(base64_image):
+        raise ValueError("Invalid base64 image generated")
+
+    return base64_image
+
+def encode_image(
+        image_bytes: bytes,
+        output_format: str = "jpeg",
+        quality: int = 85,
+        max_dimension: int = 512,
+        target_bytes: int = 0
+) -> str:
+    """
+    Resize raw image bytes to fit `max_dimension` and return them as a data URI.
+
+    JPEGs are decoded at a reduced scale (libjpeg draft mode) instead of at
+    full resolution. JPEG and WebP output steps the quality down until the
+    image fits `target_bytes` (0 disables). CPU-bound; call
+    `app.services.image_processing.prepare_image_async` from the event loop.
+    """
+    return _to_data_uri(_thumbnail(image_bytes, max_dimension), output_format, quality, target_bytes)
+
+def encode_image_with_hash(
+        image_bytes: bytes,
+        output_format: str = "jpeg",
+        quality: int = 85,
+        max_dimension: int = 512,
+        target_bytes: int = 0
+) -> Tuple[str, str]:
+    """`encode_image` plus the perceptual hash of the thumbnail, from a single decode."""
+    img = _thumbnail(image_bytes, max_dimension)
+    return _to_data_uri(img, output_format, quality, target_bytes), perceptual_hash(img)
+
+def validate_base64(image_str: str) -> bool:
+    """
+    Validate if a string is a well-formed base64 image data URI.
+
+    Only the first bytes are decoded, to check they carry the signature of
+    the declared image type; the payload as a whole is not decoded again.
+    """
+    try:
+        # Check basic format
+        if not image_str.startswith("data:image/"):
+            return False
+
+        # Split the data URI components
+        header, data = image_str.split(",", 1)
+        parts = header.split(";")
+
+        # Validate mime type and encoding
+        if len(parts) < 2 or parts[-1] != "base64":
+            return False
+
+        # Base64 text always comes in 4-character groups
+        if not data or len(data) % 4:
+            return False
+
+        head = base64.b64decode(data[:16], validate=True)
+        signatures = IMAGE_SIGNATURES.get(parts[0][len("data:"):])
+        if signatures and not head.startswith(signatures):
+            return False
+        return True
+
+    except (ValueError, binascii.Error) as e:
+        print(f"Debug: Base64 validation failed: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"Error validating base64: {str(e)}")
+        return False
@@ -0,0 +1,64 @@
+# File: app/services/job_queue.py
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.models import GenerationJob
+from app.services.generation_jobs import run_generation_job
+
+
+class JobQueue:
+    """In-process queue feeding generation jobs to background worker tasks."""
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+
+    async def start(self, worker_count: Optional[int] = None) -> None:
+        """Start the workers and re-queue jobs left unfinished by a previous run."""
+        self.queue = asyncio.Queue()
+        worker_count = max(1, worker_count or settings.JOB_WORKERS)
+
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(GenerationJob.id)
+                .where(GenerationJob.status.in_(["queued", "running"]))
+                .order_by(GenerationJob.created_at)
+            )
+            unfinished = result.scalars().all()
+        for job_id in unfinished:
+            self.queue.put_nowait(job_id)
+        print(f"Debug: Re-queued {len(unfinished)} unfinished generation jobs")
+
+        self.workers = [asyncio.create_task(self._worker(n)) for n in range(worker_count)]
+        print(f"Debug: Started {worker_count} generation job workers")
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs are picked up again on next start."""
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions = True)
+        self.workers = []
+        print("Debug: Generation job workers stopped")
+
+    async def enqueue(self, job_id: int) -> None:
+        if self.queue is None:
+            raise RuntimeError("Job queue is not running")
+        await self.queue.put(job_id)
+        print(f"Debug: Enqueued generation job {job_id}, queue size: {self.queue.qsize()}")
+
+    async def _worker(self, worker_number: int) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                print(f"Debug: Worker {worker_number} picked up job {job_id}")
+                await run_generation_job(job_id)
+            finally:
+                self.queue.task_done()
+
+
+# Create a singleton instance
+job_queue = JobQueue()
@@ -0,0 +1,246 @@
+# File: app/services/llm_providers.py
+import abc
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.services.ai_response_service import ai_response_service
+from app.services.fingerprints import stable_hash
+from app.services.prompt_service import prompt_service
+from app.services.token_counter import count_message_tokens, count_tokens
+
+try:
+    # httpx only speaks HTTP/2 when the h2 package is installed
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def build_http_client(transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Connection-pooled HTTP client for one provider.
+
+    Connections are kept alive between requests so concurrent generations
+    reuse them instead of paying a TLS handshake each; the read timeout is
+    long enough for a full completion, the connect timeout is not.
+    """
+    return httpx.AsyncClient(
+        http2 = settings.LLM_HTTP2 and HTTP2_AVAILABLE,
+        limits = httpx.Limits(
+            max_connections = settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections = settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry = settings.LLM_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        timeout = httpx.Timeout(settings.LLM_READ_TIMEOUT_SECONDS, connect = settings.LLM_CONNECT_TIMEOUT_SECONDS),
+        transport = transport
+    )
+
+
+class LLMProvider(abc.ABC):
+    """
+    One LLM backend: how prompts are laid out, how a request is sent, and how
+    the answer and its token usage are read back.
+    """
+
+    name = "base"
+    api_type = "openai"  # prompt layout, see PromptService.format_prompt_for_api
+
+    def format_messages(self, prompt_data: Dict[str, Any], product_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return prompt_service.format_prompt_for_api(prompt_data, product_info, api_type = self.api_type)
+
+    def format_packed_messages(self, prompt_data: Dict[str, Any], products_info: List[Dict[str, Any]],
+                               handles: List[str]) -> List[Dict[str, Any]]:
+        return prompt_service.format_packed_prompt_for_api(prompt_data, products_info, handles,
+                                                           api_type = self.api_type)
+
+    @abc.abstractmethod
+    async def complete(self, request_body: Dict[str, Any]) -> Tuple[Any, Mapping[str, str]]:
+        """Send one chat request and return the response with its HTTP headers."""
+
+    def response_text(self, response: Any) -> str:
+        return response.choices[0].message.content.strip()
+
+    def finish_reason(self, response: Any) -> Optional[str]:
+        return response.choices[0].finish_reason
+
+    def extract_usage(self, response: Any) -> Any:
+        return response.usage
+
+    def parse_response(self, response_text: str) -> Dict[str, str]:
+        return ai_response_service.parse_ai_response(response_text)
+
+    def parse_packed_response(self, response_text: str, handles: List[str]) -> Dict[str, Dict[str, str]]:
+        return ai_response_service.parse_packed_response(response_text, handles)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions, or any OpenAI-compatible endpoint via `LLM_BASE_URL`."""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.http_client = build_http_client(transport)
+        # Retries are handled by the shared rate limiter, not per call by the SDK
+        self.client = AsyncOpenAI(
+            api_key = api_key or settings.OPENAI_API_KEY,
+            base_url = base_url or settings.LLM_BASE_URL,
+            max_retries = 0,
+            timeout = self.http_client.timeout,
+            http_client = self.http_client
+        )
+
+    async def complete(self, request_body: Dict[str, Any]) -> Tuple[Any, Mapping[str, str]]:
+        raw_response = await self.client.chat.completions.with_raw_response.create(**request_body)
+        return raw_response.parse(), raw_response.headers
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+def _mock_entry(title: str) -> Dict[str, str]:
+    return {
+        "BODY_HTML": f"## {title}\n\nA generated description for {title}.",
+        "SEO_TITLE": title[:60],
+        "SEO_DESCRIPTION": f"Shop {title} today."[:155]
+    }
+
+
+def mock_completion_content(messages: List[Dict[str, Any]]) -> str:
+    """Deterministic JSON answer for a single or packed product prompt."""
+    products = []
+    for message in messages:
+        if message["role"] != "user":
+            continue
+        parts = message["content"] if isinstance(message["content"], list) else [
+            {"type": "text", "text": message["content"]}]
+        for part in parts:
+            text = part.get("text", "")
+            title = re.search(r"^Product Title:(.*)$", text, re.MULTILINE)
+            if title:
+                handle = re.search(r"^Product Handle:(.*)$", text, re.MULTILINE)
+                products.append((handle.group(1).strip() if handle else None, title.group(1).strip()))
+
+    if any(handle for handle, _ in products):
+        return json.dumps({"products": [{"handle": handle, **_mock_entry(title)} for handle, title in products]})
+    return json.dumps(_mock_entry(products[0][1] if products else ""))
+
+
+class MockProvider(OpenAIProvider):
+    """
+    Offline provider for benchmarks and local runs.
+
+    Requests go through the real OpenAI SDK to an in-process transport, so
+    retries, rate limiting and parsing behave as in production. Latency and
+    failures are drawn from a generator seeded with `MOCK_LLM_SEED`, the
+    request and its attempt number, so a run is reproducible however its
+    requests interleave. Failures are 429/500/503 responses.
+    """
+
+    name = "mock"
+
+    def __init__(self, latency: Optional[float] = None, jitter: Optional[float] = None,
+                 error_rate: Optional[float] = None, seed: Optional[int] = None):
+        self.latency = settings.MOCK_LLM_LATENCY_SECONDS if latency is None else latency
+        self.jitter = settings.MOCK_LLM_LATENCY_JITTER if jitter is None else jitter
+        self.error_rate = settings.MOCK_LLM_ERROR_RATE if error_rate is None else error_rate
+        self.seed = settings.MOCK_LLM_SEED if seed is None else seed
+        self.attempts: Dict[str, int] = {}
+        self.cached_prefixes = set()
+        self.stats = {"requests": 0, "errors": 0}
+        super().__init__(api_key = "mock", base_url = "http://mock-llm.local/v1",
+                         transport = httpx.MockTransport(self.handle))
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if not request.url.path.endswith("/chat/completions"):
+            return httpx.Response(404, json = {"error": {"message": "Not supported by the mock provider"}})
+
+        body = json.loads(request.content)
+        messages = body["messages"]
+        request_key = stable_hash(messages, body.get("model"))
+        attempt = self.attempts.get(request_key, 0)
+        self.attempts[request_key] = attempt + 1
+        rng = random.Random(stable_hash(self.seed, request_key, attempt))
+
+        await asyncio.sleep(max(0.0, self.latency * (1 + self.jitter * (2 * rng.random() - 1))))
+        self.stats["requests"] += 1
+
+        if rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            status_code = rng.choice([429, 500, 503])
+            return httpx.Response(
+                status_code,
+                headers = {"retry-after-ms": "100"},
+                json = {"error": {"message": f"Mock provider error {status_code}", "type": "mock_error",
+                                  "code": None}}
+            )
+
+        # Only failed requests need their attempt count, so the map doesn't grow with every request served
+        self.attempts.pop(request_key, None)
+        content = mock_completion_content(messages)
+        prompt_tokens = count_message_tokens(messages, body.get("model"))
+        completion_tokens = count_tokens(content, body.get("model"))
+
+        # Like OpenAI, serve a repeated system prompt of 1024+ tokens from cache in 128-token steps
+        cached_tokens = 0
+        system_prompt = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        system_tokens = count_tokens(system_prompt, body.get("model"))
+        if system_tokens >= 1024:
+            if system_prompt in self.cached_prefixes:
+                cached_tokens = system_tokens // 128 * 128
+            self.cached_prefixes.add(system_prompt)
+
+        return httpx.Response(200, json = {
+            "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}
+            }
+        })
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "mock": MockProvider,
+}
+
+_provider: Optional[LLMProvider] = None
+
+
+def get_provider() -> LLMProvider:
+    """Return the shared provider selected by `LLM_PROVIDER`."""
+    global _provider
+    if _provider is None:
+        provider_class = PROVIDERS.get(settings.LLM_PROVIDER)
+        if provider_class is None:
+            raise ValueError(f"Unsupported LLM provider: {settings.LLM_PROVIDER}")
+        _provider = provider_class()
+        print(f"Debug: Using LLM provider {_provider.name} (HTTP/2: {settings.LLM_HTTP2 and HTTP2_AVAILABLE})")
+    return _provider
+
+
+async def close_provider() -> None:
+    """Close the shared provider's connection pool."""
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
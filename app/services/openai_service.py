@@ -1,14 +1,173 @@
-from openai import AsyncOpenAI
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Union
+import openai
 from app.config import settings
-from app.services.image_processing import process_image
+from app.services.image_identity import normalize_image_url
+from app.services.image_prefetch import load_image
 from app.services.prompt_service import prompt_service
-from app.services.ai_response_service import ai_response_service
 from app.services.text_utils import convert_html_to_plain_text
+from app.services.rate_limiter import rate_limiter
+from app.services.token_counter import (
+    TOKENS_PER_IMAGE, count_message_tokens, count_tokens, estimate_request_tokens, size_max_tokens,
+    truncate_to_tokens
+)
+from app.services.response_cache import response_cache
+from app.services.fingerprints import prompt_fingerprint
+from app.services.single_flight import SingleFlight
+from app.services.usage_tracker import record_usage
+from app.services.generation_engine import timeout_paused
+from app.services.llm_providers import get_provider
+from app.services.hedging import hedger
+from app.services.resilience import PERMANENT, circuit_breaker, classify_error
 
-client = AsyncOpenAI(api_key = settings.OPENAI_API_KEY)
+async def create_chat_completion(**request_kwargs):
+    """
+    Call the provider's chat completions endpoint within the shared rate budget.
 
+    429s, 5xx responses and connection errors are retried with jittered
+    exponential backoff; other errors are raised straight away. Server and
+    connection errors also feed the circuit breaker, which holds requests
+    back while the provider is down.
+    """
+    provider = get_provider()
+    estimated_tokens = estimate_request_tokens(request_kwargs)
+    attempt = 0
+    while True:
+        # Waiting for the breaker or for rate budget doesn't use up the engine's attempt timeout
+        with timeout_paused():
+            await circuit_breaker.before_call()
+        try:
+            # Inside the try: a probe cancelled while it waits for budget must hand the probe on
+            with timeout_paused():
+                await rate_limiter.acquire(estimated_tokens)
+            started = time.monotonic()
+            with hedger.measure():
+                response, headers = await provider.complete(request_kwargs)
+            circuit_breaker.record_success()
+            rate_limiter.update_from_headers(headers)
+            usage = provider.extract_usage(response)
+            if usage is not None:
+                rate_limiter.record_usage(estimated_tokens, usage.total_tokens)
+            record_usage(usage, time.monotonic() - started)
+            return response
 
-async def generate_product_description(
+        except openai.RateLimitError as e:
+            circuit_breaker.record_success()
+            if getattr(e, "code", None) == "insufficient_quota" or attempt >= rate_limiter.max_retries:
+                raise
+            rate_limiter.update_from_headers(e.response.headers)
+            delay = rate_limiter.backoff_delay(attempt, rate_limiter.retry_after(e.response.headers))
+            # Everyone waits, not just this caller
+            rate_limiter.pause(delay)
+            print(f"Debug: OpenAI 429 (attempt {attempt + 1}), retrying in {delay:.2f}s")
+
+        except openai.APIStatusError as e:
+            if e.status_code < 500:
+                circuit_breaker.record_success()
+                raise
+            circuit_breaker.record_failure()
+            if attempt >= rate_limiter.max_retries:
+                raise
+            delay = rate_limiter.backoff_delay(attempt, rate_limiter.retry_after(e.response.headers))
+            print(f"Debug: OpenAI {e.status_code} (attempt {attempt + 1}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        except openai.APIConnectionError as e:
+            # Also covers APITimeoutError
+            circuit_breaker.record_failure()
+            if attempt >= rate_limiter.max_retries:
+                raise
+            delay = rate_limiter.backoff_delay(attempt)
+            print(f"Debug: OpenAI connection error {e} (attempt {attempt + 1}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        except BaseException:
+            # Cancelled (e.g. a hedge that lost) or failed without reaching the provider
+            circuit_breaker.release_probe()
+            raise
+
+        attempt += 1
+        rate_limiter.stats["retries"] += 1
+
+
+def clean_product_info(product_info: dict, ai_model: Optional[str] = None) -> dict:
+    """
+    Return a copy of `product_info` with the HTML description converted to plain text.
+
+    Descriptions longer than `GENERATION_DESCRIPTION_TOKEN_BUDGET` tokens are
+    trimmed, so a huge `Body (HTML)` can't blow up the request.
+    """
+    cleaned = dict(product_info)
+    cleaned['description'] = convert_html_to_plain_text(product_info['description'])
+    budget = settings.GENERATION_DESCRIPTION_TOKEN_BUDGET
+    if budget > 0:
+        trimmed = truncate_to_tokens(cleaned['description'], budget, ai_model)
+        if trimmed != cleaned['description']:
+            print(f"Debug: Trimmed description of {product_info.get('title')} to {budget} tokens")
+            cleaned['description'] = trimmed
+    return cleaned
+
+
+def build_cache_key(
+        product_info: dict,
+        ai_model: str,
+        temperature: float,
+        max_tokens: int,
+        prompt_type: str,
+        use_base64_image: bool,
+        image_identity: Optional[str] = None
+) -> str:
+    """
+    Response cache key for an already cleaned `product_info`.
+
+    `image_identity` comes from `resolve_image_identity`; without it the
+    image is identified by its normalised URL.
+    """
+    if image_identity is None:
+        image_url = product_info.get("image_url")
+        image_identity = normalize_image_url(image_url) if image_url else ""
+        if image_identity and use_base64_image:
+            image_identity = f"base64:{image_identity}"
+    return prompt_fingerprint(
+        ai_model = ai_model,
+        temperature = temperature,
+        max_tokens = max_tokens,
+        prompt_type = prompt_type,
+        prompt_digest = prompt_service.get_prompt_digest(prompt_type),
+        title = product_info.get("title"),
+        cleaned_description = product_info.get("description"),
+        image_identity = image_identity
+    )
+
+
+async def resolve_image_identity(product_info: dict, use_base64_image: bool) -> Optional[str]:
+    """
+    Perceptual-hash identity of the product image when the image itself is sent.
+
+    Visually identical photos at different URLs then share response cache
+    entries and in-run deduplication. Loads the image (through the job's
+    prefetcher, if any), which the request needs anyway.
+    """
+    image_url = product_info.get("image_url")
+    if not use_base64_image or not image_url:
+        return None
+    prepared = await load_image(image_url)
+    return f"phash:{prepared.perceptual_hash}" if prepared.perceptual_hash else None
+
+
+async def embed_base64_images(messages: List[Dict[str, Any]]) -> None:
+    """Replace image URLs in `messages` with base64 data URIs."""
+    for message in messages:
+        if isinstance(message["content"], list):
+            for content in message["content"]:
+                if content.get("type") == "image_url":
+                    base64_image = (await load_image(content["image_url"]["url"])).data_uri
+                    content["image_url"]["url"] = base64_image
+                    print(f"Debug: Base64 image (first 100 chars): {base64_image[:200]}...")
+
+
+async def build_chat_request(
         product_info: dict,
         ai_model: str,
         temperature: float,
@@ -16,96 +175,355 @@ async def generate_product_description(
         prompt_type: str = "conversion",
         use_base64_image: bool = False
 ) -> dict:
-    try:
-        print(f"Debug: Generating description with prompt type: {prompt_type}")
-        print(f"Debug: Model: {ai_model}, Temperature: {temperature}, max_tokens: {max_tokens}")
+    """
+    Build the chat completions request body for one product.
 
-        # Convert input_body from HTML to plain text
-        plain_text_description = convert_html_to_plain_text(product_info['description'])
-        # Update product_info with plain text description
-        product_info['description'] = plain_text_description
+    Shared by the interactive path and the Batch API path so both send
+    exactly the same messages. `product_info` must already be cleaned with
+    `clean_product_info`.
+    """
+    print(f"Debug: Generating description with prompt type: {prompt_type}")
+    print(f"Debug: Model: {ai_model}, Temperature: {temperature}, max_tokens: {max_tokens}")
 
+    # Get prompt data
+    prompt_data = prompt_service.get_prompt(prompt_type)
 
-        # Get prompt data
-        prompt_data = prompt_service.get_prompt(prompt_type)
+    # Format prompt for the configured provider
+    messages = get_provider().format_messages(prompt_data, product_info)
 
-        # Format prompt for OpenAI API
-        messages = prompt_service.format_prompt_for_api(
-            prompt_data = prompt_data,
-            product_info = product_info,
-            api_type = "openai"
-        )
+    # Ensure 'json' is mentioned in messages when using json_object response format
+    json_mentioned = False
+    for message in messages:
+        if isinstance(message["content"], str) and "json" in message["content"].lower():
+            json_mentioned = True
+            break
+        elif isinstance(message["content"], list):
+            for content_item in message["content"]:
+                if isinstance(content_item, dict) and content_item.get(
+                        "type") == "text" and "json" in content_item.get("text", "").lower():
+                    json_mentioned = True
+                    break
 
-        # Ensure 'json' is mentioned in messages when using json_object response format
-        json_mentioned = False
+    # If 'json' not mentioned, add it to the first text content
+    if not json_mentioned:
+        print("Debug: Adding JSON mention to message content")
         for message in messages:
-            if isinstance(message["content"], str) and "json" in message["content"].lower():
-                json_mentioned = True
-                break
-            elif isinstance(message["content"], list):
+            if isinstance(message["content"], list):
                 for content_item in message["content"]:
-                    if isinstance(content_item, dict) and content_item.get(
-                            "type") == "text" and "json" in content_item.get("text", "").lower():
+                    if isinstance(content_item, dict) and content_item.get("type") == "text":
+                        content_item["text"] = content_item["text"] + " Please provide the response in JSON format."
                         json_mentioned = True
                         break
-
-        # If 'json' not mentioned, add it to the first text content
-        if not json_mentioned:
-            print("Debug: Adding JSON mention to message content")
-            for message in messages:
-                if isinstance(message["content"], list):
-                    for content_item in message["content"]:
-                        if isinstance(content_item, dict) and content_item.get("type") == "text":
-                            content_item["text"] = content_item["text"] + " Please provide the response in JSON format."
-                            json_mentioned = True
-                            break
-                    if json_mentioned:
-                        break
-                elif isinstance(message["content"], str):
-                    message["content"] = message["content"] + " Please provide the response in JSON format."
-                    json_mentioned = True
+                if json_mentioned:
                     break
+            elif isinstance(message["content"], str):
+                message["content"] = message["content"] + " Please provide the response in JSON format."
+                json_mentioned = True
+                break
 
-        # Process image if needed
-        if use_base64_image and product_info.get("image_url"):
-            for message in messages:
-                if isinstance(message["content"], list):
-                    for content in message["content"]:
-                        if content.get("type") == "image_url":
-                            base64_image = process_image(content["image_url"]["url"])
-                            content["image_url"]["url"] = base64_image
-                            print(f"Debug: Base64 image (first 100 chars): {base64_image[:200]}...")
+    # Process image if needed
+    if use_base64_image and product_info.get("image_url"):
+        await embed_base64_images(messages)
 
-        print(f"Debug: Message type: {type(messages)}")
-        print(f"Debug: JSON mentioned in messages: {json_mentioned}")
+    print(f"Debug: Message type: {type(messages)}")
+    print(f"Debug: JSON mentioned in messages: {json_mentioned}")
 
-        # Call OpenAI API
-        response = await client.chat.completions.create(
-            model = ai_model,
-            messages = messages,
-            temperature = temperature,
-            max_tokens = max_tokens,
-            response_format = {"type": "json_object"}
-        )
+    return {
+        "model": ai_model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": size_max_tokens(max_tokens, count_message_tokens(messages, ai_model), ai_model),
+        "response_format": {"type": "json_object"}
+    }
 
 
-        print(f"Debug: ai response = {response} ")
-        print(f"Debug: response type: {type(response)}")
+async def generate_product_description(
+        product_info: dict,
+        ai_model: str,
+        temperature: float,
+        max_tokens: int,
+        prompt_type: str = "conversion",
+        use_base64_image: bool = False,
+        use_cache: bool = True,
+        single_flight: Optional[SingleFlight] = None
+) -> dict:
+    """
+    Generate the description, SEO title and SEO description for one product.
+
+    Identical requests are answered from the response cache without calling
+    OpenAI; pass `use_cache=False` to force a fresh generation (the new answer
+    still replaces the cached one). Cached answers carry `cache_hit: True`.
 
+    With a `single_flight`, products whose prompt fingerprint matches one
+    already generated or in flight in the same run share that call; their
+    answers carry `deduplicated: True`.
 
+    With `GENERATION_HEDGE_ENABLED`, slow calls are hedged (see `Hedger`).
+    """
+    try:
+        # Convert input_body from HTML to plain text
+        product_info = clean_product_info(product_info, ai_model)
 
+        cache_key = None
+        if response_cache.enabled or single_flight is not None:
+            image_identity = await resolve_image_identity(product_info, use_base64_image)
+            cache_key = build_cache_key(product_info, ai_model, temperature, max_tokens, prompt_type,
+                                        use_base64_image, image_identity)
 
-        raw_response = response.choices[0].message.content.strip()
+        async def generate() -> dict:
+            if response_cache.enabled and use_cache:
+                cached_response = await response_cache.get(cache_key)
+                if cached_response is not None:
+                    return {**cached_response, "cache_hit": True}
 
-        print(f"Debug: raw_response = {raw_response} ")
-        print(f"Debug: Raw response type: {type(raw_response)}")
+            request_body = await build_chat_request(
+                product_info = product_info,
+                ai_model = ai_model,
+                temperature = temperature,
+                max_tokens = max_tokens,
+                prompt_type = prompt_type,
+                use_base64_image = use_base64_image
+            )
 
-        # Parse structured response
-        parsed_response = ai_response_service.parse_ai_response(raw_response)
-        print(f"Debug: parsed_response = {parsed_response}")
+            async def call_model() -> dict:
+                # Call OpenAI API
+                response = await create_chat_completion(**request_body)
 
-        return parsed_response
+                print(f"Debug: ai response = {response} ")
+                print(f"Debug: response type: {type(response)}")
+
+                provider = get_provider()
+                raw_response = provider.response_text(response)
+
+                print(f"Debug: raw_response = {raw_response} ")
+                print(f"Debug: Raw response type: {type(raw_response)}")
+
+                # Parse structured response
+                parsed_response = provider.parse_response(raw_response)
+                print(f"Debug: parsed_response = {parsed_response}")
+                return parsed_response
+
+            if hedger.enabled:
+                # A slow call gets a duplicate; the first usable answer wins
+                parsed_response = await hedger.run(call_model, is_valid = lambda parsed: bool(parsed["body_html"]))
+            else:
+                parsed_response = await call_model()
+
+            if response_cache.enabled and parsed_response["body_html"]:
+                await response_cache.set(cache_key, parsed_response, ai_model = ai_model, prompt_type = prompt_type)
+
+            return parsed_response
+
+        if single_flight is None:
+            return await generate()
+
+        result, shared = await single_flight.do(cache_key, generate)
+        if shared:
+            print(f"Debug: Reused in-run result for identical product: {product_info.get('title')}")
+            return {**result, "cache_hit": False, "deduplicated": True}
+        return dict(result)
 
     except Exception as e:
         print(f"OpenAI API Error: {e}")
         raise e
+
+
+def estimate_product_tokens(product_info: dict, ai_model: Optional[str] = None) -> int:
+    """
+    Approximate input tokens one product adds to a packed prompt.
+
+    Counts the raw description, capped at the budget `clean_product_info`
+    trims it to, plus the image and the handle/label lines.
+    """
+    description_tokens = count_tokens(product_info.get("description"), ai_model)
+    if settings.GENERATION_DESCRIPTION_TOKEN_BUDGET > 0:
+        description_tokens = min(description_tokens, settings.GENERATION_DESCRIPTION_TOKEN_BUDGET)
+    return (count_tokens(product_info.get("title"), ai_model) + description_tokens +
+            (TOKENS_PER_IMAGE if product_info.get("image_url") else 0) + 20)
+
+
+def plan_packs(
+        products_info: List[dict],
+        max_tokens: int,
+        pack_size: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        ai_model: Optional[str] = None
+) -> List[List[int]]:
+    """
+    Group product indexes into packs for `generate_packed_descriptions`.
+
+    A pack holds at most `pack_size` distinct products, their estimated input
+    stays within `token_budget`, and their combined output allowance within
+    `GENERATION_PACK_MAX_OUTPUT_TOKENS`. Products with identical inputs are
+    kept in the same pack so they are only sent once.
+    """
+    pack_size = pack_size or settings.GENERATION_PACK_SIZE
+    token_budget = token_budget or settings.GENERATION_PACK_TOKEN_BUDGET
+    pack_size = max(1, min(pack_size, settings.GENERATION_PACK_MAX_OUTPUT_TOKENS // max(1, max_tokens or 1)))
+
+    groups: Dict[tuple, List[int]] = {}
+    for index, info in enumerate(products_info):
+        groups.setdefault((info.get("title"), info.get("description"), info.get("image_url")), []).append(index)
+
+    packs: List[List[int]] = []
+    current: List[int] = []
+    current_distinct = 0
+    current_tokens = 0
+    for members in groups.values():
+        tokens = estimate_product_tokens(products_info[members[0]], ai_model)
+        if current and (current_distinct >= pack_size or current_tokens + tokens > token_budget):
+            packs.append(current)
+            current, current_distinct, current_tokens = [], 0, 0
+        current.extend(members)
+        current_distinct += 1
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def build_packed_chat_request(
+        products_info: List[dict],
+        handles: List[str],
+        ai_model: str,
+        temperature: float,
+        max_tokens: int,
+        prompt_type: str = "conversion",
+        use_base64_image: bool = False
+) -> dict:
+    """Build one chat completions request covering several cleaned products."""
+    prompt_data = prompt_service.get_prompt(prompt_type)
+    messages = get_provider().format_packed_messages(prompt_data, products_info, handles)
+    if use_base64_image:
+        await embed_base64_images(messages)
+
+    return {
+        "model": ai_model,
+        "messages": messages,
+        "temperature": temperature,
+        # Each product gets the same output allowance it would get on its own
+        "max_tokens": size_max_tokens(
+            min(max_tokens * len(products_info), settings.GENERATION_PACK_MAX_OUTPUT_TOKENS),
+            count_message_tokens(messages, ai_model),
+            ai_model
+        ),
+        "response_format": {"type": "json_object"}
+    }
+
+
+async def generate_packed_descriptions(
+        products_info: List[dict],
+        ai_model: str,
+        temperature: float,
+        max_tokens: int,
+        prompt_type: str = "conversion",
+        use_base64_image: bool = False,
+        use_cache: bool = True
+) -> List[Union[dict, Exception]]:
+    """
+    Generate several products with a single chat completion.
+
+    Cached products are not sent, identical products are sent once, and
+    products the model dropped or garbled are retried one by one through
+    `generate_product_description`, as are all of them when the pack is
+    rejected outright (a PERMANENT error). Other errors are raised.
+
+    Returns:
+        List[Union[dict, Exception]]: One parsed response (or the error of its
+        individual retry) per product, in input order.
+    """
+    cleaned = [clean_product_info(info, ai_model) for info in products_info]
+    image_identities = await asyncio.gather(*(
+        resolve_image_identity(info, use_base64_image) for info in cleaned
+    ), return_exceptions = True)
+    cache_keys = [
+        # A broken image falls back to its URL here and fails on the product's own retry below
+        build_cache_key(info, ai_model, temperature, max_tokens, prompt_type, use_base64_image,
+                        None if isinstance(image_identity, BaseException) else image_identity)
+        for info, image_identity in zip(cleaned, image_identities)
+    ]
+    results: List[Union[dict, Exception, None]] = [None] * len(products_info)
+
+    # One representative per distinct prompt
+    leaders: Dict[str, int] = {}
+    for index, cache_key in enumerate(cache_keys):
+        leaders.setdefault(cache_key, index)
+
+    to_send = []
+    for cache_key, index in leaders.items():
+        if response_cache.enabled and use_cache:
+            cached_response = await response_cache.get(cache_key)
+            if cached_response is not None:
+                results[index] = {**cached_response, "cache_hit": True}
+                continue
+        to_send.append(index)
+
+    if to_send:
+        # Handles identify products in the response, so they must be unique within the pack
+        handles = []
+        for index in to_send:
+            handle = str(products_info[index].get("handle") or f"item-{index}")
+            handles.append(handle if handle not in handles else f"{handle}-{index}")
+
+        try:
+            request_body = await build_packed_chat_request(
+                products_info = [cleaned[index] for index in to_send],
+                handles = handles,
+                ai_model = ai_model,
+                temperature = temperature,
+                max_tokens = max_tokens,
+                prompt_type = prompt_type,
+                use_base64_image = use_base64_image
+            )
+            response = await create_chat_completion(**request_body)
+            provider = get_provider()
+            raw_response = provider.response_text(response)
+            print(f"Debug: Packed response for {len(to_send)} products, finish reason: "
+                  f"{provider.finish_reason(response)}")
+            parsed = provider.parse_packed_response(raw_response, handles)
+        except Exception as e:
+            if classify_error(e) != PERMANENT:
+                # Fatal errors and an open circuit stop the job; transient ones would hit every
+                # individual request too, so the whole pack is retried instead
+                print(f"Debug: Packed request for {len(to_send)} products failed: {e}")
+                raise
+            print(f"Debug: Packed request for {len(to_send)} products failed, retrying individually: {e}")
+            parsed = {}
+
+        for index, handle in zip(to_send, handles):
+            if handle in parsed:
+                results[index] = parsed[handle]
+                if response_cache.enabled:
+                    await response_cache.set(cache_keys[index], parsed[handle], ai_model = ai_model,
+                                             prompt_type = prompt_type)
+
+    # Retry what the pack didn't deliver, one product per request
+    retry_indexes = [index for index in leaders.values() if results[index] is None]
+    if retry_indexes:
+        print(f"Debug: Retrying {len(retry_indexes)} products individually")
+        retried = await asyncio.gather(*(
+            generate_product_description(
+                product_info = products_info[index],
+                ai_model = ai_model,
+                temperature = temperature,
+                max_tokens = max_tokens,
+                prompt_type = prompt_type,
+                use_base64_image = use_base64_image,
+                use_cache = False
+            )
+            for index in retry_indexes
+        ), return_exceptions = True)
+        for index, result in zip(retry_indexes, retried):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            results[index] = result
+
+    # Fan the leaders' results out to their identical products
+    for index, cache_key in enumerate(cache_keys):
+        leader = leaders[cache_key]
+        if index != leader:
+            leader_result = results[leader]
+            results[index] = leader_result if isinstance(leader_result, Exception) else {
+                **leader_result, "cache_hit": False, "deduplicated": True}
+
+    return results
@@ -0,0 +1,140 @@
+# File: app/services/product_fingerprints.py
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models import Product, ProductFingerprint, Setting
+from app.services.fingerprints import stable_hash
+from app.services.product_store import ID_CHUNK_SIZE, bulk_insert
+from app.services.prompt_service import prompt_service
+
+# Product inputs the generated content depends on
+FINGERPRINT_COLUMNS = ("input_title", "input_body", "input_image", "input_seo_title", "input_seo_descr")
+
+# Copied from the previous version of an unchanged product. Not base64_filepath: it points into
+# the image cache, whose LRU eviction may since have deleted the file
+CARRIED_COLUMNS = ("cleaned_body", "output_body", "output_seo_title", "output_seo_descr")
+
+
+def generation_settings_digest(user_settings: Optional[Setting]) -> str:
+    """
+    Digest of the settings that shape generated content.
+
+    Covers the same inputs as the response cache key: model, temperature,
+    max tokens, prompt type and prompt template, and whether the image is
+    sent as base64. Empty when the user has no settings yet.
+    """
+    if user_settings is None:
+        return ""
+    return stable_hash(
+        user_settings.ai_model,
+        float(user_settings.temperature or 0),
+        int(user_settings.max_tokens or 0),
+        user_settings.base_prompt_type,
+        prompt_service.get_prompt_digest(user_settings.base_prompt_type),
+        bool(user_settings.use_base64_image)
+    )
+
+
+async def load_settings_digest(session: AsyncSession, user_id: int) -> str:
+    """`generation_settings_digest` of the user's current settings."""
+    result = await session.execute(
+        select(Setting).where(Setting.user_id == user_id).order_by(Setting.updated_at.desc())
+    )
+    return generation_settings_digest(result.scalars().first())
+
+
+def input_hash(values: Mapping, settings_digest: str = "") -> str:
+    """
+    SHA-256 over a product's FINGERPRINT_COLUMNS and the generation settings digest.
+
+    Missing and empty values hash alike. Content generated with other
+    settings or another prompt template hashes differently, so it counts
+    as changed.
+    """
+    # Unit separator between fields, so moving text from one field to the next changes the hash
+    joined = "\x1f".join([*(values.get(column) or "" for column in FINGERPRINT_COLUMNS), settings_digest])
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def product_input_hash(product: Product, settings_digest: str = "") -> str:
+    return input_hash({column: getattr(product, column) for column in FINGERPRINT_COLUMNS}, settings_digest)
+
+
+async def classify_products(
+        session: AsyncSession,
+        user_id: int,
+        rows: List[Dict],
+        settings_digest: str = ""
+) -> Dict[str, int]:
+    """
+    Compare uploaded product rows with the user's fingerprints, in place.
+
+    A row whose handle has no completed earlier version is new; one whose
+    inputs, or the settings they were generated with (`settings_digest`,
+    from `load_settings_digest`), hash differently is changed. Both are left as they are. A row
+    with the same inputs is unchanged: it gets the earlier version's
+    generated content and status `Completed`, so it is not generated again.
+    Every row gets all CARRIED_COLUMNS keys so the batch inserts as one
+    executemany.
+
+    Returns:
+        Dict[str, int]: Number of "new", "changed" and "unchanged" rows.
+    """
+    handles = list({row["handle"] for row in rows if row.get("handle")})
+    previous = {}
+    for start in range(0, len(handles), ID_CHUNK_SIZE):
+        result = await session.execute(
+            select(ProductFingerprint.handle, ProductFingerprint.input_hash,
+                   *[getattr(Product, column) for column in CARRIED_COLUMNS])
+            .join(Product, Product.id == ProductFingerprint.product_id)
+            .where(
+                (ProductFingerprint.user_id == user_id) &
+                ProductFingerprint.handle.in_(handles[start:start + ID_CHUNK_SIZE]) &
+                (Product.status == "Completed")
+            )
+        )
+        for fingerprint in result:
+            previous[fingerprint.handle] = fingerprint
+
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    for row in rows:
+        row.update(dict.fromkeys(CARRIED_COLUMNS))
+        known = previous.get(row.get("handle"))
+        if known is None:
+            counts["new"] += 1
+        elif known.input_hash != input_hash(row, settings_digest):
+            counts["changed"] += 1
+        else:
+            row.update({column: getattr(known, column) for column in CARRIED_COLUMNS}, status = "Completed")
+            counts["unchanged"] += 1
+    return counts
+
+
+async def record_fingerprints(session: AsyncSession, user_id: int, fingerprints: Dict[str, Tuple[str, int]]) -> int:
+    """
+    Point each handle at the product now holding its generated content.
+
+    Args:
+        fingerprints: Handle -> (input hash, product id). Replaces the
+            user's earlier fingerprint for the same handle.
+
+    Not committed. Returns the number of fingerprints written.
+    """
+    handles = list(fingerprints)
+    for start in range(0, len(handles), ID_CHUNK_SIZE):
+        await session.execute(
+            delete(ProductFingerprint).where(
+                (ProductFingerprint.user_id == user_id) &
+                ProductFingerprint.handle.in_(handles[start:start + ID_CHUNK_SIZE])
+            )
+        )
+    now = datetime.utcnow()
+    return await bulk_insert(session, ProductFingerprint, [
+        dict(user_id = user_id, handle = handle, input_hash = hash_, product_id = product_id, updated_at = now)
+        for handle, (hash_, product_id) in fingerprints.items()
+    ])
@@ -0,0 +1,79 @@
+# File: app/services/product_store.py
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import bindparam, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Base, Product
+
+# Ids per `WHERE id IN (...)` statement, below SQLite's bound-parameter limit
+ID_CHUNK_SIZE = 900
+
+
+def _chunks(values: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+async def bulk_insert(session: AsyncSession, model: Type[Base], rows: List[Dict]) -> int:
+    """
+    Insert `rows` (column dicts) into `model`'s table with one executemany.
+
+    Core-level: no ORM objects are built and nothing enters the session's
+    identity map. Column defaults still apply. Not committed.
+    """
+    if rows:
+        await session.execute(insert(model.__table__), rows)
+    return len(rows)
+
+
+async def bulk_insert_products(session: AsyncSession, rows: List[Dict]) -> int:
+    """Insert product rows (column dicts) with one executemany; not committed."""
+    return await bulk_insert(session, Product, rows)
+
+
+async def bulk_update_products(session: AsyncSession, updates: Dict[int, Dict]) -> int:
+    """
+    Write per-product column values: `UPDATE products SET ... WHERE id = ?` as executemany.
+
+    Args:
+        updates: Product id -> column values. Products with the same set of
+            columns share one statement.
+
+    Not committed. Returns the number of products updated.
+    """
+    table = Product.__table__
+    by_columns: Dict[Tuple[str, ...], List[Dict]] = {}
+    for product_id, values in updates.items():
+        columns = tuple(sorted(values))
+        by_columns.setdefault(columns, []).append({"_id": product_id, **values})
+
+    # Parameter keys named after columns become the SET clause
+    statement = table.update().where(table.c.id == bindparam("_id"))
+    for params in by_columns.values():
+        await session.execute(statement, params)
+    return len(updates)
+
+
+async def set_product_status(
+        session: AsyncSession,
+        product_ids: Sequence[int],
+        status: str,
+        from_status: Optional[str] = None
+) -> int:
+    """
+    Move products to `status` with `UPDATE products SET status = ? WHERE id IN (...)`.
+
+    With `from_status`, only products currently in that status change. Ids
+    are sent in chunks of `ID_CHUNK_SIZE`. Not committed; returns the number
+    of rows changed.
+    """
+    table = Product.__table__
+    changed = 0
+    for chunk in _chunks(list(product_ids), ID_CHUNK_SIZE):
+        statement = table.update().where(table.c.id.in_(chunk)).values(status = status)
+        if from_status is not None:
+            statement = statement.where(table.c.status == from_status)
+        result = await session.execute(statement)
+        changed += result.rowcount
+    return changed
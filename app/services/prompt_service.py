@@ -1,6 +1,7 @@
 # File: app/services/prompt_service.py
 import os
 import json
+import hashlib
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
@@ -11,6 +12,7 @@ class PromptService:
         self.prompts_dir = Path(__file__).parent / "prompts"
         self.prompts_dir.mkdir(exist_ok = True)
         self.prompt_cache = {}
+        self.digest_cache = {}
         print(f"Debug: Initializing prompt service with directory: {self.prompts_dir}")
         print(f"Debug: Type of prompts_dir: {type(self.prompts_dir)}")
 
@@ -39,6 +41,35 @@ class PromptService:
         self.prompt_cache[cache_key] = prompt_data
         return prompt_data
 
+    def get_prompt_digest(self, prompt_name: str, api_type: str = "openai") -> str:
+        """Hash of a prompt file's contents, so cached responses expire when the prompt is edited."""
+        cache_key = f"{api_type}_{prompt_name}"
+        if cache_key not in self.digest_cache:
+            prompt_data = self.get_prompt(prompt_name, api_type)
+            serialized = json.dumps(prompt_data, sort_keys = True, ensure_ascii = False)
+            self.digest_cache[cache_key] = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+        return self.digest_cache[cache_key]
+
+    def build_static_prompt(self, prompt_data: Dict[str, Any], output_format: Optional[str] = None) -> str:
+        """
+        Join the parts of a prompt that are the same for every product.
+
+        Used as the leading system message so it forms a stable, cacheable prefix.
+        """
+        parts = [prompt_data["base_prompt"]]
+
+        # Add instructions
+        for key, instruction in prompt_data["instructions"].items():
+            parts.append(f"{key.upper()}: {instruction}")
+
+        # Add output format
+        if output_format is None:
+            output_format = prompt_data.get("output_format")
+        if output_format:
+            parts.append(output_format)
+
+        return "\n\n".join(parts)
+
     def format_prompt_for_api(self, prompt_data: Dict[str, Any], product_info: Dict[str, Any],
                               api_type: str = "openai") -> List[Dict[str, Any]]:
         """Format a prompt for the specified API."""
@@ -47,20 +78,13 @@ class PromptService:
         print(f"Debug: Product info type: {type(product_info)}")
 
         if api_type == "openai":
+            # Static prompt first, product data last: every request shares the
+            # same leading tokens, which the provider can serve from its prompt cache
             content = [
-                {"type": "text", "text": prompt_data["base_prompt"]},
                 {"type": "text", "text": f"Product Title: {product_info['title']}"},
                 {"type": "text", "text": f"Existing Description: {product_info['description']}"}
             ]
 
-            # Add instructions
-            for key, instruction in prompt_data["instructions"].items():
-                content.append({"type": "text", "text": f"{key.upper()}: {instruction}"})
-
-            # Add output format
-            if "output_format" in prompt_data:
-                content.append({"type": "text", "text": prompt_data["output_format"]})
-
             # Add image if available
             if product_info.get("image_url"):
                 content.append({
@@ -71,7 +95,10 @@ class PromptService:
                     }
                 })
 
-            return [{"role": "user", "content": content}]
+            return [
+                {"role": "system", "content": self.build_static_prompt(prompt_data)},
+                {"role": "user", "content": content}
+            ]
 
         elif api_type == "gemini":
             # Gemini-specific formatting for future implementation
@@ -88,5 +115,46 @@ class PromptService:
 
 
 
+    def format_packed_prompt_for_api(self, prompt_data: Dict[str, Any], products_info: List[Dict[str, Any]],
+                                     handles: List[str], api_type: str = "openai") -> List[Dict[str, Any]]:
+        """Format one prompt asking for several products at once, each identified by its handle."""
+
+        print(f"Debug: Formatting packed prompt for {len(products_info)} products, API: {api_type}")
+
+        if api_type != "openai":
+            raise ValueError(f"Packed prompts are not supported for API type: {api_type}")
+
+        content = [{"type": "text", "text": f"Number of products: {len(products_info)}"}]
+
+        for handle, product_info in zip(handles, products_info):
+            content.append({
+                "type": "text",
+                "text": (f"Product Handle: {handle}\n"
+                         f"Product Title: {product_info['title']}\n"
+                         f"Existing Description: {product_info['description']}")
+            })
+            if product_info.get("image_url"):
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": product_info["image_url"],
+                        "detail": "low"
+                    }
+                })
+
+        return [
+            {"role": "system", "content": self.build_static_prompt(prompt_data, PACKED_OUTPUT_FORMAT)},
+            {"role": "user", "content": content}
+        ]
+
+
+# Replaces the per-product output_format when several products share one request
+PACKED_OUTPUT_FORMAT = (
+    "You will receive several products. Generate content for each of them and respond in JSON with an object "
+    'of the form {"products": [{"handle": "<Product Handle>", "BODY_HTML": "...", "SEO_TITLE": "...", '
+    '"SEO_DESCRIPTION": "..."}]} containing exactly one entry per product handle, in the same order as the products.'
+)
+
+
 # Create a singleton instance
 prompt_service = PromptService()
@@ -0,0 +1,185 @@
+# File: app/services/rate_limiter.py
+import asyncio
+import random
+import re
+import time
+from typing import Mapping, Optional
+
+from app.config import settings
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parse an OpenAI reset duration such as "1s", "6m0s" or "20ms" into seconds.
+
+    Returns None when the value is missing or not understood.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    multipliers = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * multipliers[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Continuously refilling budget of `capacity` units per minute."""
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.available = float(capacity)
+        self.updated = time.monotonic()
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        # Never ask for more than the bucket can ever hold
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_rate
+
+    def consume(self, amount: float) -> None:
+        self.available -= amount
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]) -> None:
+        """Align the bucket with the limit and remaining budget the server reports."""
+        if limit:
+            self.capacity = float(limit)
+        if remaining is None:
+            return
+        # Trust the server if it says we have less than we think
+        self.available = min(self.available, float(remaining))
+        if remaining <= 0 and reset_seconds:
+            # Nothing left until the window resets
+            self.available = -reset_seconds * self.refill_rate
+
+
+class RateLimiter:
+    """
+    Shared requests/minute and tokens/minute budget for all OpenAI calls.
+
+    Callers `acquire` an estimated token cost before each request. The buckets
+    are re-synced from the `x-ratelimit-*` headers of every response, and a
+    429 pauses all callers for the server's `retry-after` (or an exponential
+    backoff with full jitter) instead of letting each of them retry blindly.
+    """
+
+    def __init__(
+            self,
+            requests_per_minute: Optional[int] = None,
+            tokens_per_minute: Optional[int] = None,
+            max_retries: Optional[int] = None,
+            backoff_base: Optional[float] = None,
+            backoff_max: Optional[float] = None
+    ):
+        self.requests = TokenBucket(requests_per_minute or settings.OPENAI_RPM_LIMIT)
+        self.tokens = TokenBucket(tokens_per_minute or settings.OPENAI_TPM_LIMIT)
+        self.max_retries = settings.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or settings.OPENAI_BACKOFF_BASE_SECONDS
+        self.backoff_max = backoff_max or settings.OPENAI_BACKOFF_MAX_SECONDS
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {"requests": 0, "throttled_waits": 0, "rate_limited": 0, "retries": 0}
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait until one request and `estimated_tokens` tokens fit in the budget, then take them."""
+        waited = False
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens)
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    self.tokens.consume(estimated_tokens)
+                    self.stats["requests"] += 1
+                    if waited:
+                        self.stats["throttled_waits"] += 1
+                    return
+            waited = True
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Refund or charge the difference between the estimate and the real usage."""
+        if actual_tokens is None:
+            return
+        self.tokens.available = min(self.tokens.capacity, self.tokens.available + estimated_tokens - actual_tokens)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Sync both buckets from OpenAI `x-ratelimit-*` response headers."""
+        if not headers:
+            return
+
+        def number(name: str) -> Optional[float]:
+            try:
+                value = headers.get(name)
+                return float(value) if value is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        self.requests.sync(
+            number("x-ratelimit-limit-requests"),
+            number("x-ratelimit-remaining-requests"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+        )
+        self.tokens.sync(
+            number("x-ratelimit-limit-tokens"),
+            number("x-ratelimit-remaining-tokens"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+        )
+
+    def retry_after(self, headers: Optional[Mapping[str, str]]) -> Optional[float]:
+        """Seconds the server asked us to wait, from `retry-after-ms` / `retry-after`."""
+        if not headers:
+            return None
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000.0
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            pass
+        # Fall back to whichever window is exhausted
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            return parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+        return parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential backoff with full jitter, never shorter than the server's retry-after."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.backoff_base))
+        return delay
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for `seconds`, e.g. after a 429."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.stats["rate_limited"] += 1
+        print(f"Debug: Rate limited, pausing all OpenAI calls for {seconds:.2f}s")
+
+
+# Create a singleton instance
+rate_limiter = RateLimiter()
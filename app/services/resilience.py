@@ -0,0 +1,135 @@
+# File: app/services/resilience.py
+import asyncio
+import time
+from concurrent.futures import BrokenExecutor
+from typing import Optional
+
+import openai
+
+from app.config import settings
+from app.services.single_flight import SharedCallCancelled
+
+
+# How a failed generation is handled
+TRANSIENT = "transient"  # retry; the product stays pending if retries run out
+PERMANENT = "permanent"  # this product's request can't succeed; record it and move on
+FATAL = "fatal"  # nothing can succeed (bad key, no quota, unknown model, provider down); stop the job
+
+# Statuses worth retrying besides 5xx
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class ProviderUnavailableError(Exception):
+    """The provider stayed unreachable for longer than the circuit breaker waits."""
+
+
+class RequestError(Exception):
+    """A request that failed outside the SDK (e.g. a Batch API result line)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def classify_error(error: BaseException) -> str:
+    """Return TRANSIENT, PERMANENT or FATAL for a generation error."""
+    if isinstance(error, ProviderUnavailableError):
+        return FATAL
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        return FATAL
+    # A 404 from the provider (openai.NotFoundError) means the model or endpoint doesn't exist,
+    # so every request fails alike; 404s for product images are RequestErrors and stay PERMANENT
+    if isinstance(error, openai.APIStatusError) and error.status_code == 404:
+        return FATAL
+    if getattr(error, "code", None) == "insufficient_quota":
+        return FATAL
+
+    if isinstance(error, (openai.APIStatusError, RequestError)):
+        status_code = error.status_code
+        if status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS_CODES:
+            return TRANSIENT
+        return PERMANENT
+
+    # Timeouts, dropped connections, image download errors (OSError subclasses) and a dead
+    # image worker (BrokenProcessPool; the pool is rebuilt on the next call)
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError, OSError, SharedCallCancelled,
+                          BrokenExecutor)):
+        return TRANSIENT
+    return PERMANENT
+
+
+class CircuitBreaker:
+    """
+    Stop calling the provider while it is clearly down.
+
+    After `CIRCUIT_BREAKER_FAILURE_THRESHOLD` consecutive server or connection
+    errors the circuit opens and callers wait instead of sending requests.
+    After `CIRCUIT_BREAKER_COOLDOWN_SECONDS` one probe request is let
+    through: success closes the circuit, failure opens it again. If the
+    outage lasts longer than `CIRCUIT_BREAKER_MAX_OPEN_SECONDS`, waiting
+    callers get `ProviderUnavailableError`.
+    """
+
+    def __init__(
+            self,
+            failure_threshold: Optional[int] = None,
+            cooldown: Optional[float] = None,
+            max_open: Optional[float] = None
+    ):
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.cooldown = cooldown if cooldown is not None else settings.CIRCUIT_BREAKER_COOLDOWN_SECONDS
+        self.max_open = max_open if max_open is not None else settings.CIRCUIT_BREAKER_MAX_OPEN_SECONDS
+        self.state = "closed"  # closed / open / half_open
+        self.failures = 0
+        self.opened_at = 0.0
+        self.outage_started: Optional[float] = None
+        self.stats = {"trips": 0, "rejected": 0}
+
+    async def before_call(self) -> None:
+        """Wait until a request may be sent."""
+        while self.state != "closed":
+            now = time.monotonic()
+            if now - self.outage_started > self.max_open:
+                self.stats["rejected"] += 1
+                outage = now - self.outage_started
+                # Whoever calls next (e.g. a resumed job) probes straight away and waits afresh
+                self.state = "open"
+                self.opened_at = now - self.cooldown
+                self.outage_started = now
+                raise ProviderUnavailableError(f"Provider unavailable for {outage:.0f}s, giving up")
+            if self.state == "open" and now - self.opened_at >= self.cooldown:
+                # This caller is the probe; everyone else keeps waiting for its outcome
+                self.state = "half_open"
+                print("Debug: Circuit half-open, sending a probe request")
+                return
+            await asyncio.sleep(min(1.0, max(0.05, self.opened_at + self.cooldown - now)))
+
+    def record_success(self) -> None:
+        """The provider answered (any non-5xx response counts)."""
+        if self.state != "closed":
+            print("Debug: Circuit closed, provider is answering again")
+        self.state = "closed"
+        self.failures = 0
+        self.outage_started = None
+
+    def release_probe(self) -> None:
+        """The probe request ended without an answer either way; let the next caller probe."""
+        if self.state == "half_open":
+            self.state = "open"
+            self.opened_at = time.monotonic() - self.cooldown
+
+    def record_failure(self) -> None:
+        """A server error or connection failure."""
+        self.failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            if self.outage_started is None:
+                self.outage_started = self.opened_at
+            self.stats["trips"] += 1
+            print(f"Debug: Circuit open after {self.failures} consecutive failures, "
+                  f"pausing requests for {self.cooldown:.0f}s")
+
+
+# Create a singleton instance
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,115 @@
+# File: app/services/response_cache.py
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.db import async_session_maker
+from app.models import CachedResponse
+
+
+class ResponseCache:
+    """
+    Persistent cache of parsed AI responses, keyed by prompt fingerprint.
+
+    Entries older than `RESPONSE_CACHE_MAX_AGE_DAYS` are never served, and
+    `evict` trims the table back to `RESPONSE_CACHE_MAX_ENTRIES` by dropping
+    the least recently used entries.
+    """
+
+    def __init__(self):
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RESPONSE_CACHE_ENABLED
+
+    def _oldest_allowed(self) -> datetime:
+        return datetime.utcnow() - timedelta(days = settings.RESPONSE_CACHE_MAX_AGE_DAYS)
+
+    async def get(self, cache_key: str) -> Optional[Dict[str, str]]:
+        """Return the cached response for `cache_key`, or None."""
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(CachedResponse).where(
+                    (CachedResponse.cache_key == cache_key) &
+                    (CachedResponse.created_at >= self._oldest_allowed())
+                )
+            )
+            entry = result.scalar_one_or_none()
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            await session.execute(
+                update(CachedResponse)
+                .where(CachedResponse.id == entry.id)
+                .values(hit_count = CachedResponse.hit_count + 1, last_accessed_at = datetime.utcnow())
+            )
+            await session.commit()
+
+        self.stats["hits"] += 1
+        print(f"Debug: Response cache hit for {cache_key[:12]}")
+        return json.loads(entry.response)
+
+    async def set(self, cache_key: str, response: Dict[str, str], ai_model: str = None, prompt_type: str = None) -> None:
+        """Store (or refresh) the response for `cache_key`."""
+        now = datetime.utcnow()
+        payload = json.dumps(response, ensure_ascii = False)
+        async with async_session_maker() as session:
+            result = await session.execute(
+                update(CachedResponse)
+                .where(CachedResponse.cache_key == cache_key)
+                .values(response = payload, created_at = now, last_accessed_at = now)
+            )
+            if result.rowcount == 0:
+                session.add(CachedResponse(
+                    cache_key = cache_key,
+                    ai_model = ai_model,
+                    prompt_type = prompt_type,
+                    response = payload,
+                    hit_count = 0,
+                    created_at = now,
+                    last_accessed_at = now
+                ))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Another worker stored the same key first
+                await session.rollback()
+        self.stats["stores"] += 1
+
+    async def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones beyond the size cap."""
+        async with async_session_maker() as session:
+            expired = await session.execute(
+                delete(CachedResponse).where(CachedResponse.created_at < self._oldest_allowed())
+            )
+            removed = expired.rowcount or 0
+
+            count_result = await session.execute(select(func.count(CachedResponse.id)))
+            overflow = count_result.scalar_one() - settings.RESPONSE_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                oldest = (
+                    select(CachedResponse.id)
+                    .order_by(CachedResponse.last_accessed_at)
+                    .limit(overflow)
+                    .scalar_subquery()
+                )
+                trimmed = await session.execute(delete(CachedResponse).where(CachedResponse.id.in_(oldest)))
+                removed += trimmed.rowcount or 0
+
+            await session.commit()
+
+        self.stats["evicted"] += removed
+        if removed:
+            print(f"Debug: Evicted {removed} response cache entries")
+        return removed
+
+
+# Create a singleton instance
+response_cache = ResponseCache()
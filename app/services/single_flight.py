@@ -0,0 +1,53 @@
+# File: app/services/single_flight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SharedCallCancelled(Exception):
+    """The call a request was waiting on was cancelled by its owner."""
+
+
+class SingleFlight:
+    """
+    Coalesce calls that share a key into one execution for the lifetime of a run.
+
+    The first caller for a key runs the call; everyone else with the same key,
+    whether they arrive while it is in flight or after it finished, gets the
+    same result. Failed calls are forgotten so a later caller can try again.
+    Create one instance per generation run.
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Future] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` unless a call for `key` already exists.
+
+        Returns:
+            Tuple[Any, bool]: The result, and whether it came from another caller's call.
+        """
+        future = self.calls.get(key)
+        if future is not None:
+            self.stats["shared"] += 1
+            # Shield so a follower timing out doesn't cancel the owner's call
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        self.stats["calls"] += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            del self.calls[key]
+            future.set_exception(SharedCallCancelled(f"Shared call {key[:12]} was cancelled"))
+            future.exception()  # followers may not exist; mark it retrieved
+            raise
+        except Exception as e:
+            del self.calls[key]
+            future.set_exception(e)
+            future.exception()
+            raise
+        future.set_result(result)
+        return result, False
@@ -0,0 +1,132 @@
+# File: app/services/token_counter.py
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+try:
+    # Exact counts with tiktoken (in requirements.txt); without it fall back to an estimate
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+# (context window, max output tokens) per model family, longest prefix first
+MODEL_LIMITS = {
+    "gpt-4o-mini": (128000, 16384),
+    "gpt-4o": (128000, 16384),
+    "gpt-4.1": (1047576, 32768),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-3.5-turbo": (16385, 4096),
+}
+DEFAULT_MODEL_LIMITS = (128000, 4096)
+
+# Chat format overhead: tokens added around every message and to prime the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+# A low-detail image costs a flat 85 tokens
+TOKENS_PER_IMAGE = 85
+# Approximate fallback: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = " [...]"
+
+_encodings: Dict[str, Any] = {}
+_SENTENCE_END = re.compile(r"[.!?](?:\s|$)")
+
+
+def model_limits(model: Optional[str]) -> tuple:
+    """Return (context window, max output tokens) for `model`."""
+    for prefix, limits in MODEL_LIMITS.items():
+        if model and model.startswith(prefix):
+            return limits
+    return DEFAULT_MODEL_LIMITS
+
+
+def _get_encoding(model: Optional[str]):
+    """tiktoken encoding for `model`, or None when tiktoken or its encoding files are unavailable."""
+    if tiktoken is None:
+        return None
+    key = model or ""
+    if key not in _encodings:
+        try:
+            try:
+                _encodings[key] = tiktoken.encoding_for_model(key)
+            except KeyError:
+                _encodings[key] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # The encoding files are downloaded on first use, which fails offline
+            print(f"Debug: tiktoken encoding unavailable ({type(e).__name__}: {e}), estimating token counts")
+            _encodings[key] = None
+    return _encodings[key]
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """Number of tokens `text` encodes to for `model` (approximate without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special = ()))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: Optional[str] = None) -> int:
+    """Input tokens of a chat completions `messages` list, including per-message overhead."""
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        content = message["content"]
+        if isinstance(content, str):
+            total += count_tokens(content, model)
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                total += TOKENS_PER_IMAGE
+            else:
+                total += count_tokens(part.get("text", ""), model)
+    return total
+
+
+def estimate_request_tokens(request_body: Dict[str, Any]) -> int:
+    """Tokens a chat request counts against the TPM limit: its input plus the output allowance."""
+    return count_message_tokens(request_body["messages"], request_body.get("model")) + (
+        request_body.get("max_tokens") or 0)
+
+
+def truncate_to_tokens(text: Optional[str], max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Trim `text` to at most `max_tokens` tokens.
+
+    The cut is moved back to the last sentence end (or word break) inside the
+    budget and marked with `TRUNCATION_MARKER`, so the model doesn't see a
+    half sentence. Text that already fits is returned unchanged.
+    """
+    if not text or max_tokens <= 0 or count_tokens(text, model) <= max_tokens:
+        return text or ""
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER, model)
+    encoding = _get_encoding(model)
+    if encoding is None:
+        cut = text[:budget * CHARS_PER_TOKEN]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special = ())[:budget])
+
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] > len(cut) // 2:
+        cut = cut[:sentence_ends[-1]]
+    elif " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+def size_max_tokens(requested: Optional[int], input_tokens: int, model: Optional[str] = None) -> int:
+    """
+    Clamp an output allowance to what `model` can actually produce.
+
+    The result never exceeds the model's output limit, nor the context
+    window left after `input_tokens`, so the API doesn't reject the request.
+    """
+    context_window, max_output = model_limits(model)
+    available = max(1, context_window - input_tokens)
+    return max(1, min(requested or max_output, max_output, available))
+
@@ -0,0 +1,152 @@
+# File: app/services/upload_store.py
+import os
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import settings
+from app.models import Product
+
+try:
+    # Uploads are stored as Parquet when pyarrow is installed; otherwise downloads re-read the CSV
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# CSV column written for each Product output column, in export order
+OUTPUT_COLUMNS = {
+    "output_body": ("Body (HTML)", "Body HTML"),
+    "output_seo_title": ("SEO Title",),
+    "output_seo_descr": ("SEO Description",),
+}
+
+
+def upload_store_path(uploaded_file_id: int) -> str:
+    # A relative UPLOAD_STORE_DIR is under the project root, like the rest of temp/
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    return os.path.join(project_root, settings.UPLOAD_STORE_DIR, f"{uploaded_file_id}.parquet")
+
+
+class UploadStoreWriter:
+    """
+    Write an upload's parsed rows to Parquet as ingestion reads them.
+
+    Every column is stored as text, in the CSV's order, one row group per
+    batch. Rows keep their order, so a product's `source_row` is its
+    position in the stored table. The file appears under its final name
+    only once `close` succeeds.
+    """
+
+    def __init__(self, uploaded_file_id: int):
+        self.path = upload_store_path(uploaded_file_id)
+        self._partial_path = self.path + ".partial"
+        self._writer = None
+        self._schema = None
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok = True)
+            self._schema = pa.schema([(str(column), pa.string()) for column in frame.columns])
+            compression = settings.UPLOAD_STORE_COMPRESSION
+            self._writer = pq.ParquetWriter(self._partial_path, self._schema,
+                                            compression = None if compression == "none" else compression)
+        self._writer.write_table(pa.Table.from_pandas(frame, schema = self._schema, preserve_index = False))
+
+    def close(self) -> Optional[str]:
+        """Finish the file; returns its path, or None when nothing was written."""
+        if self._writer is None:
+            return None
+        self._writer.close()
+        self._writer = None
+        os.replace(self._partial_path, self.path)
+        print(f"Debug: Stored upload at {self.path} ({os.path.getsize(self.path)} bytes)")
+        return self.path
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if os.path.exists(self._partial_path):
+            os.remove(self._partial_path)
+
+
+def upload_store_writer(uploaded_file_id: int) -> Optional[UploadStoreWriter]:
+    """A writer for the upload, or None when pyarrow isn't installed."""
+    if pq is None:
+        return None
+    return UploadStoreWriter(uploaded_file_id)
+
+
+def read_stored_upload(uploaded_file_id: int) -> Optional[pd.DataFrame]:
+    """The upload as stored at ingestion, or None if it wasn't (no pyarrow, or an older upload)."""
+    path = upload_store_path(uploaded_file_id)
+    if pq is None or not os.path.exists(path):
+        return None
+    return pq.read_table(path).to_pandas()
+
+
+def delete_stored_upload(uploaded_file_id: int) -> None:
+    path = upload_store_path(uploaded_file_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def load_product_outputs(session: AsyncSession, uploaded_file_id: int) -> pd.DataFrame:
+    """Every product of an upload in id order: id, source_row, handle, status and output columns."""
+    columns = ["id", "source_row", "handle", "status", *OUTPUT_COLUMNS]
+    result = await session.execute(
+        select(*[getattr(Product, column) for column in columns])
+        .where(Product.uploaded_file_id == uploaded_file_id)
+        .order_by(Product.id)
+    )
+    return pd.DataFrame(result.all(), columns = columns)
+
+
+def _match_source_rows(original_df: pd.DataFrame, products: pd.DataFrame) -> pd.Series:
+    """
+    Source rows for products ingested before they were recorded.
+
+    The n-th product of a handle is matched with the n-th row of that
+    handle that has a Title, so repeated handles pair up in file order.
+    """
+    titles = original_df["Title"] if "Title" in original_df.columns else pd.Series(index = original_df.index)
+    product_rows = original_df[titles.notna() & (titles.astype(str).str.strip() != "")]
+    file_rows = pd.DataFrame({
+        "handle": product_rows["Handle"].to_numpy(),
+        "occurrence": product_rows.groupby("Handle", dropna = False).cumcount().to_numpy(),
+        "source_row": product_rows.index.to_numpy(),
+    })
+    keys = pd.DataFrame({
+        "handle": products["handle"].to_numpy(),
+        "occurrence": products.groupby("handle", dropna = False).cumcount().to_numpy(),
+    })
+    return keys.merge(file_rows, on = ["handle", "occurrence"], how = "left")["source_row"].set_axis(products.index)
+
+
+def merge_generated_content(original_df: pd.DataFrame, products: pd.DataFrame) -> int:
+    """
+    Write completed products' generated content into the upload's rows, in place.
+
+    `original_df` is the upload with its default RangeIndex; `products`
+    comes from `load_product_outputs`. Rows are located by `source_row`
+    with one vectorized assignment per column, so column order, variant
+    rows and products sharing a handle are all kept. Returns the number of
+    rows updated.
+    """
+    if products["source_row"].isna().any():
+        products = products.copy()
+        unknown = products["source_row"].isna()
+        products.loc[unknown, "source_row"] = _match_source_rows(original_df, products)[unknown]
+
+    completed = products[(products["status"] == "Completed") & products["source_row"].notna()]
+    completed = completed[completed["source_row"] < len(original_df)]
+    rows = completed["source_row"].astype(int).to_numpy()
+    for output_column, csv_columns in OUTPUT_COLUMNS.items():
+        column = next((name for name in csv_columns if name in original_df.columns), None)
+        if column is not None:
+            original_df.loc[rows, column] = completed[output_column].to_numpy()
+    return len(rows)
@@ -0,0 +1,92 @@
+# File: app/services/usage_tracker.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+
+def _usage_value(usage: Any, name: str) -> int:
+    if usage is None:
+        return 0
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return int(value or 0)
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """`usage.prompt_tokens_details.cached_tokens`, or 0 when the provider didn't report it."""
+    if usage is None:
+        return 0
+    details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else getattr(
+        usage, "prompt_tokens_details", None)
+    return _usage_value(details, "cached_tokens")
+
+
+class UsageStats:
+    """Token usage and latency totals, split by whether the provider served part of the prompt from cache."""
+
+    def __init__(self, prompt_tokens: int = 0, cached_tokens: int = 0, completion_tokens: int = 0):
+        self.calls = 0
+        self.prompt_tokens = prompt_tokens
+        self.cached_tokens = cached_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_calls = 0
+        self.cached_latency = 0.0
+        self.uncached_latency = 0.0
+
+    def record(self, usage: Any, latency: Optional[float] = None) -> None:
+        cached = cached_prompt_tokens(usage)
+        self.calls += 1
+        self.prompt_tokens += _usage_value(usage, "prompt_tokens")
+        self.completion_tokens += _usage_value(usage, "completion_tokens")
+        self.cached_tokens += cached
+        if cached:
+            self.cached_calls += 1
+        if latency is not None:
+            if cached:
+                self.cached_latency += latency
+            else:
+                self.uncached_latency += latency
+
+    @property
+    def cached_ratio(self) -> float:
+        """Share of prompt tokens that were read from the provider's prompt cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def to_dict(self) -> dict:
+        uncached_calls = self.calls - self.cached_calls
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_ratio": round(self.cached_ratio, 3),
+            "avg_latency_cached": round(self.cached_latency / self.cached_calls, 3) if self.cached_calls else None,
+            "avg_latency_uncached": round(self.uncached_latency / uncached_calls, 3) if uncached_calls else None
+        }
+
+
+# Totals since the application started
+global_usage = UsageStats()
+
+# Totals for whatever generation job is running in the current task
+_job_usage: ContextVar[Optional[UsageStats]] = ContextVar("job_usage", default = None)
+
+
+def record_usage(usage: Any, latency: Optional[float] = None) -> None:
+    """Record one API call's usage globally and against the current job, if any."""
+    global_usage.record(usage, latency)
+    job_usage = _job_usage.get()
+    if job_usage is not None:
+        job_usage.record(usage, latency)
+    print(f"Debug: Usage: {_usage_value(usage, 'prompt_tokens')} prompt tokens "
+          f"({cached_prompt_tokens(usage)} cached), {_usage_value(usage, 'completion_tokens')} completion tokens"
+          f"{f', {latency:.2f}s' if latency is not None else ''}")
+
+
+@contextmanager
+def track_usage(stats: UsageStats):
+    """Attribute API usage inside this block (and tasks it starts) to `stats`."""
+    token = _job_usage.set(stats)
+    try:
+        yield stats
+    finally:
+        _job_usage.reset(token)
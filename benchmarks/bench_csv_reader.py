@@ -0,0 +1,101 @@
+# File: benchmarks/bench_csv_reader.py
+"""
+Compare the previous download-route CSV read with app.services.csv_reader's engines.
+
+    python -m benchmarks.bench_csv_reader [--products 1000 10000 50000] [--variants 3]
+
+Files follow Shopify's product export: the full column set, multi-line HTML
+bodies, and `--variants` variant rows per product. Each size is written
+as UTF-8 and as cp1252 (Excel on Windows). "previous" is pd.read_csv with
+UTF-8, retried as latin-1 when that fails; "c" and "pyarrow" are
+read_csv_file with the encoding detected first (detection time included).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import pandas as pd
+
+from app.services.csv_reader import csv_engine, read_csv_file
+
+SHOPIFY_COLUMNS = [
+    "Handle", "Title", "Body (HTML)", "Vendor", "Product Category", "Type", "Tags", "Published",
+    "Option1 Name", "Option1 Value", "Option2 Name", "Option2 Value", "Option3 Name", "Option3 Value",
+    "Variant SKU", "Variant Grams", "Variant Inventory Tracker", "Variant Inventory Qty", "Variant Inventory Policy",
+    "Variant Fulfillment Service", "Variant Price", "Variant Compare At Price", "Variant Requires Shipping",
+    "Variant Taxable", "Variant Barcode", "Image Src", "Image Position", "Image Alt Text", "Gift Card",
+    "SEO Title", "SEO Description", "Variant Image", "Variant Weight Unit", "Variant Tax Code", "Cost per item",
+    "Status",
+]
+
+
+def shopify_export(products: int, variants: int) -> pd.DataFrame:
+    rows = []
+    for i in range(products):
+        handle = f"organic-cotton-tee-{i}"
+        for v in range(variants):
+            row = dict.fromkeys(SHOPIFY_COLUMNS, "")
+            row.update({
+                "Handle": handle, "Option1 Value": ("S", "M", "L", "XL")[v % 4], "Variant SKU": f"0{i:06d}{v}",
+                "Variant Grams": "180", "Variant Inventory Tracker": "shopify", "Variant Inventory Qty": str(i % 40),
+                "Variant Inventory Policy": "deny", "Variant Fulfillment Service": "manual", "Variant Price": "24.90",
+                "Variant Requires Shipping": "TRUE", "Variant Taxable": "TRUE", "Variant Barcode": f"0{400000000000 + i}",
+                "Variant Weight Unit": "kg", "Image Src": f"https://cdn.shopify.com/s/files/1/0/products/tee-{i}-{v}.jpg",
+                "Image Position": str(v + 1),
+            })
+            if v == 0:
+                row.update({
+                    "Title": f"Organic Cotton Tee “Café” {i}",
+                    "Body (HTML)": (f"<p>Soft organic cotton tee, garment dyed.</p>\n<ul>\n<li>Fit: regular</li>\n"
+                                    f"<li>Care: 30°C wash</li>\n</ul>\n<p>Style {i}, \"classic\" crew neck.</p>"),
+                    "Vendor": "Acme Apparel", "Product Category": "Apparel & Accessories > Clothing > Shirts & Tops",
+                    "Type": "T-Shirt", "Tags": "cotton, organic, summer", "Published": "TRUE", "Option1 Name": "Size",
+                    "Gift Card": "FALSE", "SEO Title": f"Organic Cotton Tee {i}", "Status": "active",
+                    "SEO Description": "Soft organic cotton tee – garment dyed, regular fit.",
+                })
+            rows.append(row)
+    return pd.DataFrame(rows, columns = SHOPIFY_COLUMNS)
+
+
+def read_previous(path: str) -> pd.DataFrame:
+    try:
+        return pd.read_csv(path, encoding = "utf-8")
+    except Exception:
+        return pd.read_csv(path, encoding = "latin-1")
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[1])
+    parser.add_argument("--products", type = int, nargs = "+", default = [1000, 10000, 50000])
+    parser.add_argument("--variants", type = int, default = 3)
+    args = parser.parse_args(argv)
+
+    engines = ["c"] + (["pyarrow"] if csv_engine("pyarrow") == "pyarrow" else [])
+    directory = tempfile.mkdtemp()
+    print(f"{'products':>8} {'rows':>8} {'MiB':>6} {'encoding':<8} {'previous (s)':>12} "
+          + " ".join(f"{engine + ' (s)':>11}" for engine in engines))
+    for products in args.products:
+        df = shopify_export(products, args.variants)
+        for encoding in ("utf-8", "cp1252"):
+            path = os.path.join(directory, f"export_{products}_{encoding}.csv")
+            df.to_csv(path, index = False, encoding = encoding)
+            seconds = [timed(read_previous, path)] + [timed(read_csv_file, path, engine) for engine in engines]
+            print(f"{products:>8} {len(df):>8} {os.path.getsize(path) / 2 ** 20:>6.1f} {encoding:<8} "
+                  f"{seconds[0]:>12.2f} " + " ".join(f"{s:>11.2f}" for s in seconds[1:]))
+            os.remove(path)
+    if "pyarrow" not in engines:
+        print("pyarrow is not installed; only the C engine was measured")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,121 @@
+# File: benchmarks/bench_export_merge.py
+"""
+Compare the previous download merge with the stored-upload join in app.services.upload_store.
+
+    python -m benchmarks.bench_export_merge [--products 1000 10000 50000] [--variants 3]
+
+"previous" re-parses the uploaded CSV, maps handles to generated content
+and writes it back row by row with iterrows()/.at, as the download route
+did. "stored" reads the Parquet copy written at ingestion and merges with
+merge_generated_content; "csv" is the same merge on the re-read CSV, the
+path without pyarrow. Every product is Completed. "same" checks that the
+merged Body/SEO columns match the previous path's; its other columns
+differ by design, as pd.read_csv's type inference drops leading zeros
+from SKUs and barcodes and rewrites TRUE and 24.90, which the new paths
+keep as text.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import pandas as pd
+
+from app.config import settings
+from app.services.csv_reader import iter_csv_frames, read_csv_file
+from app.services.upload_store import merge_generated_content, read_stored_upload, upload_store_writer
+from benchmarks.bench_csv_reader import shopify_export
+
+GENERATED_COLUMNS = ["Body (HTML)", "SEO Title", "SEO Description"]
+
+
+def generated_products(df: pd.DataFrame) -> pd.DataFrame:
+    """load_product_outputs' frame for the product rows (those with a Title) of `df`."""
+    product_rows = df.index[df["Title"].notna() & (df["Title"] != "")]
+    count = len(product_rows)
+    return pd.DataFrame({
+        "id": range(1, count + 1),
+        "source_row": product_rows,
+        "handle": df.loc[product_rows, "Handle"].to_numpy(),
+        "status": "Completed",
+        "output_body": [f"<p>Generated copy {i}</p>" for i in range(count)],
+        "output_seo_title": [f"SEO title {i}" for i in range(count)],
+        "output_seo_descr": [f"SEO description {i}" for i in range(count)],
+    })
+
+
+def merge_previous(path: str, products: pd.DataFrame) -> pd.DataFrame:
+    original_df = pd.read_csv(path, encoding = "utf-8")
+    processed_data_map = {
+        p.handle: {"Body HTML": p.output_body, "SEO Title": p.output_seo_title, "SEO Description": p.output_seo_descr}
+        for p in products.itertuples()
+    }
+    for idx, row in original_df.iterrows():
+        handle = row.get("Handle")
+        title = row.get("Title")
+        has_title = pd.notna(title) and str(title).strip() != ""
+        if handle in processed_data_map and has_title:
+            original_df.at[idx, "Body (HTML)"] = processed_data_map[handle]["Body HTML"]
+            original_df.at[idx, "SEO Title"] = processed_data_map[handle]["SEO Title"]
+            original_df.at[idx, "SEO Description"] = processed_data_map[handle]["SEO Description"]
+    return original_df
+
+
+def merge_stored(uploaded_file_id: int, products: pd.DataFrame) -> pd.DataFrame:
+    original_df = read_stored_upload(uploaded_file_id)
+    merge_generated_content(original_df, products)
+    return original_df
+
+
+def merge_csv(path: str, products: pd.DataFrame) -> pd.DataFrame:
+    original_df = read_csv_file(path)
+    merge_generated_content(original_df, products)
+    return original_df
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[1])
+    parser.add_argument("--products", type = int, nargs = "+", default = [1000, 10000, 50000])
+    parser.add_argument("--variants", type = int, default = 3)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp()
+    settings.UPLOAD_STORE_DIR = directory
+    print(f"{'products':>8} {'rows':>8} {'csv MiB':>8} {'stored MiB':>10} {'previous (s)':>12} "
+          f"{'csv (s)':>8} {'stored (s)':>10} {'same':>5}")
+    for uploaded_file_id, products in enumerate(args.products, start = 1):
+        path = os.path.join(directory, f"export_{products}.csv")
+        shopify_export(products, args.variants).to_csv(path, index = False)
+        generated = generated_products(read_csv_file(path))
+
+        store = upload_store_writer(uploaded_file_id)
+        if store is not None:
+            for frame in iter_csv_frames(path, settings.CSV_BATCH_ROWS):
+                store.write(frame)
+            store.close()
+
+        previous, previous_seconds = timed(merge_previous, path, generated)
+        merged, csv_seconds = timed(merge_csv, path, generated)
+        stored_mib, stored_seconds = float("nan"), float("nan")
+        if store is not None:
+            merged, stored_seconds = timed(merge_stored, uploaded_file_id, generated)
+            stored_mib = os.path.getsize(store.path) / 2 ** 20
+        same = previous[GENERATED_COLUMNS].to_csv(index = False) == merged[GENERATED_COLUMNS].to_csv(index = False)
+        print(f"{products:>8} {len(merged):>8} {os.path.getsize(path) / 2 ** 20:>8.1f} {stored_mib:>10.1f} "
+              f"{previous_seconds:>12.2f} {csv_seconds:>8.2f} {stored_seconds:>10.2f} {str(same):>5}")
+        os.remove(path)
+    if store is None:
+        print("pyarrow is not installed; uploads are not stored and only the CSV merge was measured")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,94 @@
+# File: benchmarks/bench_image_encoding.py
+"""
+Compare product image encoding paths: time per image and data URI size.
+
+    python -m benchmarks.bench_image_encoding [--images DIR] [--repeat N]
+
+Without --images, synthetic 2000x1500 photos are generated. "legacy" is the
+previous path: full-resolution decode, PNG output and a full base64 decode
+to validate it.
+"""
+import argparse
+import base64
+import io
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.services.image_worker import encode_image
+
+
+def legacy_encode(image_bytes: bytes) -> str:
+    img = Image.open(io.BytesIO(image_bytes))
+    img.thumbnail((512, 512))
+    buffer = io.BytesIO()
+    img.save(buffer, format = "PNG")
+    base64_image = f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
+    base64.b64decode(base64_image.split(",", 1)[1], validate = True)
+    return base64_image
+
+
+def synthetic_photos(count: int):
+    """Photo-like JPEGs: gradients, shapes and noise, so compression behaves realistically."""
+    photos = []
+    for k in range(count):
+        img = Image.linear_gradient("L").resize((2000, 1500)).convert("RGB")
+        draw = ImageDraw.Draw(img)
+        for i in range(40):
+            x, y = (k * 97 + i * 131) % 1800, (k * 53 + i * 71) % 1300
+            draw.ellipse((x, y, x + 200, y + 150), fill = ((i * 37) % 255, (k * 59) % 255, (i * 11) % 255))
+        noise = Image.effect_noise((2000, 1500), 30).convert("RGB")
+        img = Image.blend(img, noise, 0.15).filter(ImageFilter.SMOOTH)
+        buffer = io.BytesIO()
+        img.save(buffer, format = "JPEG", quality = 92)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def load_images(directory: str):
+    images = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                images.append(f.read())
+    return images
+
+
+def run(name: str, encode, images, repeat: int) -> None:
+    timings = []
+    sizes = []
+    for _ in range(repeat):
+        for image_bytes in images:
+            started = time.perf_counter()
+            data_uri = encode(image_bytes)
+            timings.append(time.perf_counter() - started)
+            sizes.append(len(data_uri))
+    print(f"{name:<22} {statistics.mean(timings) * 1000:8.1f} ms/image "
+          f"{statistics.mean(sizes) / 1024:9.1f} KiB/data URI")
+
+
+def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[1])
+    parser.add_argument("--images", help = "directory of sample images (default: synthetic photos)")
+    parser.add_argument("--count", type = int, default = 8, help = "synthetic photos to generate")
+    parser.add_argument("--repeat", type = int, default = 3)
+    args = parser.parse_args(argv)
+
+    images = load_images(args.images) if args.images else synthetic_photos(args.count)
+    print(f"{len(images)} images, {statistics.mean(len(i) for i in images) / 1024:.0f} KiB on average\n")
+
+    run("legacy png", legacy_encode, images, args.repeat)
+    run("png", lambda b: encode_image(b, "png"), images, args.repeat)
+    run("jpeg q85", lambda b: encode_image(b, "jpeg", 85), images, args.repeat)
+    run("jpeg q85 <= 40 KiB", lambda b: encode_image(b, "jpeg", 85, target_bytes = 40 * 1024), images, args.repeat)
+    run("webp q80", lambda b: encode_image(b, "webp", 80), images, args.repeat)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,128 @@
+# File: benchmarks/bench_product_writes.py
+"""
+Compare ORM unit-of-work writes with the bulk paths in app.services.product_store.
+
+    python -m benchmarks.bench_product_writes [--sizes 1000 10000 100000]
+
+Each size runs against a fresh SQLite file: inserting products, writing
+generated content to every product, and moving every product to a new status.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Product
+from app.services.product_store import bulk_insert_products, bulk_update_products, set_product_status
+
+
+def product_rows(count: int):
+    created_at = datetime.now(timezone.utc)
+    return [
+        dict(uploaded_file_id = 1, user_id = 1, status = "Pending", created_at = created_at, handle = f"product-{i}",
+             input_title = f"Product {i}", input_body = f"<p>Description of product {i}</p>",
+             input_image = f"https://cdn.shopify.com/s/files/product-{i}.jpg", input_seo_title = "",
+             input_seo_descr = "")
+        for i in range(count)
+    ]
+
+
+def generated_values(i: int):
+    return {"output_body": f"<p>Generated copy {i}</p>", "output_seo_title": f"SEO {i}",
+            "output_seo_descr": f"SEO description {i}", "status": "Completed"}
+
+
+async def fresh_session_maker(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, sessionmaker(engine, class_ = AsyncSession, expire_on_commit = False)
+
+
+async def timed(label: str, results: dict, coro) -> None:
+    started = time.perf_counter()
+    await coro
+    results[label] = time.perf_counter() - started
+
+
+async def run_orm(path: str, count: int) -> dict:
+    results = {}
+    engine, session_maker = await fresh_session_maker(path)
+    async with session_maker() as session:
+        async def insert():
+            session.add_all([Product(**row) for row in product_rows(count)])
+            await session.commit()
+
+        async def update_content():
+            products = (await session.execute(select(Product))).scalars().all()
+            for i, product in enumerate(products):
+                for column, value in generated_values(i).items():
+                    setattr(product, column, value)
+            await session.commit()
+
+        async def update_status():
+            products = (await session.execute(select(Product))).scalars().all()
+            for product in products:
+                product.status = "Pending"
+            await session.commit()
+
+        await timed("insert", results, insert())
+        await timed("content", results, update_content())
+        await timed("status", results, update_status())
+    await engine.dispose()
+    return results
+
+
+async def run_bulk(path: str, count: int) -> dict:
+    results = {}
+    engine, session_maker = await fresh_session_maker(path)
+    async with session_maker() as session:
+        async def insert():
+            await bulk_insert_products(session, product_rows(count))
+            await session.commit()
+
+        async def update_content():
+            ids = (await session.execute(select(Product.id))).scalars().all()
+            await bulk_update_products(session, {product_id: generated_values(i) for i, product_id in enumerate(ids)})
+            await session.commit()
+
+        async def update_status():
+            ids = (await session.execute(select(Product.id))).scalars().all()
+            await set_product_status(session, ids, "Pending")
+            await session.commit()
+
+        await timed("insert", results, insert())
+        await timed("content", results, update_content())
+        await timed("status", results, update_status())
+    await engine.dispose()
+    return results
+
+
+async def main(argv = None) -> None:
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[1])
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10000, 100000])
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_product_writes.db")
+    print(f"{'rows':>8} {'step':<8} {'orm (s)':>9} {'bulk (s)':>9} {'speedup':>8}")
+    for count in args.sizes:
+        orm = await run_orm(path, count)
+        bulk = await run_bulk(path, count)
+        for step in ("insert", "content", "status"):
+            print(f"{count:>8} {step:<8} {orm[step]:>9.2f} {bulk[step]:>9.2f} {orm[step] / bulk[step]:>7.1f}x")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
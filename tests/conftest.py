@@ -0,0 +1,7 @@
+# File: tests/conftest.py
+import os
+
+# Settings are read when app.config is first imported; tests never reach a real API or database
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("LLM_PROVIDER", "mock")
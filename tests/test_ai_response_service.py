@@ -0,0 +1,60 @@
+# File: tests/test_ai_response_service.py
+import json
+
+from app.services.ai_response_service import ai_response_service
+
+
+def entry(handle: str, body: str = "Body") -> dict:
+    return {"handle": handle, "BODY_HTML": body, "SEO_TITLE": f"{handle} title", "SEO_DESCRIPTION": f"{handle} descr"}
+
+
+def test_parse_packed_response_products_object():
+    text = json.dumps({"products": [entry("a"), entry("b")]})
+
+    results = ai_response_service.parse_packed_response(text, ["a", "b"])
+
+    assert results == {
+        "a": {"body_html": "Body", "seo_title": "a title", "seo_description": "a descr"},
+        "b": {"body_html": "Body", "seo_title": "b title", "seo_description": "b descr"},
+    }
+
+
+def test_parse_packed_response_bare_list():
+    results = ai_response_service.parse_packed_response(json.dumps([entry("a")]), ["a"])
+
+    assert list(results) == ["a"]
+
+
+def test_parse_packed_response_keyed_by_handle():
+    text = json.dumps({"a": {"BODY_HTML": "A"}, "b": {"BODY_HTML": "B"}})
+
+    results = ai_response_service.parse_packed_response(text, ["a", "b"])
+
+    assert results["a"]["body_html"] == "A"
+    assert results["b"] == {"body_html": "B", "seo_title": "", "seo_description": ""}
+
+
+def test_parse_packed_response_drops_unknown_duplicate_and_empty_entries():
+    text = json.dumps({"products": [
+        entry("a", "first"),
+        entry("a", "second"),
+        entry("unknown"),
+        entry("b", ""),
+        "not an entry",
+    ]})
+
+    results = ai_response_service.parse_packed_response(text, ["a", "b"])
+
+    assert list(results) == ["a"]
+    assert results["a"]["body_html"] == "first"
+
+
+def test_parse_packed_response_numeric_handles():
+    results = ai_response_service.parse_packed_response(json.dumps([entry(12345)]), ["12345"])
+
+    assert list(results) == ["12345"]
+
+
+def test_parse_packed_response_invalid_json():
+    assert ai_response_service.parse_packed_response("not json", ["a"]) == {}
+    assert ai_response_service.parse_packed_response(json.dumps("a string"), ["a"]) == {}
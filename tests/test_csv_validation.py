@@ -0,0 +1,71 @@
+# File: tests/test_csv_validation.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.csv_validation import validate_csv_frame
+
+COLUMNS = ["Handle", "Title", "Body (HTML)", "Vendor", "Image Src", "SEO Title", "SEO Description"]
+
+
+def frame(rows, index = None) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns = COLUMNS, index = index)
+
+
+def test_products_are_kept_and_variants_counted():
+    df = frame([
+        ["shirt", "Shirt", "<p>Cotton</p>", "Acme", "http://img/shirt.jpg", "Shirt SEO", "Shirt descr"],
+        ["shirt", None, None, None, "http://img/shirt-red.jpg", None, None],
+        ["hat", "Hat", None, "Acme", None, None, None],
+    ])
+
+    result = validate_csv_frame(df)
+
+    assert result.variant_count == 1
+    assert result.errors == []
+    assert list(result.products["handle"]) == ["shirt", "hat"]
+    assert list(result.products.columns) == [
+        "handle", "input_title", "input_body", "input_image", "input_seo_title", "input_seo_descr"
+    ]
+    # Missing cells become empty strings
+    assert result.products.loc[2].tolist() == ["hat", "Hat", "", "", "", ""]
+
+
+def test_missing_columns_raise():
+    with pytest.raises(ValueError, match = "SEO Title"):
+        validate_csv_frame(pd.DataFrame({"Handle": ["a"], "Title": ["A"]}))
+
+
+def test_products_without_handle_are_rejected_with_their_row_number():
+    df = frame([
+        ["a", "A", "", "", "", "", ""],
+        [None, "No handle", "", "", "", "", ""],
+    ])
+
+    result = validate_csv_frame(df)
+
+    assert list(result.products["handle"]) == ["a"]
+    assert [(error.row, error.column) for error in result.errors] == [(2, "Handle")]
+
+
+def test_row_numbers_continue_across_chunks():
+    # A later chunk of a chunked read keeps counting from the start of the file
+    df = frame([["a", "A", "", "", "", "", ""], ["", "B", "", "", "", "", ""]], index = pd.RangeIndex(5000, 5002))
+
+    result = validate_csv_frame(df)
+
+    assert [error.row for error in result.errors] == [5002]
+
+
+def test_non_text_cells_are_converted():
+    df = frame([
+        [1001, "Numeric handle", "", "", "", "", ""],
+        ["b", "B", 12.5, "", "", "", ""],
+    ])
+    df["Vendor"] = np.nan
+
+    result = validate_csv_frame(df)
+
+    assert result.errors == []
+    assert list(result.products["handle"]) == ["1001", "b"]
+    assert result.products.loc[1, "input_body"] == "12.5"
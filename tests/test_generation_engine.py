@@ -0,0 +1,97 @@
+# File: tests/test_generation_engine.py
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.generation_engine import GenerationEngine, timeout_paused
+
+
+@pytest.fixture(autouse = True)
+def no_retry_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "GENERATION_RETRY_BACKOFF_SECONDS", 0.0)
+
+
+async def test_results_are_returned_in_input_order():
+    items = list(range(8))
+
+    async def worker(item):
+        # Later items finish first
+        await asyncio.sleep((len(items) - item) * 0.005)
+        return {"value": item * 10}
+
+    results = await GenerationEngine(concurrency = 4, timeout = 0).run(items, worker)
+
+    assert [result.index for result in results] == items
+    assert [result.item for result in results] == items
+    assert [result.content["value"] for result in results] == [item * 10 for item in items]
+
+
+async def test_a_failing_item_does_not_affect_the_others():
+    seen = []
+
+    async def worker(item):
+        if item == 2:
+            raise ValueError("bad product")
+        return {"value": item}
+
+    async def on_result(result):
+        seen.append(result.index)
+
+    results = await GenerationEngine(concurrency = 3, timeout = 0).run(range(5), worker, on_result = on_result)
+
+    assert [result.ok for result in results] == [True, True, False, True, True]
+    assert isinstance(results[2].error, ValueError)
+    assert results[2].content is None
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+
+
+async def test_retryable_errors_are_retried():
+    calls = {}
+
+    async def worker(item):
+        calls[item] = calls.get(item, 0) + 1
+        if calls[item] == 1:
+            raise ConnectionError("dropped")
+        return {"value": item}
+
+    engine = GenerationEngine(concurrency = 2, timeout = 0, max_attempts = 3,
+                              should_retry = lambda error: isinstance(error, ConnectionError))
+    results = await engine.run([1, 2], worker)
+
+    assert all(result.ok for result in results)
+    assert [result.attempts for result in results] == [2, 2]
+
+
+async def test_errors_not_accepted_by_should_retry_fail_at_once():
+    calls = []
+
+    async def worker(item):
+        calls.append(item)
+        raise ValueError("bad product")
+
+    engine = GenerationEngine(timeout = 0, max_attempts = 3, should_retry = lambda error: False)
+    results = await engine.run([1], worker)
+
+    assert calls == [1]
+    assert results[0].attempts == 1
+
+
+async def test_attempt_timeout():
+    async def worker(item):
+        await asyncio.sleep(1)
+
+    results = await GenerationEngine(timeout = 0.05, max_attempts = 1).run([1], worker)
+
+    assert isinstance(results[0].error, asyncio.TimeoutError)
+
+
+async def test_paused_waits_do_not_count_towards_the_timeout():
+    async def worker(item):
+        with timeout_paused():
+            await asyncio.sleep(0.2)
+        return {"value": item}
+
+    results = await GenerationEngine(timeout = 0.1, max_attempts = 1).run([1], worker)
+
+    assert results[0].ok
@@ -0,0 +1,105 @@
+# File: tests/test_product_fingerprints.py
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Product, ProductFingerprint
+from app.services.product_fingerprints import CARRIED_COLUMNS, FINGERPRINT_COLUMNS, classify_products, input_hash
+
+USER_ID = 1
+DIGEST = "settings-v1"
+
+
+def product_row(handle: str, body: str = "<p>Body</p>") -> dict:
+    return {
+        "handle": handle,
+        "input_title": handle.title(),
+        "input_body": body,
+        "input_image": f"http://img/{handle}.jpg",
+        "input_seo_title": "",
+        "input_seo_descr": "",
+    }
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with sessionmaker(engine, class_ = AsyncSession, expire_on_commit = False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_generated(session, row: dict, status: str = "Completed") -> None:
+    """An earlier upload's product with generated content and its fingerprint."""
+    product = Product(uploaded_file_id = 1, user_id = USER_ID, status = status, cleaned_body = "Body",
+                      output_body = f"<p>Generated {row['handle']}</p>", output_seo_title = "SEO title",
+                      output_seo_descr = "SEO descr", base64_filepath = "temp/image_cache/ab/old.b64", **row)
+    session.add(product)
+    await session.flush()
+    session.add(ProductFingerprint(user_id = USER_ID, handle = row["handle"],
+                                   input_hash = input_hash(row, DIGEST), product_id = product.id))
+    await session.commit()
+
+
+def test_input_hash_covers_fields_and_settings():
+    row = product_row("shirt")
+
+    assert input_hash(row, DIGEST) == input_hash(dict(row), DIGEST)
+    assert input_hash(row, DIGEST) != input_hash(row, "settings-v2")
+    assert input_hash(row, DIGEST) != input_hash(dict(row, input_body = "<p>Other</p>"), DIGEST)
+    # Moving text between fields changes the hash
+    assert input_hash({"input_title": "ab", "input_body": ""}) != input_hash({"input_title": "a", "input_body": "b"})
+    # Missing and empty values hash alike
+    assert input_hash({column: "" for column in FINGERPRINT_COLUMNS}) == input_hash({})
+
+
+async def test_classify_products(session):
+    await add_generated(session, product_row("unchanged"))
+    await add_generated(session, product_row("edited"))
+    rows = [
+        product_row("unchanged"),
+        product_row("edited", body = "<p>New body</p>"),
+        product_row("brand-new"),
+    ]
+
+    counts = await classify_products(session, USER_ID, rows, DIGEST)
+
+    assert counts == {"new": 1, "changed": 1, "unchanged": 1}
+    unchanged, edited, new = rows
+    assert unchanged["status"] == "Completed"
+    assert unchanged["output_body"] == "<p>Generated unchanged</p>"
+    assert unchanged["cleaned_body"] == "Body"
+    assert "base64_filepath" not in unchanged
+    assert "status" not in edited and "status" not in new
+    # Every row has the same keys, so the batch inserts as one executemany
+    for row in rows:
+        assert all(column in row for column in CARRIED_COLUMNS)
+    assert edited["output_body"] is None
+
+
+async def test_changed_settings_regenerate_everything(session):
+    await add_generated(session, product_row("shirt"))
+    rows = [product_row("shirt")]
+
+    counts = await classify_products(session, USER_ID, rows, "settings-v2")
+
+    assert counts == {"new": 0, "changed": 1, "unchanged": 0}
+    assert "status" not in rows[0]
+
+
+async def test_only_completed_products_are_reused(session):
+    await add_generated(session, product_row("shirt"), status = "Failed")
+
+    counts = await classify_products(session, USER_ID, [product_row("shirt")], DIGEST)
+
+    assert counts == {"new": 1, "changed": 0, "unchanged": 0}
+
+
+async def test_other_users_fingerprints_are_ignored(session):
+    await add_generated(session, product_row("shirt"))
+
+    counts = await classify_products(session, USER_ID + 1, [product_row("shirt")], DIGEST)
+
+    assert counts["unchanged"] == 0
@@ -0,0 +1,92 @@
+# File: tests/test_rate_limiter.py
+import pytest
+
+from app.services.rate_limiter import RateLimiter, parse_reset_duration
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1s", 1.0),
+    ("6m0s", 360.0),
+    ("20ms", 0.02),
+    ("1h2m3s", 3723.0),
+    ("1.5", 1.5),
+])
+def test_parse_reset_duration(value, expected):
+    assert parse_reset_duration(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", ["", None, "soon"])
+def test_parse_reset_duration_rejects_unknown_values(value):
+    assert parse_reset_duration(value) is None
+
+
+def test_update_from_headers_syncs_both_buckets():
+    limiter = RateLimiter(requests_per_minute = 100, tokens_per_minute = 10000)
+
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "500",
+        "x-ratelimit-remaining-requests": "42",
+        "x-ratelimit-reset-requests": "1s",
+        "x-ratelimit-limit-tokens": "20000",
+        "x-ratelimit-remaining-tokens": "1500",
+        "x-ratelimit-reset-tokens": "6s",
+    })
+
+    assert limiter.requests.capacity == 500
+    assert limiter.requests.available == 42
+    assert limiter.tokens.capacity == 20000
+    assert limiter.tokens.available == 1500
+
+
+def test_update_from_headers_never_raises_the_local_budget():
+    limiter = RateLimiter(requests_per_minute = 100, tokens_per_minute = 10000)
+    limiter.tokens.available = 200
+
+    limiter.update_from_headers({"x-ratelimit-remaining-tokens": "5000"})
+
+    assert limiter.tokens.available == 200
+
+
+def test_exhausted_window_waits_for_the_reset():
+    limiter = RateLimiter(requests_per_minute = 100, tokens_per_minute = 6000)
+
+    limiter.update_from_headers({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "3s"})
+
+    # 6000 tokens/minute refill at 100/s; the bucket is 3s in debt
+    assert limiter.tokens.available == pytest.approx(-300)
+    assert limiter.tokens.wait_time(100) == pytest.approx(4.0)
+
+
+def test_update_from_headers_ignores_missing_and_malformed_values():
+    limiter = RateLimiter(requests_per_minute = 100, tokens_per_minute = 10000)
+
+    limiter.update_from_headers({})
+    limiter.update_from_headers({"x-ratelimit-limit-requests": "lots", "x-ratelimit-remaining-requests": ""})
+
+    assert limiter.requests.capacity == 100
+    assert limiter.requests.available == 100
+
+
+def test_backoff_delay_grows_and_is_capped():
+    limiter = RateLimiter(backoff_base = 0.5, backoff_max = 4.0)
+
+    for attempt, ceiling in [(0, 0.5), (1, 1.0), (2, 2.0), (3, 4.0), (10, 4.0)]:
+        delays = [limiter.backoff_delay(attempt) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+
+
+def test_backoff_delay_respects_retry_after():
+    limiter = RateLimiter(backoff_base = 0.5, backoff_max = 4.0)
+
+    delays = [limiter.backoff_delay(0, retry_after = 10.0) for _ in range(200)]
+
+    assert all(10.0 <= delay <= 10.5 for delay in delays)
+
+
+def test_retry_after_headers():
+    limiter = RateLimiter()
+
+    assert limiter.retry_after({"retry-after-ms": "1500"}) == 1.5
+    assert limiter.retry_after({"retry-after": "2"}) == 2.0
+    assert limiter.retry_after({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "3s"}) == 3.0
+    assert limiter.retry_after(None) is None
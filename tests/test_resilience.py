@@ -0,0 +1,45 @@
+# File: tests/test_resilience.py
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import httpx
+import openai
+import pytest
+
+from app.services.resilience import (
+    FATAL, PERMANENT, TRANSIENT, ProviderUnavailableError, RequestError, classify_error
+)
+from app.services.single_flight import SharedCallCancelled
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(error_class, status_code: int, body = None):
+    return error_class("error", response = httpx.Response(status_code, request = REQUEST), body = body)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (status_error(openai.RateLimitError, 429), TRANSIENT),
+    (status_error(openai.InternalServerError, 500), TRANSIENT),
+    (status_error(openai.APIStatusError, 503), TRANSIENT),
+    (status_error(openai.ConflictError, 409), TRANSIENT),
+    (openai.APIConnectionError(request = REQUEST), TRANSIENT),
+    (openai.APITimeoutError(request = REQUEST), TRANSIENT),
+    (asyncio.TimeoutError(), TRANSIENT),
+    (ConnectionResetError(), TRANSIENT),
+    (SharedCallCancelled("cancelled"), TRANSIENT),
+    (BrokenProcessPool("worker died"), TRANSIENT),
+    (RequestError("Missing from batch output"), TRANSIENT),
+    (RequestError("Image download failed with HTTP 503", 503), TRANSIENT),
+    (status_error(openai.BadRequestError, 400), PERMANENT),
+    (status_error(openai.UnprocessableEntityError, 422), PERMANENT),
+    (RequestError("Image download failed with HTTP 404", 404), PERMANENT),
+    (ValueError("unparseable response"), PERMANENT),
+    (status_error(openai.AuthenticationError, 401), FATAL),
+    (status_error(openai.PermissionDeniedError, 403), FATAL),
+    (status_error(openai.NotFoundError, 404), FATAL),
+    (status_error(openai.RateLimitError, 429, body = {"code": "insufficient_quota"}), FATAL),
+    (ProviderUnavailableError("down"), FATAL),
+])
+def test_classify_error(error, expected):
+    assert classify_error(error) == expected
@@ -0,0 +1,83 @@
+# File: tests/test_single_flight.py
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SharedCallCancelled, SingleFlight
+
+
+async def test_concurrent_calls_with_the_same_key_run_once():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 1}
+
+    results = await asyncio.gather(*(single_flight.do("key", fn) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [{"value": 1}] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert single_flight.stats == {"calls": 1, "shared": 4}
+
+
+async def test_finished_calls_are_reused():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        return "result"
+
+    assert await single_flight.do("key", fn) == ("result", False)
+    assert await single_flight.do("key", fn) == ("result", True)
+    assert len(calls) == 1
+
+
+async def test_different_keys_run_separately():
+    single_flight = SingleFlight()
+
+    async def fn_a():
+        return "a"
+
+    async def fn_b():
+        return "b"
+
+    assert await single_flight.do("a", fn_a) == ("a", False)
+    assert await single_flight.do("b", fn_b) == ("b", False)
+    assert single_flight.stats["calls"] == 2
+
+
+async def test_failed_calls_are_forgotten():
+    single_flight = SingleFlight()
+
+    async def failing():
+        raise ValueError("boom")
+
+    async def working():
+        return "ok"
+
+    with pytest.raises(ValueError):
+        await single_flight.do("key", failing)
+    assert await single_flight.do("key", working) == ("ok", False)
+
+
+async def test_followers_see_a_cancelled_owner():
+    single_flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(10)
+
+    owner = asyncio.ensure_future(single_flight.do("key", slow))
+    await started.wait()
+    follower = asyncio.ensure_future(single_flight.do("key", slow))
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    with pytest.raises(SharedCallCancelled):
+        await follower
+    assert "key" not in single_flight.calls
@@ -0,0 +1,74 @@
+# File: tests/test_upload_store.py
+import numpy as np
+import pandas as pd
+
+from app.services.upload_store import merge_generated_content
+
+# Shopify exports have more columns than the app reads; their order must survive the merge
+COLUMNS = ["Handle", "Title", "Body (HTML)", "Vendor", "Variant SKU", "Image Src", "SEO Title", "SEO Description"]
+
+
+def upload() -> pd.DataFrame:
+    return pd.DataFrame([
+        ["shirt", "Shirt", "<p>Old shirt</p>", "Acme", "S-1", "http://img/shirt.jpg", "", ""],
+        ["shirt", None, None, None, "S-2", "http://img/shirt-red.jpg", None, None],
+        ["hat", "Hat", "<p>Old hat</p>", "Acme", "H-1", "", "", ""],
+        ["shirt", "Shirt again", "<p>Second shirt</p>", "Acme", "S-3", "", "", ""],
+        ["mug", "Mug", "<p>Old mug</p>", "Acme", "M-1", "", "", ""],
+    ], columns = COLUMNS)
+
+
+def products(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns = ["id", "source_row", "handle", "status",
+                                         "output_body", "output_seo_title", "output_seo_descr"])
+
+
+def test_merge_writes_completed_products_by_source_row():
+    df = upload()
+    outputs = products([
+        [1, 0, "shirt", "Completed", "<p>New shirt</p>", "Shirt SEO", "Shirt descr"],
+        [2, 2, "hat", "Pending", None, None, None],
+        [3, 3, "shirt", "Completed", "<p>New second shirt</p>", "Second SEO", "Second descr"],
+        [4, 4, "mug", "Failed", None, None, None],
+    ])
+
+    updated = merge_generated_content(df, outputs)
+
+    assert updated == 2
+    assert list(df.columns) == COLUMNS
+    assert df.loc[0, ["Body (HTML)", "SEO Title", "SEO Description"]].tolist() == [
+        "<p>New shirt</p>", "Shirt SEO", "Shirt descr"]
+    assert df.loc[3, "Body (HTML)"] == "<p>New second shirt</p>"
+    # Products that are not completed keep their uploaded content
+    assert df.loc[2, "Body (HTML)"] == "<p>Old hat</p>"
+    assert df.loc[4, "Body (HTML)"] == "<p>Old mug</p>"
+    # Variant rows are left alone
+    assert df.loc[1, "Variant SKU"] == "S-2"
+    assert df.loc[1, ["Title", "Body (HTML)", "SEO Title", "SEO Description"]].isna().all()
+    assert len(df) == 5
+
+
+def test_products_without_source_row_are_matched_by_handle_occurrence():
+    df = upload()
+    outputs = products([
+        [1, np.nan, "shirt", "Completed", "<p>First</p>", "", ""],
+        [2, np.nan, "hat", "Completed", "<p>Hat</p>", "", ""],
+        [3, np.nan, "shirt", "Completed", "<p>Second</p>", "", ""],
+    ])
+
+    updated = merge_generated_content(df, outputs)
+
+    assert updated == 3
+    # The n-th product of a handle is the n-th titled row of that handle
+    assert df.loc[[0, 2, 3, 4], "Body (HTML)"].tolist() == ["<p>First</p>", "<p>Hat</p>", "<p>Second</p>", "<p>Old mug</p>"]
+    assert pd.isna(df.loc[1, "Body (HTML)"])
+
+
+def test_merge_uses_the_body_html_column_name_of_older_exports():
+    df = upload().rename(columns = {"Body (HTML)": "Body HTML"})
+    outputs = products([[1, 2, "hat", "Completed", "<p>New hat</p>", "", ""]])
+
+    merge_generated_content(df, outputs)
+
+    assert df.loc[2, "Body HTML"] == "<p>New hat</p>"
+    assert "Body (HTML)" not in df.columns